@@ -1,17 +1,27 @@
-import tkinter as tk
-from tkinter import messagebox, colorchooser
-import requests
+import time
+_T0 = time.perf_counter() # Origine des mesures de démarrage (span "import")
 import hashlib
-import uuid
 import platform
 import threading
-import time
-import webbrowser
-import ctypes
 import sys
 import os
 import json 
+import re
+import bisect
+import math
+import random
+import string
+import queue
+import socket
+import struct
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
 # import atexit # Non nécessaire, WM_DELETE_WINDOW gère la fermeture propre
+# requests, uuid, colorchooser, webbrowser, ctypes, mmap, zlib, select, concurrent.futures et http.server sont importés à la première utilisation (démarrage plus rapide)
+# pyserial (flash série direct) est optionnel : importé à l'ouverture du port
+# tkinter n'est importé qu'avec l'interface (load_ui) : les commandes CLI ne le chargent jamais
 
 # ============================
 # CONFIG
@@ -20,876 +30,4984 @@ DOWNLOAD_LINK = "https://mega.nz/folder/sNMX2ZDT#MsXmCAafZuymxFH8XmEL7w"  # Lien
 WORKER_URL = "https://spring-glade-0359.mercifoi435.workers.dev/"      # Worker (Vérifiez si cette URL est correcte !)
 DEFAULT_FONT = "Segoe UI"
 ALT_FONTS = ["Consolas", "Courier New", "Arial", "Calibri", "Verdana"]
-LICENSE_FILE = "license.dat" # Fichier pour la persistance de la clé
+def _user_data_dir():
+    """Dossier de données par utilisateur (surchargeable via HAKO_DATA_DIR)."""
+    if os.environ.get("HAKO_DATA_DIR"):
+        return os.environ["HAKO_DATA_DIR"]
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "HakoLauncher")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/HakoLauncher")
+    return os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "hako-launcher")
+
+DATA_DIR = _user_data_dir()
+LICENSE_FILE = os.path.join(DATA_DIR, "license.dat") # Magasin de licence (clé + bail), voir LicenseStore
+LEGACY_LICENSE_FILE = "license.dat"  # Anciennes versions : JSON brut dans le dossier courant (migré une fois)
+LEGACY_LEASE_FILE = "license.lease"
+SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json") # Profil de thème (couleurs, police) et options
+INSTANCE_TIMEOUT_S = 2.0         # Attente maximale de l'instance principale lors d'un second lancement
+LEASE_TTL_S = 24 * 3600          # Au-delà, le bail est "périmé" : revalidation en arrière-plan
+LEASE_MAX_AGE_S = 7 * 24 * 3600  # Au-delà, le bail n'est plus utilisable hors-ligne
+LEASE_RETRY_S = 15 * 60          # Nouvel essai si le Worker est injoignable pendant la revalidation
+WORKER_URLS = [url for url in os.environ.get("HAKO_WORKER_URLS", "").split(",") if url] or [WORKER_URL] # Endpoints, par ordre de préférence
+WORKER_TIMEOUT_S = 10            # Timeout d'une requête vers le Worker
+WORKER_HEDGE_PERCENTILE = 90     # Sans réponse après ce percentile de latence de l'endpoint, la requête est doublée vers le suivant
+WORKER_HEDGE_MIN_MS = 100        # Délai minimal avant de doubler une requête
+WORKER_HEDGE_DEFAULT_MS = 1500   # Délai utilisé tant qu'un endpoint a moins de WORKER_HEDGE_MIN_SAMPLES mesures
+WORKER_HEDGE_MIN_SAMPLES = 5
+WORKER_HEDGE_WINDOW = 50         # Latences récentes conservées par endpoint
+WORKER_FAILURE_PENALTY_MS = 2000 # Coût d'un échec dans le classement des endpoints (un repli coûte plus qu'une réponse lente)
+WORKER_FAILURE_HALF_LIFE_S = 60  # La pénalité d'échec d'un endpoint est divisée par deux toutes les N secondes
+WORKER_RETRIES = 3               # Nombre de reprises sur erreur transitoire
+WORKER_BACKOFF_BASE_S = 0.25     # Délai de base du backoff exponentiel
+WORKER_BACKOFF_MAX_S = 2.0       # Plafond d'un délai de backoff
+WORKER_DEADLINE_S = 20           # Budget total (reprises comprises) d'une vérification
+WORKER_RETRY_STATUSES = (429, 500, 502, 503, 504) # Réponses HTTP considérées comme transitoires
+SHUTDOWN_DEADLINE_S = 0.2       # Délai maximal de fermeture du processus, quelles que soient les opérations en cours
+SHUTDOWN_GRACE_S = 0.1          # Part de ce délai laissée aux threads pour se terminer (le reste : destruction Tk, sortie)
+METRICS_FILE = os.path.join(os.path.dirname(LICENSE_FILE), "hako_metrics.jsonl") # Export des mesures (JSON-lines)
+STALL_THRESHOLD_MS = 16         # Un callback Tk plus long qu'une image à 60 Hz est enregistré comme blocage
+NETWORK_POLL_MS = 50             # Fréquence de relève des résultats réseau (uniquement quand des requêtes sont en cours)
+SYSFACTS_FILE = os.path.join(os.path.dirname(LICENSE_FILE), "sysfacts.json") # Cache optionnel des infos système
+SYSFACTS_PERSIST = False         # True : réutilise les infos système du lancement précédent (même machine)
+FIRMWARE_BASE_URL = "https://hako13016.github.io/lilygo-t-display-s3-firmware-hako/" # Site web-flasher (manifests + .bin)
+FIRMWARE_MANIFEST = "manifest.json" # Manifest sélectionné par défaut sur la page de téléchargement
+MANIFEST_DIR = os.path.dirname(os.path.abspath(__file__)) # Manifests esp-web-tools livrés avec le launcher (manifest*.json)
+MANIFEST_RACY_NS = 2 * 10**9     # Manifest modifié moins de 2 s avant sa lecture : relu au refresh suivant (dates FAT à 2 s)
+DOWNLOAD_DIR = os.path.join(DATA_DIR, "firmware") # Images téléchargées (et fichiers .part en cours de reprise)
+DOWNLOAD_CONNECTIONS = 4         # Connexions parallèles par fichier (requêtes Range)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024 # Taille d'un bloc Range (unité de reprise)
+DOWNLOAD_READ_SIZE = 64 * 1024   # Taille des lectures sur le flux HTTP
+DOWNLOAD_TIMEOUT_S = 15          # Timeout de connexion/lecture d'un bloc
+DOWNLOAD_RETRIES = 3             # Reprises par bloc sur erreur transitoire
+DOWNLOAD_POLL_MS = 200           # Rafraîchissement de la progression dans l'interface
+FIRMWARE_CACHE_DIR = os.path.join(DATA_DIR, "cache") # Cache des images firmware (adressé par SHA-256)
+FIRMWARE_CACHE_MAX_BYTES = 256 * 1024 * 1024 # Au-delà, les images les moins récemment utilisées sont évincées
+WEB_ROOT = MANIFEST_DIR           # Pages du web-flasher (index.html, remote.html, ...) servies en local
+WEB_HOST = "127.0.0.1"           # localhost : contexte sécurisé pour Web Serial sans HTTPS
+WEB_PORT = 8765                  # 0 : port libre choisi par le système
+WEB_PAGES = {"manifest.json": "index.html", "manifest_remote.json": "remote.html", "manifest-deauth.json": "deauth.html"}
+FLASH_BAUD_RATES = (2000000, 1500000, 921600, 460800, 230400) # Vitesses essayées, de la plus rapide à la plus lente
+FLASH_PIPELINE_DEPTH = 2         # Blocs envoyés sans attendre d'accusé (1 : strictement un bloc à la fois)
+FLASH_BLOCK_TIMEOUT_S = 5.0      # Attente maximale de l'accusé d'un bloc (décompression + écriture)
+MONITOR_BAUD = 115200            # Vitesse par défaut du moniteur série (ignorée par l'USB CDC de l'ESP32-S3)
+MONITOR_LINES = 100000           # Lignes conservées par le moniteur série (tampon circulaire)
+MONITOR_ROWS = 16                # Lignes rendues dans la vue (le reste du tampon n'est jamais inséré dans Tk)
+MONITOR_FRAME_MS = 33            # Rafraîchissement de la vue (~30 images/s, insertion par lots)
+MONITOR_READ_SIZE = 64 * 1024    # Taille des lectures sur le port
+MONITOR_MAX_LINE = 4096          # Au-delà, une ligne sans retour à la ligne est coupée
+MONITOR_FILTER_BUDGET_MS = 8     # Temps de filtrage par image (un nouveau filtre se complète sur plusieurs images)
+DEVICES_FILE = os.path.join(DATA_DIR, "devices.json") # Empreintes des cartes détectées (puce, MAC, flash)
+PORT_PROBE_TIMEOUT_S = 1.5       # Délai global de détection (tous les ports sont sondés en parallèle)
+DELTA_BLOCK_SIZE = 1024          # Granularité des mises à jour différentielles (<image>.blocks.json)
+
+# ============================
+# UTIL : Tâches d'arrière-plan
+# ============================
+class OperationCancelled(Exception):
+    """Levée dans une opération d'arrière-plan quand l'application se ferme."""
+
+class BackgroundTasks:
+    """Suivi de toutes les opérations d'arrière-plan (réseau, téléchargements, sondes système).
+
+    Les threads sont des démons suivis ici ; cancel() prévient les opérations (événement + hooks
+    d'annulation) et shutdown() attend au plus un délai fixe avant de les abandonner.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.cancelled_at = None
+        self._threads = set()
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def spawn(self, target, name):
+        """Lance target dans un thread démon suivi."""
+        def run():
+            try:
+                target()
+            except OperationCancelled:
+                pass
+            finally:
+                with self._lock:
+                    self._threads.discard(thread)
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        with self._lock:
+            self._threads.add(thread)
+        thread.start()
+        return thread
+
+    def add_cancel_hook(self, hook):
+        """Enregistre une fonction appelée à l'annulation (ex. fermer une session, un fichier)."""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_cancel_hook(self, hook):
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def check(self):
+        """Point d'annulation : lève OperationCancelled si la fermeture est demandée."""
+        if self.cancelled.is_set():
+            raise OperationCancelled()
+
+    def sleep(self, seconds):
+        """time.sleep interrompu dès l'annulation."""
+        if self.cancelled.wait(seconds):
+            raise OperationCancelled()
+
+    def cancel(self):
+        """Demande l'arrêt de toutes les opérations (non bloquant)."""
+        if self.cancelled.is_set():
+            return
+        self.cancelled_at = time.monotonic()
+        self.cancelled.set()
+        with self._lock:
+            hooks, self._hooks = self._hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Avertissement: échec d'un hook d'annulation: {e}")
+
+    def shutdown(self, timeout=SHUTDOWN_GRACE_S):
+        """Annule tout et attend au plus timeout secondes (depuis l'annulation) ; retourne les threads abandonnés."""
+        self.cancel()
+        deadline = self.cancelled_at + timeout
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        # Les threads restants sont des démons bloqués (ex. socket) : ils n'empêchent pas la sortie du processus
+        return [thread.name for thread in threads if thread.is_alive()]
+
+BACKGROUND = BackgroundTasks()
+
+# ============================
+# UTIL : Instrumentation (spans, latence Worker, blocages de la boucle Tk)
+# ============================
+class Metrics:
+    """Mesures légères en mémoire, exportées en JSON-lines dans METRICS_FILE.
+
+    Chaque enregistrement : {"ts", "kind", "name", "ms", ...attributs}. Les durées par nom sont
+    aussi conservées (fenêtre glissante) pour calculer des percentiles à l'affichage.
+    """
+
+    def __init__(self, path=METRICS_FILE, history=500):
+        self.path = path
+        self._pending = []
+        self._durations = {} # nom -> deque des dernières durées (ms)
+        self._history = history
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, ms, **attrs):
+        attrs = {k: round(v, 3) if isinstance(v, float) else v for k, v in attrs.items()}
+        entry = {"ts": round(time.time(), 3), "kind": kind, "name": name, "ms": round(ms, 3), **attrs}
+        with self._lock:
+            self._pending.append(entry)
+            self._durations.setdefault(name, deque(maxlen=self._history)).append(ms)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Chronomètre un bloc ; le dictionnaire produit peut recevoir des attributs supplémentaires."""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record("span", name, (time.perf_counter() - start) * 1000, **attrs)
+
+    def percentiles(self, name, points=(50, 90, 99)):
+        """Percentiles (ms) des durées enregistrées sous ce nom ; {} si aucune mesure."""
+        with self._lock:
+            values = sorted(self._durations.get(name, ()))
+        if not values:
+            return {}
+        return {p: values[min(len(values) - 1, int(len(values) * p / 100))] for p in points}
+
+    def count(self, name):
+        with self._lock:
+            return len(self._durations.get(name, ()))
+
+    def flush(self):
+        """Ajoute les mesures en attente au fichier JSON-lines."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in pending)
+        except IOError as e:
+            print(f"Erreur lors de l'export des mesures: {e}")
+
+METRICS = Metrics()
 
 # ============================
 # UTIL : HWID & Persistence
 # ============================
+class SystemFacts:
+    """Collecte unique (hors thread UI) des informations système, mémoïsée pour tout le processus.
+
+    uuid.getnode() et platform.processor()/version() peuvent lancer des sous-processus :
+    la collecte se fait donc une seule fois, dans un thread, et l'UI s'abonne via when_ready().
+    """
+
+    def __init__(self):
+        self._facts = None
+        self._callbacks = []
+        self._lock = threading.Lock()          # Protège _facts et _callbacks
+        self._collect_lock = threading.Lock()  # Garantit une seule collecte
+
+    @property
+    def ready(self):
+        return self._facts is not None
+
+    def start(self):
+        """Lance la collecte en arrière-plan (sans effet si elle est déjà faite)."""
+        if not self.ready:
+            BACKGROUND.spawn(self.get, "hako-sysfacts")
+
+    def get(self):
+        """Retourne les informations système (bloquant uniquement si la collecte est en cours)."""
+        if self._facts is not None:
+            return self._facts
+        with self._collect_lock:
+            if self._facts is None:
+                facts = self._load_cached() or self._collect()
+                with self._lock:
+                    self._facts = facts
+                    callbacks, self._callbacks = self._callbacks, []
+                for callback in callbacks:
+                    try: # Un abonné en erreur ne prive pas les suivants du résultat
+                        callback(facts)
+                    except Exception as e:
+                        print(f"Erreur dans un abonné aux infos système: {e}")
+        return self._facts
+
+    def when_ready(self, callback):
+        """Appelle callback(facts) dès que la collecte est terminée (immédiatement si déjà prête)."""
+        with self._lock:
+            if self._facts is None:
+                self._callbacks.append(callback)
+                return
+        callback(self._facts)
+
+    def _collect(self):
+        import uuid
+        facts = {
+            "node": platform.node(),
+            "system": platform.system(),
+            "release": platform.release(),
+            "version": platform.version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "mac": uuid.getnode(),
+        }
+        raw = facts["node"] + facts["system"] + facts["machine"] + str(facts["mac"])
+        facts["hwid"] = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        if SYSFACTS_PERSIST:
+            try:
+                with open(SYSFACTS_FILE, 'w') as f:
+                    json.dump(dict(facts, fingerprint=self._fingerprint()), f)
+            except IOError as e:
+                print(f"Erreur lors de la sauvegarde des infos système: {e}")
+        return facts
+
+    def _load_cached(self):
+        """Relit le cache du lancement précédent, seulement s'il provient de cette machine."""
+        if not SYSFACTS_PERSIST:
+            return None
+        try:
+            with open(SYSFACTS_FILE, 'r') as f:
+                facts = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(facts, dict) or facts.pop("fingerprint", None) != self._fingerprint():
+            return None
+        return facts if "hwid" in facts else None
+
+    @staticmethod
+    def _fingerprint():
+        # Identifiants peu coûteux (aucun sous-processus) pour détecter un cache copié d'une autre machine
+        return [platform.node(), sys.platform, os.environ.get("PROCESSOR_IDENTIFIER", ""), sys.version]
+
+SYSTEM_FACTS = SystemFacts()
+
 def get_hwid():
-    """Génère un HWID stable basé sur des identifiants système."""
-    raw = platform.node() + platform.system() + platform.machine() + str(uuid.getnode())
-    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    """Génère un HWID stable basé sur des identifiants système (calculé une seule fois par processus)."""
+    return SYSTEM_FACTS.get()["hwid"]
+
+def atomic_write(path, payload, backup_path=None):
+    """Écrit payload (bytes) de façon atomique : fichier temporaire, fsync, puis renommage.
+
+    Si backup_path est donné, la version précédente y est conservée : à tout instant,
+    le fichier principal ou la copie de secours contient une version complète.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    if backup_path and os.path.exists(path):
+        os.replace(path, backup_path)
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"): # POSIX : rend les renommages durables
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+class LicenseStore:
+    """Magasin local de la licence : un seul petit fichier versionné avec somme de contrôle.
+
+    Format : b"HAKOLIC <version> <sha256 du contenu>\n" suivi du JSON compact
+    {"license": <données du Worker>, "lease": <bail>}. Un seul read() au démarrage, puis cache mémoire.
+    Un fichier corrompu n'est jamais supprimé : on retombe sur la dernière copie valide (.bak).
+    """
+
+    MAGIC = b"HAKOLIC"
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.backup_path = path + ".bak"
+        self._record = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Retourne l'enregistrement courant ({} si aucune licence n'est sauvegardée)."""
+        with self._lock:
+            if self._record is None:
+                self._record = self._read_first_valid()
+            return self._record
+
+    def update(self, **fields):
+        """Met à jour des champs (license, lease) en une seule écriture atomique ; None supprime le champ."""
+        with self._lock:
+            if self._record is None:
+                self._record = self._read_first_valid()
+            record = dict(self._record)
+            for name, value in fields.items():
+                if value is None:
+                    record.pop(name, None)
+                else:
+                    record[name] = value
+            try:
+                atomic_write(self.path, self._encode(record), self.backup_path)
+            except OSError as e:
+                print(f"Erreur lors de la sauvegarde du fichier de licence: {e}")
+                return False
+            self._record = record
+            return True
+
+    def clear(self):
+        """Supprime la licence locale (et sa copie de secours)."""
+        with self._lock:
+            for path in (self.path, self.backup_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Erreur lors de la suppression du fichier de licence: {e}")
+                    return False
+            self._record = {}
+            return True
+
+    def _encode(self, record):
+        body = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        header = b"%s %d %s\n" % (self.MAGIC, self.VERSION, hashlib.sha256(body).hexdigest().encode("ascii"))
+        return header + body
+
+    def _decode(self, raw):
+        """Retourne l'enregistrement, ou None si le contenu est tronqué/corrompu/d'une version inconnue."""
+        header, sep, body = raw.partition(b"\n")
+        parts = header.split(b" ")
+        if not sep or len(parts) != 3 or parts[0] != self.MAGIC or parts[1] != str(self.VERSION).encode():
+            return None
+        if hashlib.sha256(body).hexdigest().encode("ascii") != parts[2]:
+            return None
+        try:
+            record = json.loads(body)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) else None
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return self._decode(f.read())
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Fichier de licence illisible ({path}): {e}")
+            return None
+
+    def _read_first_valid(self):
+        record = self._read(self.path)
+        if record is not None:
+            return record
+        if os.path.exists(self.path):
+            print("Fichier de licence corrompu : restauration de la dernière copie valide.")
+        record = self._read(self.backup_path)
+        legacy = record is None
+        if legacy:
+            record = self._migrate_legacy()
+        if record:
+            try:
+                atomic_write(self.path, self._encode(record)) # Répare (ou crée) le fichier principal
+            except OSError as e:
+                print(f"Erreur lors de la restauration du fichier de licence: {e}")
+            else:
+                if legacy: # Migration faite : les anciens fichiers ne doivent pas ressusciter après clear()
+                    for path in (LEGACY_LICENSE_FILE, LEGACY_LEASE_FILE):
+                        if os.path.abspath(path) == os.path.abspath(self.path):
+                            continue
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+        return record or {}
+
+    def _migrate_legacy(self):
+        """Reprend license.dat / license.lease (JSON brut du dossier courant) des anciennes versions."""
+        record = {}
+        for name, path in (("license", LEGACY_LICENSE_FILE), ("lease", LEGACY_LEASE_FILE)):
+            if os.path.abspath(path) == os.path.abspath(self.path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    value = json.load(f)
+            except (IOError, ValueError):
+                continue
+            if isinstance(value, dict):
+                record[name] = value
+        return record
+
+LICENSE_STORE = LicenseStore(LICENSE_FILE)
+
+def save_license_data(data, lease=None):
+    """Sauvegarde les données de licence (et le bail associé s'il est fourni) dans le magasin local."""
+    if lease is None:
+        return LICENSE_STORE.update(license=data)
+    return LICENSE_STORE.update(license=data, lease=lease)
+
+def load_license_data():
+    """Charge les données de licence depuis le magasin local (None si aucune)."""
+    return LICENSE_STORE.load().get("license")
+
+def delete_local_license():
+    """Supprime la licence locale (clé et bail)."""
+    return LICENSE_STORE.clear()
+
+# ============================
+# UTIL : Profil de thème
+# ============================
+THEME_COLOR_TOKENS = ("primary_bg", "panel_bg", "neon_accent", "text_fg", "button_bg")
+COLOR_RE = re.compile(r"#[0-9a-fA-F]{6}$")
+
+def load_settings(path=SETTINGS_FILE):
+    """Lit le profil enregistré : {"theme": {jeton: valeur}, "stealth": bool}.
+
+    Les valeurs invalides sont ignorées une à une (le jeton garde sa valeur par défaut) ; un fichier
+    absent ou illisible donne un profil vide.
+    """
+    try:
+        with open(path, 'r', encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {"theme": {}, "stealth": False}
+    if not isinstance(data, dict):
+        data = {}
+    saved = data.get("theme") if isinstance(data.get("theme"), dict) else {}
+    theme = {key: saved[key] for key in THEME_COLOR_TOKENS
+             if isinstance(saved.get(key), str) and COLOR_RE.match(saved[key])}
+    if isinstance(saved.get("current_font"), str) and saved["current_font"]:
+        theme["current_font"] = saved["current_font"]
+    return {"theme": theme, "stealth": data.get("stealth") is True}
+
+def save_settings(settings, path=SETTINGS_FILE):
+    """Enregistre le profil (écriture atomique, JSON compact)."""
+    atomic_write(path, json.dumps(settings, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+
+# ============================
+# UTIL : Instance unique
+# ============================
+class InstanceGuard:
+    """Verrou d'instance unique par utilisateur et canal local pour passer la main à l'instance en cours.
+
+    Le verrou est un flock (msvcrt.locking sous Windows) sur instance.lock, libéré par le système si le
+    processus meurt. Le canal est un socket Unix (instance.sock) ; sans AF_UNIX, un port TCP local dont le
+    numéro et un jeton sont écrits dans instance.port (lisible par l'utilisateur seul).
+    """
+
+    def __init__(self, directory=DATA_DIR):
+        self.directory = directory
+        self.lock_path = os.path.join(directory, "instance.lock")
+        self.socket_path = os.path.join(directory, "instance.sock")
+        self.port_path = os.path.join(directory, "instance.port")
+        self._lock_file = None
+        self._server = None
+        self._token = None
+        self._handler = None
+
+    def acquire(self):
+        """True si ce processus devient l'instance principale (il écoute alors le canal)."""
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(self.lock_path, 'a+b')
+        try:
+            try:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:
+                import msvcrt
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        if hasattr(socket, "AF_UNIX"):
+            try:
+                os.unlink(self.socket_path) # Socket laissé par une instance terminée brutalement
+            except FileNotFoundError:
+                pass
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(self.socket_path)
+        else:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind(("127.0.0.1", 0))
+            self._token = os.urandom(16).hex()
+            atomic_write(self.port_path, f"{server.getsockname()[1]} {self._token}".encode("ascii"))
+        server.listen(4)
+        server.settimeout(0.2)
+        self._server = server
+        return True
+
+    def serve(self, handler):
+        """Appelle handler(argv) (dans un thread d'arrière-plan) pour chaque lancement redirigé."""
+        self._handler = handler
+        BACKGROUND.spawn(self._accept_loop, "hako-instance")
+
+    def _accept_loop(self):
+        while self._server:
+            BACKGROUND.check()
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError: # Canal fermé par close()
+                return
+            with conn:
+                try:
+                    conn.settimeout(1.0)
+                    data = b""
+                    while not data.endswith(b"\n") and len(data) < 65536:
+                        chunk = conn.recv(4096)
+                        if not chunk:
+                            break
+                        data += chunk
+                    message = json.loads(data)
+                    if message.get("token") != self._token or not isinstance(message.get("argv"), list):
+                        continue
+                    self._handler(message["argv"])
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError) as e:
+                    print(f"Avertissement: message d'instance ignoré ({e})")
+
+    def _connect(self):
+        if hasattr(socket, "AF_UNIX"):
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(self.socket_path)
+            return conn, None
+        with open(self.port_path, 'r', encoding="ascii") as f:
+            port, token = f.read().split()
+        return socket.create_connection(("127.0.0.1", int(port))), token
+
+    def forward(self, argv, timeout=INSTANCE_TIMEOUT_S):
+        """Transmet argv à l'instance principale ; False si elle ne répond pas dans le délai."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                conn, token = self._connect()
+                with conn:
+                    conn.settimeout(max(0.1, deadline - time.perf_counter()))
+                    conn.sendall(json.dumps({"argv": argv, "token": token}).encode("utf-8") + b"\n")
+                    return conn.recv(16).startswith(b"ok")
+            except (OSError, ValueError): # Instance principale en cours de démarrage : canal pas encore ouvert
+                if time.perf_counter() >= deadline:
+                    return False
+                time.sleep(0.02)
+
+    def close(self):
+        server, self._server = self._server, None
+        if server:
+            server.close()
+            for path in (self.socket_path, self.port_path):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        if self._lock_file:
+            self._lock_file.close() # Libère le verrou (le fichier reste : le supprimer ouvrirait une course)
+            self._lock_file = None
+
+# ============================
+# UTIL : Bail de licence (stale-while-revalidate)
+# ============================
+def parse_expire(expire):
+    """Convertit le champ 'expire' du Worker en timestamp (None si illimité ou illisible)."""
+    if isinstance(expire, (int, float)) and not isinstance(expire, bool):
+        # Timestamp Unix, éventuellement en millisecondes
+        return expire / 1000.0 if expire > 1e11 else float(expire)
+    if not isinstance(expire, str) or expire in ("Lifetime", "N/A", ""):
+        return None
+    try:
+        return datetime.fromisoformat(expire.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        pass
+    for fmt in ("%d/%m/%Y", "%d/%m/%Y %H:%M", "%Y/%m/%d"):
+        try:
+            return datetime.strptime(expire, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+def make_license_lease(key, data, now=None):
+    """Construit le bail local lié au HWID après une validation réussie par le Worker (now : horloge, par défaut time.time())."""
+    return {
+        "license": key,
+        "hwid": get_hwid(),
+        "validated_at": time.time() if now is None else now,
+        "expire": (data or {}).get("expire"),
+    }
+
+def load_license_lease(key, now=None):
+    """Retourne le bail local s'il est utilisable pour cette clé et ce HWID à l'instant now, sinon None."""
+    lease = LICENSE_STORE.load().get("lease")
+    if not isinstance(lease, dict):
+        return None
+    if lease.get("license") != key or lease.get("hwid") != get_hwid():
+        return None
+
+    now = time.time() if now is None else now
+    validated_at = lease.get("validated_at")
+    if not isinstance(validated_at, (int, float)) or validated_at > now:
+        return None # Horloge incohérente : on ne fait pas confiance au bail
+    if now - validated_at > LEASE_MAX_AGE_S:
+        return None
+    expire_ts = parse_expire(lease.get("expire"))
+    if expire_ts is not None and now >= expire_ts:
+        return None
+    return lease
+
+def lease_next_check(lease):
+    """Calcule le prochain instant de revalidation (TTL du bail, ou date d'expiration si plus proche)."""
+    next_check = lease["validated_at"] + LEASE_TTL_S
+    expire_ts = parse_expire(lease.get("expire"))
+    if expire_ts is not None:
+        next_check = min(next_check, expire_ts)
+    return next_check
+
+def revalidate_lease(key, result, now=None):
+    """Applique le résultat (ok, message, data) de check_and_bind_key à la licence locale ; retourne (état, bail).
+
+    "active" : bail renouvelé ; "revoked" : clé refusée par le Worker, licence locale effacée ;
+    "offline" : Worker injoignable, le bail actuel reste utilisable ; "expired" : Worker injoignable
+    et bail trop ancien (ou absent) pour continuer hors-ligne.
+    """
+    ok, _, data = result
+    if ok:
+        data = dict(data, license=data.get("license") or key)
+        lease = make_license_lease(key, data, now)
+        save_license_data(data, lease) # Clé et bail : une seule écriture atomique
+        return "active", lease
+    if data is not None:
+        delete_local_license()
+        return "revoked", None
+    lease = load_license_lease(key, now)
+    return ("offline", lease) if lease else ("expired", None)
+
+# ============================
+# LICENCE LOGIC (Worker Cloudflare)
+# ============================
+_worker_session = None
+_worker_session_lock = threading.Lock()
+_worker_sockets = weakref.WeakSet() # Sockets ouverts vers le Worker (coupés à la fermeture, même en pleine lecture)
+_net_timings = threading.local() # Phases (connexion DNS + TCP, TLS) de la connexion ouverte par la requête en cours
+
+def _timed_adapter_class():
+    """HTTPAdapter dont les connexions chronomètrent connexion (DNS + TCP) et TLS (défini à la demande : import paresseux)."""
+    import requests
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+
+    class TimedConnectionMixin:
+        def _new_conn(self):
+            # DNS et TCP mesurés ensemble : urllib3 résout le nom et essaie chaque adresse lui-même,
+            # une résolution séparée pour isoler le DNS doublerait la requête DNS de chaque connexion.
+            start = time.perf_counter()
+            sock = super()._new_conn()
+            with _worker_session_lock:
+                _worker_sockets.add(sock)
+            _net_timings.phases = {"connect_ms": (time.perf_counter() - start) * 1000}
+            return sock
+
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            phases = getattr(_net_timings, "phases", None)
+            if phases is not None:
+                total = (time.perf_counter() - start) * 1000
+                phases["tls_ms"] = max(0.0, total - phases["connect_ms"])
+
+    class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+        pass
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    class TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            # Rappelé aussi à la désérialisation de l'adaptateur : les pools chronométrés sont toujours en place
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+    return TimedHTTPAdapter
+
+class WorkerEndpoints:
+    """Endpoints du Worker classés par santé : latence lissée (EWMA) et taux d'échec récent.
+
+    Tant qu'un endpoint n'a pas de mesure, l'ordre de configuration est conservé ; ensuite le mieux
+    classé est celui dont la latence attendue, augmentée de la pénalité d'échec, est la plus faible.
+    La pénalité s'estompe avec le temps : un endpoint tombé en panne redevient candidat.
+    """
+
+    def __init__(self, urls):
+        self.urls = list(urls)
+        self._latencies = {url: deque(maxlen=WORKER_HEDGE_WINDOW) for url in self.urls}
+        self._ewma = dict.fromkeys(self.urls)
+        self._failures = dict.fromkeys(self.urls, 0.0)
+        self._updated_at = dict.fromkeys(self.urls, 0.0)
+        self._lock = threading.Lock()
+
+    def record(self, url, ms, ok):
+        with self._lock:
+            if ok:
+                self._latencies[url].append(ms)
+            previous = self._ewma[url]
+            self._ewma[url] = ms if previous is None else 0.7 * previous + 0.3 * ms
+            self._failures[url] = 0.7 * self._failure_rate(url) + (0.0 if ok else 0.3)
+            self._updated_at[url] = time.monotonic()
+
+    def _failure_rate(self, url):
+        return self._failures[url] * 0.5 ** ((time.monotonic() - self._updated_at[url]) / WORKER_FAILURE_HALF_LIFE_S)
+
+    def score(self, url):
+        """Latence attendue (ms) plus la pénalité d'échec ; plus petit = meilleur."""
+        ewma = self._ewma[url]
+        return (WORKER_HEDGE_DEFAULT_MS if ewma is None else ewma) + self._failure_rate(url) * WORKER_FAILURE_PENALTY_MS
+
+    def ranked(self):
+        with self._lock:
+            return sorted(self.urls, key=lambda url: (self.score(url), self.urls.index(url)))
+
+    def hedge_delay(self, url):
+        """Attente (s) avant de doubler une requête vers url : percentile WORKER_HEDGE_PERCENTILE de ses latences."""
+        with self._lock:
+            samples = sorted(self._latencies[url])
+        if len(samples) < WORKER_HEDGE_MIN_SAMPLES:
+            return WORKER_HEDGE_DEFAULT_MS / 1000
+        ms = samples[min(len(samples) - 1, len(samples) * WORKER_HEDGE_PERCENTILE // 100)]
+        return max(WORKER_HEDGE_MIN_MS, ms) / 1000
+
+    def snapshot(self):
+        """[(url, latence lissée ms ou None, taux d'échec, mesures)] dans l'ordre de classement."""
+        ranked = self.ranked()
+        with self._lock:
+            return [(url, self._ewma[url], self._failure_rate(url), len(self._latencies[url])) for url in ranked]
+
+WORKER_ENDPOINTS = WorkerEndpoints(WORKER_URLS)
+
+def get_worker_session():
+    """Retourne la session HTTP keep-alive partagée vers le Worker (créée au premier appel)."""
+    global _worker_session
+    import requests
+    with _worker_session_lock:
+        if _worker_session is None:
+            session = requests.Session()
+            adapter = _timed_adapter_class()(pool_connections=len(WORKER_ENDPOINTS.urls), pool_maxsize=4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _worker_session = session
+        return _worker_session
+
+def reset_worker_session():
+    """Ferme la session partagée (les connexions du pool sont abandonnées)."""
+    global _worker_session
+    with _worker_session_lock:
+        session, _worker_session = _worker_session, None
+    if session is not None:
+        session.close()
+
+def abort_worker_connections():
+    """Coupe les connexions ouvertes vers le Worker : une requête bloquée en lecture échoue aussitôt."""
+    with _worker_session_lock:
+        socks = list(_worker_sockets)
+    for sock in socks:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass # Déjà fermé
+
+def prewarm_worker_session():
+    """Ouvre à l'avance la connexion vers le Worker (DNS + TCP + TLS) pour que l'activation la trouve chaude."""
+    import requests
+    try:
+        get_worker_session().head(WORKER_ENDPOINTS.ranked()[0], timeout=WORKER_TIMEOUT_S)
+    except requests.exceptions.RequestException:
+        pass # Simple préchauffage : l'activation gèrera l'erreur elle-même
+
+def backoff_delay(attempt):
+    """Délai avant la reprise n° attempt : exponentiel borné avec jitter complet."""
+    return random.uniform(0, min(WORKER_BACKOFF_MAX_S, WORKER_BACKOFF_BASE_S * (2 ** attempt)))
+
+def hedged_post(session, payload, timeout, attempt=0, endpoints=None):
+    """POST vers le meilleur endpoint, doublé vers le suivant s'il tarde ; la première réponse valable gagne.
+
+    Un endpoint qui échoue passe immédiatement la main au suivant ; un endpoint qui ne répond pas avant
+    son délai de hedging (voir WorkerEndpoints.hedge_delay) est doublé sans être abandonné. Une réponse
+    429/5xx ou un JSON illisible n'est pas valable. Les requêtes perdantes terminent en arrière-plan et
+    leur durée est tout de même comptée dans la santé de leur endpoint.
+    """
+    endpoints = endpoints or WORKER_ENDPOINTS
+    ranked = endpoints.ranked()
+    results = queue.Queue()
+
+    def send(url, hedge):
+        _net_timings.phases = None
+        start = time.perf_counter()
+        r, failure, valid = None, None, False
+        try:
+            with METRICS.span("worker.request", attempt=attempt, endpoint=url, hedge=hedge) as span:
+                try:
+                    r = session.post(url, json=payload, timeout=timeout)
+                    span.update(status=r.status_code, response_ms=r.elapsed.total_seconds() * 1000)
+                finally:
+                    # Connexion neuve : détail connexion (DNS + TCP) / TLS ; connexion réutilisée : rien à ajouter
+                    span.update(getattr(_net_timings, "phases", None) or {"reused": True})
+            valid = r.status_code not in WORKER_RETRY_STATUSES
+        except Exception as e: # Relayée à l'appelant si aucun autre endpoint ne répond
+            failure = e
+        if valid and r.ok:
+            try:
+                r.json()
+            except ValueError: # JSON mal formé : un autre endpoint peut encore donner une réponse exploitable
+                valid = False
+        endpoints.record(url, (time.perf_counter() - start) * 1000, valid)
+        results.put((r, failure, valid))
+
+    launched = pending = 0
+    hedge_at = 0.0
+    last = (None, None)
+    while True:
+        if launched < len(ranked) and (pending == 0 or time.monotonic() >= hedge_at):
+            url = ranked[launched]
+            BACKGROUND.spawn(lambda url=url, hedge=launched: send(url, hedge), "hako-worker-request")
+            hedge_at = time.monotonic() + endpoints.hedge_delay(url)
+            launched += 1
+            pending += 1
+        wait = hedge_at - time.monotonic() if launched < len(ranked) else 0.1
+        try:
+            r, failure, valid = results.get(timeout=min(0.1, max(0.0, wait)))
+        except queue.Empty:
+            BACKGROUND.check()
+            continue
+        pending -= 1
+        if valid:
+            return r
+        last = (r, failure)
+        if pending == 0 and launched == len(ranked):
+            break
+        hedge_at = 0.0 # Échec : l'endpoint suivant est sollicité sans attendre
+    r, failure = last
+    if r is None and failure is not None:
+        raise failure
+    return r
+
+def worker_post(payload):
+    """POST vers le Worker via la session partagée, avec reprises sur les erreurs transitoires.
+
+    Chaque tentative passe par hedged_post (tous les endpoints configurés). Les erreurs de connexion,
+    timeouts et réponses 429/5xx sont retentés au plus WORKER_RETRIES fois, sans dépasser
+    WORKER_DEADLINE_S au total. La dernière réponse (ou exception) est renvoyée à l'appelant.
+    """
+    import requests
+    session = get_worker_session()
+    deadline = time.monotonic() + WORKER_DEADLINE_S
+    attempt = 0
+    while True:
+        BACKGROUND.check()
+        timeout = max(0.1, min(WORKER_TIMEOUT_S, deadline - time.monotonic()))
+        try:
+            r = hedged_post(session, payload, timeout, attempt)
+            if r.status_code not in WORKER_RETRY_STATUSES:
+                return r
+            failure = None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            BACKGROUND.check() # Une erreur provoquée par la fermeture de la session n'est pas retentée
+            r, failure = None, e
+
+        delay = backoff_delay(attempt)
+        if attempt >= WORKER_RETRIES or time.monotonic() + delay >= deadline:
+            if failure is not None:
+                raise failure
+            return r
+        BACKGROUND.sleep(delay)
+        attempt += 1
+
+def check_and_bind_key(key):
+    """Vérifie la licence via le Worker Cloudflare et retourne tuple (ok, message, data).
+
+    En cas d'échec, data contient la réponse du Worker s'il a explicitement refusé la clé,
+    et None pour une erreur réseau/serveur (la clé locale ne doit alors pas être effacée).
+    """
+    import requests
+    hwid = get_hwid()
+    # Durée totale vue par l'utilisateur (reprises comprises) ; le détail par tentative est dans "worker.request"
+    with METRICS.span("worker.check"):
+        try:
+            r = worker_post({"license": key, "hwid": hwid})
+            r.raise_for_status()
+            data = r.json()
+
+            if not data.get("valid", False):
+                error_msg = data.get("error", "Erreur inconnue du Worker.")
+                return False, error_msg, data
+
+            return True, "activated" if data.get("hwid") == hwid else "already_bound", data
+
+        except requests.exceptions.HTTPError as http_err:
+            status_code = http_err.response.status_code
+            return False, f"Erreur de l'API: {status_code}. Vérifiez l'URL du Worker.", None
+        except requests.exceptions.ConnectionError:
+            return False, "Erreur de connexion réseau (Connexion refusée ou DNS échoué).", None
+        except requests.exceptions.Timeout:
+            return False, "Délai d'attente dépassé (Worker lent).", None
+        except requests.exceptions.InvalidJSONError: # Avant RequestException, dont elle hérite
+            return False, "Réponse invalide du Worker (JSON mal formé).", None
+        except requests.exceptions.RequestException as e:
+            return False, f"Erreur réseau générale: {e}", None
+        except ValueError:
+            return False, "Réponse invalide du Worker (JSON mal formé).", None
+        except OperationCancelled:
+            return False, "Opération annulée (fermeture de l'application).", None
+
+# À l'annulation, les connexions en cours sont coupées (la requête bloquée en lecture échoue et son
+# thread se termine) puis la session est fermée, ce qui libère les connexions du pool.
+BACKGROUND.add_cancel_hook(abort_worker_connections)
+BACKGROUND.add_cancel_hook(reset_worker_session)
+
+class NetworkWorker:
+    """Thread réseau unique et persistant pour tous les appels au Worker.
+
+    Un travail déjà en cours pour la même clé n'est pas relancé : le nouvel appelant est rattaché
+    au travail existant (coalescence). Les résultats sont déposés dans une seule file, relevée
+    par le thread Tk via deliver() ; les callbacks ne sont donc jamais appelés depuis le thread réseau.
+    Les résultats produits par d'autres threads (infos système, détection des cartes) empruntent la
+    même file via expect()/resolve(), ou post() pour un résultat que personne n'attend (lancement redirigé).
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._inflight = {} # clé du travail -> [callbacks]
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = BACKGROUND.spawn(self._run, "hako-network")
+            BACKGROUND.add_cancel_hook(lambda: self._jobs.put((None, None))) # Réveille le thread pour qu'il sorte
+
+    @property
+    def busy(self):
+        """True tant qu'un travail est en cours ou qu'un résultat attend d'être livré."""
+        with self._lock:
+            return bool(self._inflight) or not self._results.empty()
+
+    def submit(self, job_key, fn, callback=None):
+        """Exécute fn() dans le thread réseau puis livre callback(résultat) ; retourne False si coalescé."""
+        with self._lock:
+            if job_key in self._inflight:
+                if callback:
+                    self._inflight[job_key].append(callback)
+                return False
+            self._inflight[job_key] = [callback] if callback else []
+        self._jobs.put((job_key, fn))
+        return True
+
+    def expect(self, job_key, callback):
+        """Attend un résultat produit hors du thread réseau ; retourne False si job_key était déjà attendu.
+
+        Le producteur appelle resolve(job_key, résultat) depuis n'importe quel thread ; callback est
+        ensuite appelé par deliver(), dans le thread Tk. Tant que le résultat manque, busy reste vrai.
+        """
+        with self._lock:
+            first = job_key not in self._inflight
+            self._inflight.setdefault(job_key, []).append(callback)
+        return first
+
+    def post(self, callback, result):
+        """Dépose un résultat non sollicité (depuis n'importe quel thread) ; callback est appelé par deliver()."""
+        self._results.put((callback, result))
+
+    def resolve(self, job_key, result):
+        """Dépose le résultat attendu sous job_key (sans effet si personne ne l'attend plus)."""
+        with self._lock:
+            for callback in self._inflight.pop(job_key, []):
+                if callback:
+                    self._results.put((callback, result))
+
+    def verify_key(self, key, callback):
+        """Vérifie la clé via check_and_bind_key ; callback reçoit le tuple (ok, message, data)."""
+        def job():
+            try:
+                return check_and_bind_key(key)
+            except Exception as e:
+                return False, f"Erreur inattendue: {e}", None
+        return self.submit(("verify", key), job, callback)
+
+    def deliver(self):
+        """Appelle les callbacks des résultats disponibles (à appeler depuis le thread Tk)."""
+        while True:
+            try:
+                callback, result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            try: # Un callback en erreur ne bloque pas la livraison des suivants
+                callback(result)
+            except Exception as e:
+                print(f"Erreur lors de la livraison d'un résultat: {e}")
+
+    def _run(self):
+        while True:
+            job_key, fn = self._jobs.get()
+            if job_key is None or BACKGROUND.cancelled.is_set():
+                return
+            try:
+                result = fn()
+            except OperationCancelled:
+                return
+            except Exception as e:
+                print(f"Erreur dans le thread réseau ({job_key[0]}): {e}")
+                result, failed = None, True
+            else:
+                failed = False
+            # Sous verrou : un résultat n'est jamais "ni en cours ni en file" (voir busy)
+            if failed:
+                with self._lock:
+                    self._inflight.pop(job_key, None)
+            else:
+                self.resolve(job_key, result)
+
+# ============================
+# UTIL : Manifests esp-web-tools
+# ============================
+class ManifestError(ValueError):
+    """Manifest illisible ou ne respectant pas le format esp-web-tools (builds[].parts[].path/offset)."""
+
+def validate_manifest(data, source="manifest"):
+    """Valide un manifest esp-web-tools et le retourne sous forme normalisée.
+
+    chipFamily est reporté du manifest vers chaque build qui n'en déclare pas ; les parties sont triées
+    par offset et ne doivent pas partager le même offset.
+    """
+    if not isinstance(data, dict):
+        raise ManifestError(f"{source} : objet JSON attendu")
+    name = data.get("name")
+    if not isinstance(name, str) or not name:
+        raise ManifestError(f"{source} : champ 'name' manquant")
+    builds = data.get("builds")
+    if not isinstance(builds, list) or not builds:
+        raise ManifestError(f"{source} : aucun build")
+    normalized = []
+    for i, build in enumerate(builds):
+        if not isinstance(build, dict):
+            raise ManifestError(f"{source} : builds[{i}] invalide")
+        chip_family = build.get("chipFamily") or data.get("chipFamily")
+        if not isinstance(chip_family, str):
+            raise ManifestError(f"{source} : builds[{i}].chipFamily manquant")
+        parts = build.get("parts")
+        if not isinstance(parts, list) or not parts:
+            raise ManifestError(f"{source} : builds[{i}] sans parties")
+        checked = []
+        for j, part in enumerate(parts):
+            path = part.get("path") if isinstance(part, dict) else None
+            offset = part.get("offset") if isinstance(part, dict) else None
+            if not isinstance(path, str) or not path:
+                raise ManifestError(f"{source} : builds[{i}].parts[{j}].path manquant")
+            if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+                raise ManifestError(f"{source} : builds[{i}].parts[{j}].offset invalide")
+            checked.append(dict(part))
+        checked.sort(key=lambda part: part["offset"])
+        if len({part["offset"] for part in checked}) != len(checked):
+            raise ManifestError(f"{source} : builds[{i}] contient deux parties au même offset")
+        normalized.append(dict(build, chipFamily=chip_family, parts=checked))
+    version = data.get("version")
+    return dict(data, name=name, version=str(version) if version is not None else "", builds=normalized)
+
+class ManifestIndex:
+    """Index en mémoire des manifests locaux (manifest*.json), par nom de produit, famille de puce et version.
+
+    refresh() ne fait qu'un stat() par fichier : seuls les fichiers dont mtime/taille/ctime/inode ont changé
+    sont relus, et seuls ceux dont le SHA-256 a changé sont re-parsés. ctime et inode trahissent une écriture
+    même quand mtime est remis à l'identique ou que le fichier est remplacé ; un fichier lu moins de
+    MANIFEST_RACY_NS après sa modification est relu quand même (la date peut ne pas bouger à la réécriture
+    suivante). Les manifests invalides sont listés dans errors.
+    """
+
+    def __init__(self, directory=MANIFEST_DIR):
+        self.directory = directory
+        self.errors = {} # fichier -> message
+        self._files = {} # fichier -> ((mtime_ns, taille, ctime_ns, inode), lu à (ns), sha256, manifest ou None)
+        self._by_name = {}
+        self._by_chip = {}
+        self._by_version = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Met l'index à jour ; retourne le nombre de fichiers re-parsés."""
+        with self._lock:
+            try:
+                names = [name for name in os.listdir(self.directory)
+                         if name.startswith("manifest") and name.endswith(".json")]
+            except OSError:
+                names = []
+            parsed = 0
+            files = {}
+            for name in names:
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stamp = (st.st_mtime_ns, st.st_size, st.st_ctime_ns, st.st_ino)
+                entry = self._files.get(name)
+                if entry and entry[0] == stamp and entry[1] - st.st_mtime_ns > MANIFEST_RACY_NS:
+                    files[name] = entry
+                    continue
+                read_ns = time.time_ns()
+                try:
+                    with open(path, 'rb') as f:
+                        raw = f.read()
+                except OSError as e:
+                    self.errors[name] = str(e)
+                    continue
+                digest = hashlib.sha256(raw).hexdigest()
+                if entry and entry[2] == digest: # Fichier touché mais contenu identique
+                    files[name] = (stamp, read_ns, digest, entry[3])
+                    continue
+                parsed += 1
+                try:
+                    manifest = validate_manifest(json.loads(raw), name)
+                    manifest["file"] = name
+                    self.errors.pop(name, None)
+                except ValueError as e: # JSON invalide ou ManifestError
+                    manifest = None
+                    self.errors[name] = str(e)
+                files[name] = (stamp, read_ns, digest, manifest)
+            for name in [name for name in self.errors if name not in names]:
+                del self.errors[name] # Fichier supprimé
+            changed = parsed or set(files) != set(self._files)
+            self._files = files
+            if changed:
+                self._reindex()
+            return parsed
+
+    def manifests(self):
+        """Manifests valides, triés par nom de produit puis version."""
+        with self._lock:
+            return sorted((entry[3] for entry in self._files.values() if entry[3]),
+                          key=lambda manifest: (manifest["name"], manifest["version"]))
+
+    def get(self, file):
+        with self._lock:
+            entry = self._files.get(file)
+            return entry[3] if entry else None
+
+    def find(self, name=None, chip_family=None, version=None):
+        """Retourne les couples (manifest, build) correspondant aux critères donnés."""
+        with self._lock:
+            candidates = None
+            for key, table in ((name, self._by_name), (chip_family, self._by_chip), (version, self._by_version)):
+                if key is not None:
+                    matches = table.get(key, set())
+                    candidates = matches if candidates is None else candidates & matches
+            if candidates is None:
+                candidates = {(file, i) for entries in self._by_name.values() for file, i in entries}
+            result = []
+            for file, i in sorted(candidates):
+                manifest = self._files[file][3]
+                result.append((manifest, manifest["builds"][i]))
+            return result
+
+    def _reindex(self):
+        self._by_name, self._by_chip, self._by_version = {}, {}, {}
+        for file, entry in self._files.items():
+            manifest = entry[3]
+            if not manifest:
+                continue
+            for i, build in enumerate(manifest["builds"]):
+                self._by_name.setdefault(manifest["name"], set()).add((file, i))
+                self._by_chip.setdefault(build["chipFamily"], set()).add((file, i))
+                self._by_version.setdefault(manifest["version"], set()).add((file, i))
+
+MANIFESTS = ManifestIndex()
+
+def describe_build(build):
+    """Disposition d'un build en texte : une ligne par partie, 0xOFFSET  chemin."""
+    return "\n".join(f"0x{part['offset']:06X}  {part['path']}" for part in build["parts"])
+
+# ============================
+# UTIL : Validation des images ESP
+# ============================
+ESP_IMAGE_MAGIC = 0xE9
+ESP_CHECKSUM_SEED = 0xEF
+ESP_MAX_SEGMENTS = 16
+ESP_CHIP_IDS = {"ESP32": 0, "ESP32-S2": 2, "ESP32-C3": 5, "ESP32-S3": 9, "ESP32-C2": 12, "ESP32-C6": 13, "ESP32-H2": 16}
+PARTITION_TABLE_OFFSET = 0x8000
+PARTITION_MAGIC = b"\xaa\x50"
+PARTITION_MD5_MAGIC = b"\xeb\xeb"
+
+class ImageError(ValueError):
+    """Image firmware tronquée ou corrompue (en-tête, segments, somme de contrôle, SHA-256)."""
+
+XOR_CHUNK = 64 * 1024 # Largeur (octets) des entiers accumulés par xor_bytes
+
+def xor_bytes(view, seed=0):
+    """XOR de tous les octets de view : tranches memoryview de XOR_CHUNK lues en entiers et cumulées,
+    puis un seul repli de l'accumulateur jusqu'à un octet."""
+    acc = 0
+    for start in range(0, len(view), XOR_CHUNK):
+        acc ^= int.from_bytes(view[start:start + XOR_CHUNK], "little")
+    width = XOR_CHUNK
+    while width > 1:
+        width //= 2
+        acc = (acc >> (8 * width)) ^ (acc & ((1 << (8 * width)) - 1))
+    return seed ^ acc
+
+def check_esp_image(view, offset=0, chip_family=None):
+    """Vérifie l'image ESP commençant à offset dans view (memoryview) ; retourne sa description.
+
+    En-tête de 24 octets (magic 0xE9, nombre de segments, en-tête étendu avec chip_id et hash_appended),
+    segments (adresse, longueur, données), octet de contrôle (XOR des données, graine 0xEF) aligné
+    sur 16 octets, puis SHA-256 de l'image si hash_appended.
+    """
+    header = bytes(view[offset:offset + 24]) # Petites copies seulement : aucune tranche ne doit survivre au mmap
+    if len(header) < 24:
+        raise ImageError(f"0x{offset:X} : en-tête tronqué")
+    if header[0] != ESP_IMAGE_MAGIC:
+        raise ImageError(f"0x{offset:X} : magic 0x{header[0]:02X} au lieu de 0xE9")
+    segment_count = header[1]
+    entry, = struct.unpack_from("<I", header, 4)
+    chip_id, = struct.unpack_from("<H", header, 12)
+    hash_appended = header[23] == 1
+    if not 0 < segment_count <= ESP_MAX_SEGMENTS:
+        raise ImageError(f"0x{offset:X} : nombre de segments invalide ({segment_count})")
+    if chip_family in ESP_CHIP_IDS and chip_id != ESP_CHIP_IDS[chip_family]:
+        raise ImageError(f"0x{offset:X} : image pour chip_id {chip_id}, pas {chip_family}")
+
+    position = offset + 24
+    checksum = ESP_CHECKSUM_SEED
+    for i in range(segment_count):
+        if position + 8 > len(view):
+            raise ImageError(f"0x{offset:X} : segment {i} tronqué")
+        load_addr, length = struct.unpack_from("<II", view, position)
+        position += 8
+        if position + length > len(view):
+            raise ImageError(f"0x{offset:X} : segment {i} tronqué ({length} octets à 0x{load_addr:08X})")
+        checksum = xor_bytes(view[position:position + length], checksum)
+        position += length
+    position += 15 - (position % 16) # L'octet de contrôle termine un bloc de 16 octets
+    if position >= len(view):
+        raise ImageError(f"0x{offset:X} : somme de contrôle absente (image tronquée)")
+    if view[position] != checksum:
+        raise ImageError(f"0x{offset:X} : somme de contrôle 0x{view[position]:02X} au lieu de 0x{checksum:02X}")
+    end = position + 1
+    if hash_appended:
+        digest = bytes(view[end:end + 32])
+        if len(digest) < 32:
+            raise ImageError(f"0x{offset:X} : SHA-256 annoncé mais absent (image tronquée)")
+        if hashlib.sha256(view[offset:end]).digest() != digest:
+            raise ImageError(f"0x{offset:X} : SHA-256 de l'image invalide")
+        end += 32
+    return {"offset": offset, "entry": entry, "segments": segment_count, "size": end - offset, "sha256": hash_appended}
+
+def read_partition_table(view, offset=PARTITION_TABLE_OFFSET):
+    """Lit la table de partitions à offset ; retourne [{type, subtype, offset, size, label}] (MD5 vérifié si présent)."""
+    partitions = []
+    position = offset
+    while position + 32 <= len(view):
+        entry = bytes(view[position:position + 32])
+        if entry[:2] == PARTITION_MD5_MAGIC:
+            if hashlib.md5(view[offset:position]).digest() != entry[16:32]:
+                raise ImageError(f"0x{offset:X} : MD5 de la table de partitions invalide")
+            break
+        if entry[:2] != PARTITION_MAGIC:
+            break
+        kind, subtype, part_offset, size = struct.unpack_from("<BBII", entry, 2)
+        label = entry[12:28].split(b"\0", 1)[0].decode("ascii", "replace")
+        partitions.append({"type": kind, "subtype": subtype, "offset": part_offset, "size": size, "label": label})
+        position += 32
+    if not partitions:
+        raise ImageError(f"0x{offset:X} : table de partitions absente ou corrompue")
+    return partitions
+
+def validate_firmware_part(path, flash_offset=0, chip_family=None):
+    """Valide une partie de manifest sur place (mmap, tranches sans copie) ; retourne un rapport avec sa durée.
+
+    Offset 0 : bootloader, ou image fusionnée (bootloader + table de partitions + applications présentes).
+    Offset 0x8000 : table de partitions. Ailleurs : image applicative si elle commence par 0xE9, sinon
+    partition de données (SHA-256 seul).
+    """
+    import mmap
+    started = time.perf_counter()
+    report = {"path": path, "offset": flash_offset, "ok": False, "error": None, "images": [], "partitions": 0}
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                raise ImageError("fichier vide")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    report["sha256"] = hashlib.sha256(view).hexdigest()
+                    if flash_offset == PARTITION_TABLE_OFFSET:
+                        report["partitions"] = len(read_partition_table(view, 0))
+                    elif flash_offset == 0 or view[0] == ESP_IMAGE_MAGIC:
+                        report["images"].append(check_esp_image(view, 0, chip_family))
+                        if flash_offset == 0 and size > PARTITION_TABLE_OFFSET + 32: # Image fusionnée
+                            table = read_partition_table(view)
+                            report["partitions"] = len(table)
+                            for partition in table:
+                                start = partition["offset"] - flash_offset
+                                if partition["type"] == 0 and start < size and view[start] == ESP_IMAGE_MAGIC:
+                                    report["images"].append(check_esp_image(view, start, chip_family))
+                    report["ok"] = True
+                finally:
+                    view.release()
+    except (OSError, ValueError) as e:
+        report["error"] = str(e)
+    report["ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+def validate_firmware_parts(parts, chip_family=None):
+    """Valide plusieurs parties [(chemin, offset)] l'une après l'autre.
+
+    Pas de pool de processus : un firmware réel pèse quelques Mo (validé en quelques ms), et forker
+    le processus de l'interface pendant que ses threads tournent n'est pas sûr.
+    """
+    total = sum(os.path.getsize(path) for path, _ in parts if os.path.exists(path))
+    with METRICS.span("firmware.validate", parts=len(parts), bytes=total):
+        return [validate_firmware_part(path, offset, chip_family) for path, offset in parts]
+
+
+# ============================
+# UTIL : Image flash fusionnée
+# ============================
+FLASH_SECTOR_SIZE = 4096
+ERASED_SECTOR = b"\xff" * FLASH_SECTOR_SIZE
+
+def sector_runs(sectors):
+    """Compacte une liste triée d'indices de secteurs en plages [[premier, nombre], ...]."""
+    runs = []
+    for sector in sectors:
+        if runs and runs[-1][0] + runs[-1][1] == sector:
+            runs[-1][1] += 1
+        else:
+            runs.append([sector, 1])
+    return runs
+
+def build_merged_image(parts, out_path, flash_size=None, sparse=False):
+    """Fusionne des parties [(offset, chemin)] en une seule image flash, les trous étant remplis de 0xFF.
+
+    L'image est écrite via mmap dans un fichier temporaire puis renommée. Elle s'arrête à la fin de
+    la dernière partie (la flash au-delà est déjà effacée) sauf si flash_size est donné. Une carte des
+    secteurs de 4 Ko contenant autre chose que 0xFF est écrite à côté (<image>.blockmap.json) :
+    les outils de flash peuvent ignorer tous les autres secteurs.
+
+    sparse=True ne remplit que les bouts de trous partagés avec un secteur de partie : les secteurs
+    entièrement vides restent des trous du fichier creux (seuls les secteurs utiles occupent le disque).
+    Ces trous se relisent comme 0x00, pas 0xFF : une image creuse ne doit jamais être flashée telle
+    quelle, mais lue à travers la carte (iter_image pour l'image complète, iter_data_sectors sinon).
+    Par défaut l'image est complète, car elle sert aussi aux outils externes (esptool write_flash 0x0).
+    """
+    import mmap
+    layout = []
+    for offset, path in sorted(parts):
+        size = os.path.getsize(path)
+        if layout and offset < layout[-1][0] + layout[-1][2]:
+            previous = layout[-1]
+            raise ManifestError(f"la partie à 0x{offset:X} chevauche celle à 0x{previous[0]:X} (fin 0x{previous[0] + previous[2]:X})")
+        layout.append((offset, path, size))
+    if not layout:
+        raise ManifestError("aucune partie à fusionner")
+    end = layout[-1][0] + layout[-1][2]
+    image_size = max(end, flash_size or 0)
+    if image_size == 0:
+        raise ManifestError("parties vides")
+    if flash_size and end > flash_size:
+        raise ManifestError(f"les parties dépassent la taille de flash (0x{end:X} > 0x{flash_size:X})")
+
+    started = time.perf_counter()
+    data_sectors = set()
+    tmp_path = out_path + ".tmp"
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(tmp_path, 'w+b') as out:
+        out.truncate(image_size)
+        with mmap.mmap(out.fileno(), image_size) as mapped:
+            position = 0
+            for offset, path, size in layout + [(image_size, None, 0)]:
+                # Trou : 0xFF (état de la flash effacée) ; en mode creux, seulement dans les secteurs partagés
+                gaps = [(position, offset)]
+                if sparse:
+                    gaps = [(position, min(offset, -(-position // FLASH_SECTOR_SIZE) * FLASH_SECTOR_SIZE)),
+                            (max(position, offset // FLASH_SECTOR_SIZE * FLASH_SECTOR_SIZE), offset)]
+                for start, stop in gaps:
+                    fill = b"\xff" * min(stop - start, 1024 * 1024)
+                    while start < stop:
+                        count = min(len(fill), stop - start)
+                        mapped[start:start + count] = fill[:count]
+                        start += count
+                if path is None or size == 0:
+                    continue
+                with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                    mapped[offset:offset + size] = source
+                position = offset + size
+                # Secteurs touchés par la partie : seuls ceux qui ne sont pas entièrement à 0xFF comptent
+                for sector in range(offset // FLASH_SECTOR_SIZE, -(-position // FLASH_SECTOR_SIZE)):
+                    start = sector * FLASH_SECTOR_SIZE
+                    if mapped[start:start + FLASH_SECTOR_SIZE] != ERASED_SECTOR[:min(FLASH_SECTOR_SIZE, image_size - start)]:
+                        data_sectors.add(sector)
+            mapped.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, out_path)
+
+    block_map = {"sector_size": FLASH_SECTOR_SIZE, "image_size": image_size, "sparse": sparse,
+                 "data_sectors": sector_runs(sorted(data_sectors)),
+                 "parts": [{"offset": offset, "path": os.path.basename(path), "size": size} for offset, path, size in layout]}
+    atomic_write(out_path + ".blockmap.json", json.dumps(block_map, separators=(",", ":")).encode("utf-8"))
+    METRICS.record("span", "firmware.merge", (time.perf_counter() - started) * 1000,
+                   bytes=image_size, data_sectors=len(data_sectors))
+    return dict(block_map, path=out_path)
+
+def load_block_map(image_path):
+    """Carte des secteurs écrite par build_merged_image, ou None si absente."""
+    try:
+        with open(image_path + ".blockmap.json", 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+def iter_data_sectors(image_path, block_map=None, run_sectors=16):
+    """Parcourt les plages de secteurs utiles d'une image fusionnée : (offset, données) par blocs de run_sectors."""
+    block_map = block_map or load_block_map(image_path)
+    sector_size = block_map["sector_size"] if block_map else FLASH_SECTOR_SIZE
+    with open(image_path, 'rb') as f:
+        runs = block_map["data_sectors"] if block_map else [[0, -(-os.fstat(f.fileno()).st_size // sector_size)]]
+        for first, count in runs:
+            for sector in range(first, first + count, run_sectors):
+                f.seek(sector * sector_size)
+                yield sector * sector_size, f.read(min(run_sectors, first + count - sector) * sector_size)
+
+def iter_image(image_path, block_map=None, run_sectors=16):
+    """Parcourt l'image complète (offset, données) : les secteurs hors de la carte sont rendus à 0xFF.
+
+    Seule lecture correcte d'une image creuse ; pour une image complète, équivaut à lire le fichier.
+    """
+    block_map = block_map or load_block_map(image_path)
+    if not block_map:
+        yield from iter_data_sectors(image_path, None, run_sectors)
+        return
+    step = run_sectors * block_map["sector_size"]
+    position = 0
+    for offset, data in iter_data_sectors(image_path, block_map, run_sectors):
+        while position < offset:
+            count = min(step, offset - position)
+            yield position, b"\xff" * count
+            position += count
+        yield offset, data
+        position = offset + len(data)
+    while position < block_map["image_size"]:
+        count = min(step, block_map["image_size"] - position)
+        yield position, b"\xff" * count
+        position += count
+
+
+# ============================
+# UTIL : Téléchargement du firmware
+# ============================
+class DownloadError(Exception):
+    """Téléchargement impossible ou contenu invalide (taille, SHA-256, fichier modifié sur le serveur)."""
+
+def new_download_session(connections=DOWNLOAD_CONNECTIONS):
+    """Session HTTP dédiée aux téléchargements (pool dimensionné pour les connexions parallèles)."""
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def http_get(session, url, headers=None, cancelled=None):
+    """GET en flux avec reprises (même politique de backoff que le Worker) ; lève DownloadError sur 4xx/5xx."""
+    import requests
+    attempt = 0
+    while True:
+        BACKGROUND.check()
+        if cancelled is not None and cancelled.is_set():
+            raise OperationCancelled()
+        try:
+            response = session.get(url, headers=headers or {}, stream=True, timeout=DOWNLOAD_TIMEOUT_S)
+            if response.status_code not in WORKER_RETRY_STATUSES:
+                if response.status_code >= 400:
+                    response.close()
+                    raise DownloadError(f"HTTP {response.status_code} pour {url}")
+                return response
+            response.close()
+            error = DownloadError(f"HTTP {response.status_code} pour {url}")
+        except requests.exceptions.RequestException as e:
+            if cancelled is not None and cancelled.is_set():
+                raise OperationCancelled()
+            error = e
+        if attempt >= DOWNLOAD_RETRIES:
+            raise error
+        BACKGROUND.sleep(backoff_delay(attempt))
+        attempt += 1
+
+class ChunkedDownloader:
+    """Télécharge une URL par plages HTTP (Range) sur plusieurs connexions, avec reprise.
+
+    Le fichier est écrit dans <path>.part ; <path>.part.json liste les blocs terminés pour reprendre
+    après une interruption. Le SHA-256 est calculé pendant le flux, dans l'ordre des blocs : les blocs
+    arrivés en avance restent en mémoire (fenêtre bornée), les blocs d'une session précédente sont relus
+    une seule fois. Si le serveur ignore Range, le fichier est téléchargé d'un seul tenant.
+    """
+
+    def __init__(self, url, path, connections=DOWNLOAD_CONNECTIONS, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                 expected_sha256=None, session=None):
+        self.url = url
+        self.path = path
+        self.part_path = path + ".part"
+        self.state_path = path + ".part.json"
+        self.connections = max(1, connections)
+        self.chunk_size = chunk_size
+        self.expected_sha256 = expected_sha256
+        self.session = session
+        self.total = None
+        self.done_bytes = 0
+        self.resumed_bytes = 0
+        self.started = None
+        self._cancelled = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def progress(self):
+        """(octets reçus, taille totale ou None, débit en octets/s de la session courante)."""
+        done, elapsed = self.done_bytes, time.perf_counter() - (self.started or time.perf_counter())
+        rate = (done - self.resumed_bytes) / elapsed if elapsed > 0 else 0.0
+        return done, self.total, rate
+
+    def cancel(self):
+        """Interrompt le téléchargement ; les blocs terminés sont conservés pour la reprise."""
+        self._cancelled.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def check(self):
+        BACKGROUND.check()
+        if self._cancelled.is_set():
+            raise OperationCancelled()
+
+    def run(self):
+        """Télécharge (ou reprend) le fichier ; retourne {path, size, sha256, resumed_bytes, ms}."""
+        own_session = self.session is None
+        session = self.session or new_download_session(self.connections)
+        BACKGROUND.add_cancel_hook(session.close) # Débloque les lectures en cours à la fermeture
+        self.started = time.perf_counter()
+        try:
+            with METRICS.span("firmware.download", url=self.url) as span:
+                size, validator = self._probe(session)
+                if size is None or validator is False:
+                    self.total = size
+                    digest = self._run_single(session)
+                else:
+                    digest = self._run_ranges(session, size, validator)
+                if self.expected_sha256 and digest != self.expected_sha256.lower():
+                    self._discard()
+                    raise DownloadError(f"SHA-256 invalide pour {os.path.basename(self.path)}")
+                os.replace(self.part_path, self.path)
+                self._remove(self.state_path)
+                span.update(bytes=self.done_bytes, resumed=self.resumed_bytes)
+            return {"path": self.path, "size": self.done_bytes, "sha256": digest,
+                    "resumed_bytes": self.resumed_bytes, "ms": (time.perf_counter() - self.started) * 1000}
+        finally:
+            BACKGROUND.remove_cancel_hook(session.close)
+            if own_session:
+                session.close()
+
+    def _probe(self, session):
+        """Retourne (taille, validateur) : validateur False si Range n'est pas supporté."""
+        response = self._request(session, {"Range": "bytes=0-0"})
+        with response:
+            if response.status_code == 206:
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit():
+                    return int(total), response.headers.get("ETag") or response.headers.get("Last-Modified") or ""
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), False
+
+    def _request(self, session, headers):
+        return http_get(session, self.url, headers, self._cancelled)
+
+    def _run_single(self, session):
+        """Téléchargement d'un seul tenant (pas de Range) : pas de reprise possible."""
+        self._remove(self.state_path)
+        hasher = hashlib.sha256()
+        self.done_bytes = self.resumed_bytes = 0
+        os.makedirs(os.path.dirname(self.part_path) or ".", exist_ok=True)
+        with self._request(session, {}) as response, open(self.part_path, 'wb') as f:
+            for data in response.iter_content(DOWNLOAD_READ_SIZE):
+                self.check()
+                f.write(data)
+                hasher.update(data)
+                self.done_bytes += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if self.total is not None and self.done_bytes != self.total:
+            raise DownloadError(f"Taille inattendue pour {self.url}")
+        self.total = self.done_bytes
+        return hasher.hexdigest()
+
+    def _run_ranges(self, session, size, validator):
+        self.total = size
+        count = max(1, -(-size // self.chunk_size))
+        done = self._load_state(size, validator)
+        os.makedirs(os.path.dirname(self.part_path) or ".", exist_ok=True)
+        if not done or not os.path.exists(self.part_path):
+            done = set()
+            with open(self.part_path, 'wb') as f:
+                f.truncate(size)
+        self.resumed_bytes = self.done_bytes = sum(self._chunk_range(i, size)[1] for i in done)
+
+        self._todo = deque(i for i in range(count) if i not in done)
+        self._ready = dict.fromkeys(done) # index -> bytes en mémoire, ou None (à relire depuis le disque)
+        self._next = 0
+        self._error = None
+        self._done = set(done)
+        self._file_lock = threading.Lock()
+
+        with open(self.part_path, 'r+b') as f:
+            self._file = f
+            try:
+                return self._hash_in_order(f, session, size, validator, count)
+            finally:
+                self._cancelled.set() # Libère les connexions restantes (erreur, annulation ou fin)
+                with self._cond:
+                    self._cond.notify_all()
+
+    def _hash_in_order(self, f, session, size, validator, count):
+        """Lance les connexions puis hache les blocs dans l'ordre, au fur et à mesure de leur arrivée."""
+        window = self.connections * 2 # Blocs en avance de la position du hachage
+        for n in range(min(self.connections, len(self._todo))):
+            BACKGROUND.spawn(lambda: self._fetch_loop(session, size, validator, window), f"hako-download-{n}")
+        hasher = hashlib.sha256()
+        while self._next < count:
+            with self._cond:
+                while self._next not in self._ready and self._error is None and not self._cancelled.is_set():
+                    self._cond.wait(0.5)
+                    BACKGROUND.check()
+                if self._error is not None:
+                    raise self._error
+                self.check()
+                data = self._ready.pop(self._next)
+            if data is None:
+                offset, length = self._chunk_range(self._next, size)
+                with self._file_lock:
+                    f.seek(offset)
+                    data = f.read(length)
+            hasher.update(data)
+            with self._cond:
+                self._next += 1
+                self._cond.notify_all()
+        f.flush()
+        os.fsync(f.fileno())
+        return hasher.hexdigest()
+
+    def _chunk_range(self, index, size):
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, size - offset)
+
+    def _fetch_loop(self, session, size, validator, window):
+        try:
+            while True:
+                with self._cond:
+                    while (self._todo and self._todo[0] >= self._next + window
+                           and self._error is None and not self._cancelled.is_set()):
+                        self._cond.wait(0.5)
+                    if not self._todo or self._error is not None:
+                        return
+                    index = self._todo.popleft()
+                self.check()
+                data = self._fetch_chunk(session, index, size, validator)
+                offset, _ = self._chunk_range(index, size)
+                with self._file_lock:
+                    self._file.seek(offset)
+                    self._file.write(data)
+                    # Sur disque avant d'être déclaré terminé : après une coupure de courant, un bloc listé
+                    # dans l'état de reprise n'est jamais un trou de zéros dans le .part
+                    self._file.flush()
+                    getattr(os, "fdatasync", os.fsync)(self._file.fileno())
+                with self._cond:
+                    self._done.add(index)
+                    self._ready[index] = data
+                    self._save_state(size, validator)
+                    self._cond.notify_all()
+        except BaseException as e:
+            with self._cond:
+                if self._error is None:
+                    self._error = e
+                self._cond.notify_all()
+
+    def _fetch_chunk(self, session, index, size, validator):
+        """Télécharge un bloc ; une coupure en cours de lecture relance le bloc entier (avec backoff)."""
+        import requests
+        offset, length = self._chunk_range(index, size)
+        headers = {"Range": f"bytes={offset}-{offset + length - 1}"}
+        if validator:
+            headers["If-Range"] = validator # Fichier modifié entre-temps : le serveur répond 200
+        attempt = 0
+        while True:
+            buf = bytearray()
+            try:
+                with self._request(session, headers) as response:
+                    if response.status_code != 206:
+                        self._discard()
+                        raise DownloadError(f"{os.path.basename(self.path)} a changé sur le serveur : téléchargement à relancer")
+                    for data in response.iter_content(DOWNLOAD_READ_SIZE):
+                        self.check()
+                        buf += data
+                        with self._cond:
+                            self.done_bytes += len(data)
+                if len(buf) == length:
+                    return bytes(buf)
+                error = DownloadError(f"Bloc {index} incomplet ({len(buf)}/{length} octets)")
+            except requests.exceptions.RequestException as e:
+                if self._cancelled.is_set():
+                    raise OperationCancelled()
+                error = e
+            finally:
+                if len(buf) != length:
+                    with self._cond:
+                        self.done_bytes -= len(buf)
+            if attempt >= DOWNLOAD_RETRIES:
+                raise error
+            BACKGROUND.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def _load_state(self, size, validator):
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (IOError, ValueError):
+            return set()
+        if (not isinstance(state, dict) or state.get("url") != self.url or state.get("size") != size
+                or state.get("validator") != validator or state.get("chunk_size") != self.chunk_size):
+            return set()
+        return set(state.get("done", []))
+
+    def _save_state(self, size, validator):
+        state = {"url": self.url, "size": size, "validator": validator,
+                 "chunk_size": self.chunk_size, "done": sorted(self._done)}
+        try:
+            atomic_write(self.state_path, json.dumps(state, separators=(",", ":")).encode("utf-8"))
+        except OSError as e:
+            print(f"Avertissement: état de reprise non sauvegardé ({e})")
+
+    def _discard(self):
+        for path in (self.part_path, self.state_path):
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class FirmwareCache:
+    """Cache local des images firmware, adressé par contenu et borné en taille (éviction LRU).
+
+    Les images sont stockées sous objects/<sha256> ; index.json associe (manifest, version, partie)
+    au SHA-256 et garde la taille et la date de dernier usage de chaque image. Une réinstallation ou un
+    retour à une version déjà téléchargée est servi depuis le disque. hits/misses alimentent le diagnostic.
+    Un accès ne fait que marquer l'image en mémoire : last_used est écrit avec la prochaine modification
+    de l'index, ou par flush() à la fermeture.
+    """
+
+    def __init__(self, root=FIRMWARE_CACHE_DIR, max_bytes=FIRMWARE_CACHE_MAX_BYTES):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._dirty = False # last_used modifié depuis la dernière écriture de l'index
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(manifest_name, version, part_path):
+        return f"{manifest_name}|{version}|{part_path}"
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry["size"] for entry in self._load()["objects"].values())
+
+    def lookup(self, manifest_name, version, part_path, sha256=None):
+        """Chemin de l'image en cache pour cette partie (ou ce SHA-256), sinon None."""
+        with self._lock:
+            index = self._load()
+            if sha256 is None and version:
+                sha256 = index["keys"].get(self.key(manifest_name, version, part_path))
+            entry = index["objects"].get(sha256) if sha256 else None
+            path = self.object_path(sha256) if entry else None
+            if path and os.path.isfile(path) and os.path.getsize(path) == entry["size"]:
+                entry["last_used"] = time.time() # Écrit plus tard : pas d'écriture disque sur un accès
+                self._dirty = True
+                self.hits += 1
+                return path
+            if entry: # Image supprimée hors du launcher : l'entrée est obsolète
+                index["objects"].pop(sha256, None)
+                self._save()
+            self.misses += 1
+            return None
+
+    def store(self, manifest_name, version, part_path, file_path, sha256):
+        """Déplace une image téléchargée (SHA-256 déjà vérifié) dans le cache et retourne son chemin."""
+        with self._lock:
+            index = self._load()
+            os.makedirs(self.objects_dir, exist_ok=True)
+            path = self.object_path(sha256)
+            os.replace(file_path, path)
+            index["objects"][sha256] = {"size": os.path.getsize(path), "last_used": time.time()}
+            if version:
+                index["keys"][self.key(manifest_name, version, part_path)] = sha256
+            self._evict(keep=sha256)
+            self._save()
+            return path
+
+    def path_for(self, manifest_name, version, part_path):
+        """Chemin en cache de cette partie pour cette version, sans toucher aux compteurs ni à l'ordre LRU."""
+        with self._lock:
+            index = self._load()
+            sha256 = index["keys"].get(self.key(manifest_name, version, part_path))
+            path = self.object_path(sha256) if sha256 in index["objects"] else None
+            return path if path and os.path.isfile(path) else None
+
+    def newest(self, manifest_name, part_path):
+        """Chemin de la version la plus récemment utilisée de cette partie (base d'une mise à jour différentielle)."""
+        with self._lock:
+            index = self._load()
+            candidates = [sha256 for key, sha256 in index["keys"].items()
+                          if key.startswith(manifest_name + "|") and key.endswith("|" + part_path)]
+            candidates = [sha256 for sha256 in candidates
+                          if sha256 in index["objects"] and os.path.isfile(self.object_path(sha256))]
+            if not candidates:
+                return None
+            return self.object_path(max(candidates, key=lambda sha256: index["objects"][sha256]["last_used"]))
+
+    def discard(self, sha256):
+        """Retire une image du cache (ex. image invalide)."""
+        with self._lock:
+            index = self._load()
+            if index["objects"].pop(sha256, None) is None:
+                return
+            index["keys"] = {key: value for key, value in index["keys"].items() if value != sha256}
+            try:
+                os.remove(self.object_path(sha256))
+            except OSError:
+                pass
+            self._save()
+
+    def flush(self):
+        """Écrit l'index si des dates de dernier usage n'ont pas encore été enregistrées."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _evict(self, keep):
+        """Supprime les images les moins récemment utilisées jusqu'à repasser sous max_bytes."""
+        objects = self._index["objects"]
+        total = sum(entry["size"] for entry in objects.values())
+        for sha256, entry in sorted(objects.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            try:
+                os.remove(self.object_path(sha256))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Avertissement: éviction impossible ({sha256[:12]}): {e}")
+                continue
+            del objects[sha256]
+            total -= entry["size"]
+        self._index["keys"] = {key: sha256 for key, sha256 in self._index["keys"].items() if sha256 in objects}
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    index = json.load(f)
+            except (IOError, ValueError):
+                index = None
+            if not isinstance(index, dict) or not isinstance(index.get("objects"), dict):
+                index = {"objects": {}, "keys": {}}
+            index.setdefault("keys", {})
+            self._index = index
+        return self._index
+
+    def _save(self):
+        try:
+            atomic_write(self.index_path, json.dumps(self._index, separators=(",", ":")).encode("utf-8"))
+            self._dirty = False
+        except OSError as e:
+            print(f"Avertissement: index du cache firmware non sauvegardé ({e})")
+
+FIRMWARE_CACHE = FirmwareCache()
+BACKGROUND.add_cancel_hook(FIRMWARE_CACHE.flush) # Dates de dernier usage des accès en cache
+
+def fetch_firmware_manifest(name, base_url=FIRMWARE_BASE_URL, session=None):
+    """Télécharge un manifest esp-web-tools (ex. manifest.json) depuis le site du firmware."""
+    from urllib.parse import urljoin
+    own_session = session is None
+    session = session or new_download_session(1)
+    try:
+        response = session.get(urljoin(base_url, name), timeout=DOWNLOAD_TIMEOUT_S)
+        response.raise_for_status()
+        return response.json()
+    finally:
+        if own_session:
+            session.close()
+
+class FirmwareDownload:
+    """Télécharge toutes les parties d'un manifest dans un thread d'arrière-plan suivi.
+
+    L'interface relève l'état (status_text, finished, result, error) depuis le thread Tk.
+    """
+
+    def __init__(self, manifest_name, base_url=FIRMWARE_BASE_URL, dest_dir=DOWNLOAD_DIR,
+                 connections=DOWNLOAD_CONNECTIONS, cache=FIRMWARE_CACHE):
+        self.manifest_name = manifest_name
+        self.cache = cache
+        self.base_url = base_url
+        self.dest_dir = dest_dir
+        self.connections = connections
+        self.parts = []
+        self.index = 0
+        self.current = None
+        self.result = None
+        self.merged = None # Image fusionnée + carte des secteurs (builds à plusieurs parties)
+        self.chip_family = None
+        self.error = None
+        self.finished = threading.Event()
+        self._cancelled = False
+
+    def start(self):
+        BACKGROUND.spawn(self._run, "hako-download")
+        return self
+
+    def cancel(self):
+        self._cancelled = True
+        if self.current:
+            self.current.cancel()
+
+    @property
+    def status_text(self):
+        """Texte d'avancement : partie, pourcentage et débit."""
+        if self.current is None:
+            return "Vérification des images..." if self.parts else "Lecture du manifest..."
+        done, total, rate = self.current.progress
+        percent = f"{done * 100 // total} %" if total else f"{done / 1e6:.1f} Mo"
+        return (f"Partie {self.index + 1}/{len(self.parts)} : {os.path.basename(self.current.path)} — "
+                f"{percent} — {rate / 1e6:.1f} Mo/s")
+
+    def _fetch_delta(self, url, path, part, session):
+        """Reconstruit la partie depuis la version en cache la plus récente si un index de blocs est publié.
+
+        Retourne None (téléchargement complet) s'il n'y a ni version précédente, ni index, ou si la
+        reconstruction échoue.
+        """
+        old_path = self.cache.newest(self.manifest_name, part["path"]) if self.cache else None
+        if old_path is None:
+            return None
+        index = fetch_block_index(url, session)
+        if index is None:
+            return None
+        if index["sha256"] == os.path.basename(old_path): # Contenu inchangé : seule la version a changé
+            return {"path": old_path, "size": index["size"], "sha256": index["sha256"], "resumed_bytes": 0,
+                    "ms": 0.0, "downloaded_bytes": 0, "reused_bytes": index["size"]}
+        self.current = DeltaDownloader(url, path, old_path, index, part.get("sha256"), session)
+        if self._cancelled:
+            self.current.cancel()
+        try:
+            return self.current.run()
+        except DownloadError as e:
+            print(f"Mise à jour différentielle abandonnée ({e}) : téléchargement complet")
+            return None
+
+    def _validate(self, results, chip_family):
+        """Vérifie le format ESP de chaque partie avant toute installation ; une image invalide quitte le cache."""
+        reports = validate_firmware_parts([(result["path"], result["offset"]) for result in results], chip_family)
+        for part, result, report in zip(self.parts, results, reports):
+            result["validation"] = report
+            if not report["ok"]:
+                if self.cache:
+                    self.cache.discard(result["sha256"])
+                raise ImageError(f"{part['path']} : {report['error']}")
+
+    def _run(self):
+        from urllib.parse import urljoin
+        try:
+            session = new_download_session(self.connections)
+            try:
+                manifest = validate_manifest(fetch_firmware_manifest(self.manifest_name, self.base_url, session),
+                                             self.manifest_name)
+                build = manifest["builds"][0]
+                self.parts = build["parts"]
+                self.chip_family = build["chipFamily"]
+                results = []
+                for index, part in enumerate(self.parts):
+                    self.index = index
+                    if self._cancelled:
+                        raise OperationCancelled()
+                    version = manifest.get("version")
+                    cached = self.cache and self.cache.lookup(self.manifest_name, version, part["path"], part.get("sha256"))
+                    if cached:
+                        results.append({"path": cached, "size": os.path.getsize(cached), "sha256": os.path.basename(cached),
+                                        "resumed_bytes": 0, "ms": 0.0, "cached": True, "offset": part.get("offset", 0)})
+                        continue
+                    path = os.path.join(self.dest_dir, os.path.basename(part["path"]))
+                    url = urljoin(self.base_url, part["path"])
+                    result = self._fetch_delta(url, path, part, session)
+                    if result is None:
+                        self.current = ChunkedDownloader(url, path, self.connections,
+                                                         expected_sha256=part.get("sha256"), session=session)
+                        if self._cancelled: # cancel() peut arriver entre la création et l'affectation
+                            self.current.cancel()
+                        result = self.current.run()
+                    if self.cache:
+                        result["path"] = self.cache.store(self.manifest_name, version, part["path"], result["path"], result["sha256"])
+                    result["cached"] = False
+                    result["offset"] = part.get("offset", 0)
+                    results.append(result)
+                self.current = None
+                self._validate(results, build["chipFamily"])
+                if len(results) > 1 or results[0]["offset"] != 0: # Une seule partie à 0x0 est déjà l'image complète
+                    stem = os.path.splitext(os.path.basename(self.manifest_name))[0]
+                    self.merged = build_merged_image([(result["offset"], result["path"]) for result in results],
+                                                     os.path.join(self.dest_dir, f"{stem}-{manifest['version']}.merged.bin"))
+                self.result = results
+            finally:
+                session.close()
+        except OperationCancelled:
+            self.error = OperationCancelled("Téléchargement interrompu (reprise possible)")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+# ============================
+# UTIL : Mises à jour différentielles
+# ============================
+def weak_checksum(block):
+    """Somme glissante type rsync (a | b << 16) d'un bloc ; calculée en C via sum/accumulate."""
+    from itertools import accumulate
+    return (sum(block) & 0xFFFF) | ((sum(accumulate(block)) & 0xFFFF) << 16)
+
+def strong_checksum(block):
+    return hashlib.sha256(block).hexdigest()[:16]
+
+def make_block_index(path, block_size=DELTA_BLOCK_SIZE):
+    """Index de blocs d'une image (à publier à côté du .bin sous <image>.blocks.json).
+
+    Il permet à un client qui possède une version précédente de ne télécharger que les blocs absents.
+    """
+    import mmap
+    blocks = []
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, size, block_size):
+                block = mapped[offset:offset + block_size]
+                hasher.update(block)
+                blocks.append([weak_checksum(block), strong_checksum(block)])
+    return {"size": size, "sha256": hasher.hexdigest(), "block_size": block_size, "blocks": blocks}
+
+def write_block_index(path, block_size=DELTA_BLOCK_SIZE):
+    index = make_block_index(path, block_size)
+    atomic_write(path + ".blocks.json", json.dumps(index, separators=(",", ":")).encode("utf-8"))
+    return index
+
+def plan_delta(old, index):
+    """Pour chaque bloc de la nouvelle image, offset du même contenu dans old (bytes-like), ou None.
+
+    Fenêtre glissante sur l'ancienne image : après une correspondance on saute d'un bloc entier,
+    si bien que seules les zones réellement modifiées ou décalées sont parcourues octet par octet.
+    Un dernier bloc incomplet (somme de contrôle, SHA-256 de l'image) n'est jamais cherché : il est téléchargé.
+    """
+    block_size = index["block_size"]
+    wanted = {}
+    for i, (weak, strong) in enumerate(index["blocks"]):
+        wanted.setdefault(weak, []).append((strong, i))
+    sources = [None] * len(index["blocks"])
+    missing = len(sources)
+    size = len(old)
+    position = 0
+    weak = a = b = None
+    while position + block_size <= size and missing:
+        if weak is None:
+            block = old[position:position + block_size]
+            weak = weak_checksum(block)
+            a, b = weak & 0xFFFF, weak >> 16
+        candidates = wanted.get(weak)
+        if candidates:
+            strong = strong_checksum(old[position:position + block_size])
+            matched = False
+            for candidate, i in candidates:
+                if candidate == strong and sources[i] is None:
+                    sources[i] = position
+                    missing -= 1
+                    matched = True
+            if matched:
+                position += block_size
+                weak = None
+                continue
+        if position + block_size >= size:
+            break
+        out, new = old[position], old[position + block_size]
+        a = (a - out + new) & 0xFFFF
+        b = (b - block_size * out + a) & 0xFFFF
+        weak = a | (b << 16)
+        position += 1
+    return sources
+
+class DeltaDownloader:
+    """Reconstruit une nouvelle image à partir d'une version en cache et des seuls blocs modifiés (Range).
+
+    Même interface que ChunkedDownloader (progress, cancel, run, path) ; le SHA-256 de l'image reconstruite
+    est vérifié contre l'index de blocs publié (et celui du manifest s'il est connu).
+    """
+
+    def __init__(self, url, path, old_path, index, expected_sha256=None, session=None):
+        self.url = url
+        self.path = path
+        self.part_path = path + ".part"
+        self.old_path = old_path
+        self.index = index
+        self.expected_sha256 = expected_sha256
+        self.session = session
+        self.total = index["size"]
+        self.done_bytes = 0
+        self.resumed_bytes = 0
+        self.downloaded_bytes = 0
+        self.started = None
+        self._cancelled = threading.Event()
+
+    progress = ChunkedDownloader.progress
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        """Retourne le même résultat que ChunkedDownloader.run, plus downloaded_bytes/reused_bytes."""
+        import mmap
+        own_session = self.session is None
+        session = self.session or new_download_session(1)
+        BACKGROUND.add_cancel_hook(session.close)
+        self.started = time.perf_counter()
+        block_size, size = self.index["block_size"], self.index["size"]
+        try:
+            with METRICS.span("firmware.delta", url=self.url) as span, open(self.old_path, 'rb') as old_file, \
+                    mmap.mmap(old_file.fileno(), 0, access=mmap.ACCESS_READ) as old:
+                sources = plan_delta(old, self.index)
+                span["plan_ms"] = (time.perf_counter() - self.started) * 1000
+                fetched = self._fetch_missing(session, sources)
+                hasher = hashlib.sha256()
+                os.makedirs(os.path.dirname(self.part_path) or ".", exist_ok=True)
+                with open(self.part_path, 'wb') as out:
+                    i = 0
+                    while i < len(sources):
+                        if i in fetched:
+                            data, i = fetched[i]
+                        else:
+                            data = old[sources[i]:sources[i] + min(block_size, size - i * block_size)]
+                            i += 1
+                        out.write(data)
+                        hasher.update(data)
+                        self.done_bytes += len(data)
+                    out.flush()
+                    os.fsync(out.fileno())
+                digest = hasher.hexdigest()
+                span.update(downloaded=self.downloaded_bytes, reused=size - self.downloaded_bytes)
+            if digest != self.index["sha256"] or (self.expected_sha256 and digest != self.expected_sha256.lower()):
+                os.remove(self.part_path)
+                raise DownloadError(f"Image reconstruite invalide (SHA-256) pour {os.path.basename(self.path)}")
+            os.replace(self.part_path, self.path)
+            return {"path": self.path, "size": size, "sha256": digest, "resumed_bytes": 0,
+                    "ms": (time.perf_counter() - self.started) * 1000,
+                    "downloaded_bytes": self.downloaded_bytes, "reused_bytes": size - self.downloaded_bytes}
+        finally:
+            BACKGROUND.remove_cancel_hook(session.close)
+            if own_session:
+                session.close()
+
+    def _fetch_missing(self, session, sources):
+        """Télécharge les plages de blocs absents sur DOWNLOAD_CONNECTIONS connexions ; {premier bloc: (données, fin)}."""
+        block_size, size = self.index["block_size"], self.index["size"]
+        runs = []
+        for i, source in enumerate(sources):
+            if source is not None:
+                continue
+            if runs and runs[-1][1] == i:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1])
+        todo = deque(runs)
+        fetched = {}
+        errors = []
+        lock = threading.Lock()
+
+        def fetch_loop():
+            try:
+                while not errors:
+                    with lock:
+                        if not todo:
+                            return
+                        first, end = todo.popleft()
+                    data = self._fetch(session, first * block_size, min(end * block_size, size) - 1)
+                    with lock:
+                        fetched[first] = (data, end)
+                        self.downloaded_bytes += len(data)
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [BACKGROUND.spawn(fetch_loop, f"hako-delta-{n}") for n in range(min(DOWNLOAD_CONNECTIONS, len(runs)))]
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+                BACKGROUND.check()
+        if errors:
+            raise errors[0]
+        return fetched
+
+    def _fetch(self, session, first, last):
+        with http_get(session, self.url, {"Range": f"bytes={first}-{last}"}, self._cancelled) as response:
+            if response.status_code != 206:
+                raise DownloadError(f"Le serveur ignore Range : mise à jour différentielle impossible ({self.url})")
+            data = response.content
+        if len(data) != last - first + 1:
+            raise DownloadError(f"Plage incomplète 0x{first:X}-0x{last:X} pour {self.url}")
+        return data
+
+def fetch_block_index(url, session):
+    """Index de blocs publié à côté d'une image (<url>.blocks.json), ou None s'il n'existe pas."""
+    try:
+        with http_get(session, url + ".blocks.json") as response:
+            index = response.json()
+    except (DownloadError, ValueError):
+        return None
+    required = ("size", "sha256", "block_size", "blocks")
+    if not isinstance(index, dict) or any(key not in index for key in required) or index["block_size"] <= 0:
+        return None
+    return index
+
+# ============================
+# UTIL : Serveur web-flasher local
+# ============================
+WEB_CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8", ".json": "application/json", ".js": "text/javascript",
+    ".css": "text/css", ".svg": "image/svg+xml", ".png": "image/png", ".ico": "image/x-icon",
+    ".woff2": "font/woff2", ".woff": "font/woff", ".ttf": "font/ttf", ".bin": "application/octet-stream",
+}
+WEB_GZIP_EXTENSIONS = (".html", ".json", ".js", ".css", ".svg") # Les .png et .bin se compressent mal
+WEB_IMMUTABLE = "public, max-age=31536000, immutable"
+WEB_ENTITY_TAG = re.compile(r'\s*(?:W/)?("[^"]*")\s*(?:,|$)')
+# Bibliothèques que les pages chargent depuis un CDN : URL dans les pages -> (racine du paquet, fichier d'entrée,
+# dossier sous vendor/). Une fois copiées par vendor_web_assets, le web-flasher local réécrit ces URLs.
+WEB_VENDOR = {
+    "https://unpkg.com/esp-web-tools@10/dist/web/install-button.js?module":
+        ("https://unpkg.com/esp-web-tools@10/dist/web/", "install-button.js", "esp-web-tools"),
+    "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css":
+        ("https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/", "css/all.min.css", "font-awesome"),
+}
+WEB_VENDOR_REFS = re.compile(r"""(?:\bfrom\s*|\bimport\s*\(?\s*|url\(\s*)["']?(\.{1,2}/[^"')?#\s]+)""")
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match : "*" ou liste d'entity-tags séparés par des virgules, comparés sans le préfixe W/ (RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag # Comparaison faible : W/"x" et "x" correspondent
+    return opaque in (match.group(1) for match in WEB_ENTITY_TAG.finditer(if_none_match))
+
+def vendor_web_assets(root=WEB_ROOT, session=None):
+    """Copie sous <root>/vendor les bibliothèques des pages (WEB_VENDOR) ; retourne les fichiers écrits.
+
+    Les fichiers référencés en relatif depuis le fichier d'entrée (modules JS importés, polices des CSS)
+    sont suivis, sans sortir de la racine du paquet.
+    """
+    from urllib.parse import urljoin
+    own_session = session is None
+    session = session or new_download_session(1)
+    written = []
+    try:
+        for base, entry, folder in WEB_VENDOR.values():
+            todo, seen = [entry], {entry}
+            while todo:
+                relative = todo.pop()
+                with http_get(session, base + relative) as response:
+                    data = response.content
+                local = "/".join(("vendor", folder, relative))
+                atomic_write(os.path.join(root, *local.split("/")), data)
+                written.append(local)
+                if not relative.endswith((".js", ".css")):
+                    continue
+                for ref in WEB_VENDOR_REFS.findall(data.decode("utf-8", "replace")):
+                    url = urljoin(base + relative, ref)
+                    if url.startswith(base) and url[len(base):] not in seen:
+                        seen.add(url[len(base):])
+                        todo.append(url[len(base):])
+    finally:
+        if own_session:
+            session.close()
+    return written
+
+class StaticAsset:
+    """Fichier du site préparé une fois : ETag fort (SHA-256), variante gzip précompressée.
+
+    Les petits fichiers restent en mémoire, réécrits par transform(data) s'il est donné (variant identifie
+    la réécriture). Les images .bin sont envoyées depuis le disque (sendfile) ; sans SHA-256 connu,
+    leur ETag est faible (W/), tiré de mtime/taille.
+    """
+
+    def __init__(self, path, name, immutable=False, etag=None, transform=None, variant=None):
+        self.path = path
+        self.immutable = immutable
+        self.variant = variant
+        extension = os.path.splitext(name)[1].lower()
+        self.content_type = WEB_CONTENT_TYPES.get(extension, "application/octet-stream")
+        st = os.stat(path)
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        self.size = st.st_size
+        self.data = None
+        self.gzip_data = None
+        if self.content_type == "application/octet-stream": # Image firmware : jamais chargée en mémoire
+            self.etag = f'"{etag}"' if etag else f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+            return
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        if transform:
+            self.data = transform(self.data)
+        self.etag = f'"{hashlib.sha256(self.data).hexdigest()[:32]}"'
+        if extension in WEB_GZIP_EXTENSIONS:
+            import gzip
+            compressed = gzip.compress(self.data, 9, mtime=0)
+            if len(compressed) < len(self.data):
+                self.gzip_data = compressed
+
+    def is_stale(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return True
+        return (st.st_mtime_ns, st.st_size) != self.stamp
+
+class WebFlasherHandler:
+    """Gestion des requêtes du web-flasher ; combinée à BaseHTTPRequestHandler par WebFlasherServer
+    (http.server n'est importé qu'au démarrage du serveur)."""
+
+    protocol_version = "HTTP/1.1" # Keep-alive : la page, les manifests et l'image passent par la même connexion
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self):
+        self.serve(head=True)
+
+    def do_GET(self):
+        self.serve(head=False)
+
+    def serve(self, head):
+        asset = self.server.site.resolve(self.path.split("?", 1)[0])
+        if asset is None:
+            self.send_error(404)
+            return
+        gzip_ok = asset.gzip_data is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        etag = asset.etag[:-1] + '-gz"' if gzip_ok else asset.etag
+        cache_control = WEB_IMMUTABLE if asset.immutable else "no-cache" # no-cache : revalidation (304) par ETag
+        if etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            self.end_headers()
+            return
+        body = asset.gzip_data if gzip_ok else asset.data
+        self.send_response(200)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body) if body is not None else asset.size))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        if asset.gzip_data is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if gzip_ok:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if head:
+            return
+        if body is not None:
+            self.wfile.write(body)
+            return
+        with open(asset.path, 'rb') as f: # Image : copie noyau fichier -> socket (sendfile), sans passer par Python
+            self.connection.sendfile(f)
+
+    def log_message(self, format, *args):
+        pass
+
+class StaticSite:
+    """Fichiers servis par le web-flasher local : pages et manifests de root, images depuis le cache firmware.
+
+    Une image demandée par un manifest (ex. /Hako_Sentinel_Full.bin) est servie depuis le cache si elle n'est
+    pas dans root ; /firmware/<sha256> sert directement une image du cache avec des en-têtes immuables, et les
+    manifests servis pointent vers ces URLs pour les parties déjà en cache. Les pages utilisent les copies de
+    vendor/ à la place des CDN quand elles existent (voir vendor_web_assets). prepare() construit les fichiers
+    de root et de vendor/ (variantes gzip comprises) avant la première requête.
+    """
+
+    def __init__(self, root=WEB_ROOT, cache=FIRMWARE_CACHE, manifests=MANIFESTS):
+        self.root = os.path.abspath(root)
+        self.vendor_dir = os.path.join(self.root, "vendor")
+        self.cache = cache
+        self.manifests = manifests
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        """Prépare tous les fichiers servis de root et de vendor/ ; retourne leur nombre."""
+        names = []
+        try:
+            names = [name for name in os.listdir(self.root) if not name.endswith(".bin")]
+        except OSError:
+            pass
+        for directory, _, files in os.walk(self.vendor_dir):
+            relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            names.extend(relative + "/" + name for name in files)
+        return sum(self.resolve(name) is not None for name in names)
+
+    def resolve(self, url_path):
+        from urllib.parse import unquote
+        name = unquote(url_path).lstrip("/") or "index.html"
+        with self._lock:
+            variant = self._variant(name)
+            asset = self._assets.get(name)
+            if asset is not None and asset.variant == variant and not asset.is_stale():
+                return asset
+            path, sha256, immutable = self._locate(name)
+            try:
+                asset = StaticAsset(path, name, immutable, sha256, self._transform(name), variant) if path else None
+            except OSError:
+                asset = None
+            if asset is None:
+                self._assets.pop(name, None)
+            else:
+                self._assets[name] = asset
+            return asset
+
+    def _vendored(self):
+        """URL CDN -> URL locale, pour les bibliothèques présentes dans vendor/."""
+        return {url: "/vendor/" + folder + "/" + entry for url, (_, entry, folder) in WEB_VENDOR.items()
+                if os.path.isfile(os.path.join(self.vendor_dir, folder, *entry.split("/")))}
+
+    def _is_manifest(self, name):
+        return self.cache is not None and name.startswith("manifest") and name.endswith(".json") and "/" not in name
+
+    def _variant(self, name):
+        """Ce dont dépend la réécriture du fichier : copies de vendor/ pour une page, index du cache pour un manifest."""
+        if name.endswith(".html") and "/" not in name:
+            return tuple(sorted(self._vendored()))
+        if self._is_manifest(name):
+            try:
+                st = os.stat(self.cache.index_path)
+            except OSError:
+                return None
+            return st.st_mtime_ns, st.st_size
+        return None
+
+    def _transform(self, name):
+        """Réécriture du contenu servi : URLs CDN des pages vers vendor/, parties en cache des manifests vers /firmware/."""
+        if name.endswith(".html") and "/" not in name:
+            local = self._vendored()
+            def transform(data):
+                for url, target in local.items():
+                    data = data.replace(url.encode("utf-8"), target.encode("utf-8"))
+                return data
+            return transform if local else None
+        if self._is_manifest(name):
+            def transform(data):
+                try:
+                    manifest = json.loads(data)
+                    hashed = 0
+                    for build in manifest["builds"]:
+                        for part in build["parts"]:
+                            cached = self.cache.path_for(name, manifest["version"], part["path"])
+                            if cached: # Nom stable -> URL adressée par contenu, servie avec des en-têtes immuables
+                                part["path"] = "/firmware/" + os.path.basename(cached)
+                                hashed += 1
+                except (ValueError, KeyError, TypeError):
+                    return data # Manifest illisible : servi tel quel
+                return json.dumps(manifest, indent=2).encode("utf-8") if hashed else data
+            return transform
+        return None
+
+    def _locate(self, name):
+        """(chemin, sha256 si connu, immuable) du fichier demandé, ou (None, None, False)."""
+        if "/" not in name and "\\" not in name and not name.startswith("."):
+            if os.path.splitext(name)[1].lower() in WEB_CONTENT_TYPES:
+                path = os.path.join(self.root, name)
+                if os.path.isfile(path):
+                    return path, None, False
+            if name.endswith(".bin") and self.cache: # Partie d'un manifest, téléchargée dans le cache
+                self.manifests.refresh()
+                for manifest, build in self.manifests.find():
+                    if any(part["path"] == name for part in build["parts"]):
+                        path = self.cache.path_for(manifest["file"], manifest["version"], name)
+                        if path: # Le contenu derrière ce nom peut changer avec la version du manifest
+                            return path, os.path.basename(path), False
+        elif name.startswith("firmware/") and self.cache:
+            sha256 = name[len("firmware/"):]
+            if len(sha256) == 64 and all(c in string.hexdigits for c in sha256):
+                path = self.cache.object_path(sha256)
+                if os.path.isfile(path):
+                    return path, sha256, True
+        elif name.startswith("vendor/") and "\\" not in name:
+            parts = name.split("/")
+            if all(part and not part.startswith(".") for part in parts) and \
+                    os.path.splitext(name)[1].lower() in WEB_CONTENT_TYPES:
+                path = os.path.join(self.root, *parts)
+                if os.path.isfile(path):
+                    return path, None, False
+        return None, None, False
+
+class WebFlasherServer:
+    """Serveur HTTP local du web-flasher, dans un thread d'arrière-plan suivi."""
+
+    def __init__(self, host=WEB_HOST, port=WEB_PORT, site=None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        handler = type("WebFlasherHandler", (WebFlasherHandler, BaseHTTPRequestHandler), {})
+        try:
+            self.server = ThreadingHTTPServer((host, port), handler)
+        except OSError: # Port déjà pris (autre instance, autre service) : port libre
+            self.server = ThreadingHTTPServer((host, 0), handler)
+        self.server.daemon_threads = True
+        self.server.timeout = 0.05 # Boucle de service réveillée souvent : arrêt rapide à la fermeture
+        self.server.site = site or StaticSite()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        if self._thread is None:
+            self._thread = BACKGROUND.spawn(self._serve, "hako-web")
+        return self.url
+
+    def stop(self):
+        self._stop.set()
+
+    def _serve(self):
+        try:
+            self.server.site.prepare() # Avant la première requête : pas de compression au fil des demandes
+            while not self._stop.is_set() and not BACKGROUND.cancelled.is_set():
+                self.server.handle_request()
+        finally:
+            self.server.server_close()
+
+# ============================
+# UTIL : Flash série (bootloader ROM ESP32)
+# ============================
+ESP_SYNC = 0x08
+ESP_WRITE_REG = 0x09
+ESP_READ_REG = 0x0A
+ESP_SPI_SET_PARAMS = 0x0B
+ESP_SPI_ATTACH = 0x0D
+ESP_CHANGE_BAUDRATE = 0x0F
+ESP_FLASH_DEFL_BEGIN = 0x10
+ESP_FLASH_DEFL_DATA = 0x11
+ESP_FLASH_DEFL_END = 0x12
+ESP_SPI_FLASH_MD5 = 0x13
+ESP_CHIP_DETECT_MAGIC_REG = 0x40001000
+ESP_CHIP_MAGICS = {0x00F01D83: "ESP32", 0x000007C6: "ESP32-S2", 0x00000009: "ESP32-S3",
+                   0x6921506F: "ESP32-C3", 0x1B31506F: "ESP32-C3", 0x6F51306F: "ESP32-C2", 0x7C41A06F: "ESP32-C2"}
+ESP_ROM_STATUS_BYTES = 4         # Le bootloader ROM (ESP32 et suivants) termine chaque réponse par 4 octets d'état
+ESP_ROM_WRITE_BLOCK = 0x400      # Taille d'un bloc FLASH_DEFL_DATA acceptée par le ROM
+ESP_ROM_BAUD = 115200
+ESP_DEFAULT_FLASH_SIZE = 4 * 1024 * 1024 # Taille annoncée au ROM quand l'identifiant JEDEC est illisible (comme esptool)
+ESP_EFUSE_MAC_REG = {"ESP32-S3": 0x60007044, "ESP32-S2": 0x3F41A044, "ESP32-C3": 0x60008844} # MAC_0 puis MAC_1
+ESP_SPI_REG_BASE = {"ESP32-S3": 0x60002000, "ESP32-S2": 0x3F402000, "ESP32-C3": 0x60002000} # SPI1 (flash)
+SPI_CMD_USR = 1 << 18
+SPI_USR_COMMAND, SPI_USR_MISO = 1 << 31, 1 << 28
+SPI_USR_OFFS, SPI_USR2_OFFS, SPI_MISO_DLEN_OFFS, SPI_W0_OFFS = 0x18, 0x20, 0x28, 0x58
+
+class FlashError(Exception):
+    """Échec d'un échange avec le bootloader (pas de réponse, erreur renvoyée, MD5 différent)."""
+
+def slip_encode(packet):
+    return b"\xc0" + packet.replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc") + b"\xc0"
+
+class FdTransport:
+    """Transport série sur un descripteur POSIX (pseudo-terminal de test, ou port déjà ouvert).
+
+    reset est appelé pour ramener la cible dans le bootloader à ESP_ROM_BAUD (sur un vrai port : DTR/RTS).
+    """
+
+    def __init__(self, fd, reset=None):
+        self.fd = fd
+        self.baud = ESP_ROM_BAUD
+        self._reset = reset
+
+    def read(self, size, timeout):
+        import select
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return b""
+        try:
+            return os.read(self.fd, size)
+        except OSError: # Pseudo-terminal refermé par l'autre extrémité
+            raise ConnectionError("Port série fermé")
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def set_baud(self, baud):
+        self.baud = baud
+
+    def flush_input(self):
+        while self.read(4096, 0):
+            pass
+
+    def run_app(self):
+        """Redémarre la cible sur son application (rien à faire sans lignes de contrôle)."""
+
+    def reset(self):
+        if self._reset:
+            self._reset()
+        self.set_baud(ESP_ROM_BAUD)
+
+    def close(self):
+        os.close(self.fd)
+
+class SerialTransport(FdTransport):
+    """Port série réel via pyserial (dépendance optionnelle, importée à l'ouverture)."""
+
+    def __init__(self, port, baud=ESP_ROM_BAUD):
+        try:
+            import serial
+        except ImportError:
+            raise FlashError("Le flash direct nécessite pyserial (pip install pyserial).")
+        self.serial = serial.Serial(port, baud, timeout=0)
+        self.baud = baud
+
+    def read(self, size, timeout):
+        self.serial.timeout = max(timeout, 0)
+        return self.serial.read(max(1, min(size, self.serial.in_waiting or 1)))
+
+    def write(self, data):
+        self.serial.write(data)
+
+    def set_baud(self, baud):
+        self.serial.baudrate = baud
+        self.baud = baud
+
+    def flush_input(self):
+        self.serial.reset_input_buffer()
+
+    def reset(self):
+        """Séquence classique DTR/RTS : EN bas, IO0 bas, puis EN relâché -> démarrage en mode téléchargement."""
+        self.serial.baudrate = self.baud = ESP_ROM_BAUD
+        self.serial.dtr, self.serial.rts = False, True
+        time.sleep(0.1)
+        self.serial.dtr, self.serial.rts = True, False
+        time.sleep(0.05)
+        self.serial.dtr = False
+        self.flush_input()
+
+    def run_app(self):
+        """Reset par RTS seul (IO0 libre) : la carte redémarre sur son firmware."""
+        self.serial.dtr, self.serial.rts = False, True
+        time.sleep(0.1)
+        self.serial.rts = False
+
+    def close(self):
+        self.serial.close()
+
+class EspLoader:
+    """Client du protocole série du bootloader ROM (trames SLIP, commandes FLASH_DEFL_*, SPI_FLASH_MD5)."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.chip_family = None
+        self.bytes_sent = 0
+        self._buffer = bytearray()
+
+    # --- Trames ---
+    def send(self, op, data=b"", checksum=0):
+        frame = slip_encode(struct.pack("<BBHI", 0, op, len(data), checksum) + data)
+        self.transport.write(frame)
+        self.bytes_sent += len(frame)
+
+    def receive(self, op, timeout):
+        """Attend la réponse à op ; retourne (valeur, données sans les octets d'état)."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            packet = self._read_frame(deadline)
+            if len(packet) < 8 or packet[0] != 1 or packet[1] != op:
+                continue # Écho, trame d'une commande précédente ou bruit : ignoré
+            value, = struct.unpack_from("<I", packet, 4)
+            data = packet[8:]
+            status = data[-ESP_ROM_STATUS_BYTES:]
+            if len(status) < 2 or status[0] != 0:
+                raise FlashError(f"Commande 0x{op:02X} refusée par le bootloader (erreur 0x{status[1] if len(status) > 1 else 0:02X})")
+            return value, data[:-ESP_ROM_STATUS_BYTES]
+
+    def command(self, op, data=b"", checksum=0, timeout=3.0):
+        self.send(op, data, checksum)
+        return self.receive(op, timeout)
+
+    def _read_frame(self, deadline):
+        while True:
+            start = self._buffer.find(b"\xc0")
+            if start >= 0:
+                end = self._buffer.find(b"\xc0", start + 1)
+                if end > start + 1:
+                    raw = bytes(self._buffer[start + 1:end])
+                    del self._buffer[:end + 1]
+                    return raw.replace(b"\xdb\xdc", b"\xc0").replace(b"\xdb\xdd", b"\xdb")
+                if end == start + 1: # Deux délimiteurs consécutifs : trame vide
+                    del self._buffer[:start + 1]
+                    continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise FlashError("Pas de réponse du bootloader (port, câble ou mode téléchargement ?)")
+            BACKGROUND.check()
+            self._buffer += self.transport.read(4096, min(remaining, 0.1))
+
+    # --- Commandes ---
+    def sync(self, attempts=5, timeout=0.1):
+        """Synchronise avec le bootloader (le ROM répond à SYNC plusieurs fois : les réponses en trop sont ignorées)."""
+        payload = b"\x07\x07\x12\x20" + b"\x55" * 32
+        for _ in range(attempts):
+            try:
+                self.command(ESP_SYNC, payload, timeout=timeout)
+                time.sleep(0.01)
+                self.transport.flush_input()
+                self._buffer.clear()
+                return True
+            except FlashError:
+                continue
+        return False
+
+    def detect_chip(self):
+        value, _ = self.command(ESP_READ_REG, struct.pack("<I", ESP_CHIP_DETECT_MAGIC_REG))
+        self.chip_family = ESP_CHIP_MAGICS.get(value)
+        if self.chip_family is None:
+            raise FlashError(f"Puce inconnue (magic 0x{value:08X})")
+        return self.chip_family
+
+    def read_reg(self, address):
+        return self.command(ESP_READ_REG, struct.pack("<I", address))[0]
+
+    def write_reg(self, address, value):
+        self.command(ESP_WRITE_REG, struct.pack("<IIII", address, value, 0xFFFFFFFF, 0))
+
+    def read_mac(self):
+        """Adresse MAC d'usine (eFuse) ; None pour une puce sans registres connus."""
+        register = ESP_EFUSE_MAC_REG.get(self.chip_family)
+        if register is None:
+            return None
+        mac0, mac1 = self.read_reg(register), self.read_reg(register + 4)
+        return ":".join(f"{b:02x}" for b in struct.pack(">HI", mac1 & 0xFFFF, mac0))
+
+    def flash_id(self):
+        """Identifiant JEDEC de la flash (commande SPI 0x9F exécutée via les registres SPI1, sans stub)."""
+        base = ESP_SPI_REG_BASE.get(self.chip_family)
+        if base is None:
+            return None
+        old_usr, old_usr2 = self.read_reg(base + SPI_USR_OFFS), self.read_reg(base + SPI_USR2_OFFS)
+        self.write_reg(base + SPI_USR_OFFS, SPI_USR_COMMAND | SPI_USR_MISO)
+        self.write_reg(base + SPI_USR2_OFFS, (7 << 28) | 0x9F) # Commande de 8 bits : RDID
+        self.write_reg(base + SPI_MISO_DLEN_OFFS, 24 - 1)     # Réponse de 24 bits
+        self.write_reg(base + SPI_W0_OFFS, 0)
+        self.write_reg(base, SPI_CMD_USR)
+        for _ in range(10):
+            if not self.read_reg(base) & SPI_CMD_USR:
+                break
+        else:
+            raise FlashError("La commande SPI de lecture d'identifiant n'a pas abouti")
+        value = self.read_reg(base + SPI_W0_OFFS) & 0xFFFFFF
+        self.write_reg(base + SPI_USR_OFFS, old_usr)
+        self.write_reg(base + SPI_USR2_OFFS, old_usr2)
+        return value
+
+    def change_baud(self, baud):
+        self.command(ESP_CHANGE_BAUDRATE, struct.pack("<II", baud, 0))
+        self.transport.set_baud(baud)
+        time.sleep(0.05) # Le temps que l'UART de la cible change de vitesse
+        self.transport.flush_input()
+        self._buffer.clear()
+
+    def negotiate_baud(self, candidates=FLASH_BAUD_RATES):
+        """Passe à la vitesse la plus élevée qui fonctionne : chaque vitesse est vérifiée par un SYNC.
+
+        Après un échec la cible est réinitialisée (retour à ESP_ROM_BAUD) avant d'essayer la vitesse suivante.
+        """
+        for baud in candidates:
+            if baud == self.transport.baud:
+                return baud
+            try:
+                self.change_baud(baud)
+                if self.sync(attempts=3):
+                    return baud
+            except FlashError:
+                pass
+            self.transport.reset()
+            self._buffer.clear()
+            if not self.sync():
+                raise FlashError("Bootloader perdu pendant la négociation de vitesse")
+        return self.transport.baud
+
+    def spi_attach(self):
+        self.command(ESP_SPI_ATTACH, b"\0" * 8)
+
+    def spi_set_params(self, flash_size):
+        """Indique au ROM la géométrie de la flash : sans cela il suppose une petite flash et refuse d'écrire au-delà."""
+        self.command(ESP_SPI_SET_PARAMS, struct.pack("<IIIIII", 0, flash_size, 64 * 1024, FLASH_SECTOR_SIZE, 256, 0xFFFF))
+
+    def flash_md5(self, offset, size):
+        _, data = self.command(ESP_SPI_FLASH_MD5, struct.pack("<IIII", offset, size, 0, 0),
+                               timeout=max(3.0, 8.0 * size / 1e6))
+        return data[:32].decode("ascii").lower() if len(data) >= 32 else data[:16].hex()
+
+    def flash_deflate(self, regions, progress=None, depth=FLASH_PIPELINE_DEPTH):
+        """Écrit des régions [(offset, données, taille à effacer)] en blocs compressés, puis vérifie leur MD5.
+
+        Chaque région est compressée en un flux zlib découpé en blocs de ESP_ROM_WRITE_BLOCK. La compression
+        de la région suivante se fait dans un thread pendant l'envoi de la région courante, et jusqu'à `depth`
+        blocs sont envoyés sans attendre d'accusé : le bloc suivant transite pendant que le précédent s'écrit.
+        Une erreur de compression est relayée par la file ; une erreur d'écriture arrête le thread de compression.
+        """
+        import zlib
+        compressed = queue.Queue(maxsize=1)
+        stop = threading.Event()
+
+        def offer(item):
+            while not stop.is_set(): # File pleine et écriture abandonnée : le thread ne reste pas bloqué
+                try:
+                    compressed.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def compress_all():
+            try:
+                for offset, data, erase_size in regions:
+                    if not offer((offset, data, erase_size, zlib.compress(data, 9))):
+                        return
+            except Exception as e: # Relayée au thread d'écriture
+                offer(e)
+
+        BACKGROUND.spawn(compress_all, "hako-flash-deflate")
+        try:
+            self._write_compressed(regions, compressed, progress, depth)
+        finally:
+            stop.set()
+
+    def _write_compressed(self, regions, compressed, progress, depth):
+        total = sum(len(data) for _, data, _ in regions)
+        written = 0
+        for _ in regions:
+            while True:
+                try:
+                    item = compressed.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    BACKGROUND.check()
+            if isinstance(item, Exception):
+                raise item
+            offset, data, erase_size, stream = item
+            blocks = [stream[i:i + ESP_ROM_WRITE_BLOCK] for i in range(0, len(stream), ESP_ROM_WRITE_BLOCK)]
+            self.command(ESP_FLASH_DEFL_BEGIN,
+                         struct.pack("<IIIII", erase_size, len(blocks), ESP_ROM_WRITE_BLOCK, offset, 0),
+                         timeout=max(3.0, 30.0 * erase_size / 1e6)) # Effacement de la région
+            pending = deque()
+            for seq, block in enumerate(blocks):
+                checksum = xor_bytes(block, ESP_CHECKSUM_SEED)
+                self.send(ESP_FLASH_DEFL_DATA, struct.pack("<IIII", len(block), seq, 0, 0) + block, checksum)
+                pending.append(seq)
+                if len(pending) >= depth:
+                    self.receive(ESP_FLASH_DEFL_DATA, FLASH_BLOCK_TIMEOUT_S)
+                    pending.popleft()
+                if progress:
+                    progress(written + len(data) * (seq + 1) // len(blocks), total)
+            while pending:
+                self.receive(ESP_FLASH_DEFL_DATA, FLASH_BLOCK_TIMEOUT_S)
+                pending.popleft()
+            written += len(data)
+            if self.flash_md5(offset, len(data)) != hashlib.md5(data).hexdigest():
+                raise FlashError(f"MD5 différent après écriture à 0x{offset:X}")
+
+    def finish(self, reboot=True):
+        self.command(ESP_FLASH_DEFL_END, struct.pack("<I", 0 if reboot else 1))
+
+def flash_regions(parts, sector_size=FLASH_SECTOR_SIZE):
+    """Régions à écrire pour des parties [(offset, chemin)] : seuls les secteurs non vides sont envoyés.
+
+    Un secteur entièrement à 0xFF n'est pas transmis, mais reste effacé : l'effacement d'une région s'étend
+    jusqu'à la région suivante de la même partie (ou jusqu'à sa fin). La flash hors des parties n'est pas touchée.
+    """
+    regions = []
+    for offset, path in sorted(parts):
+        if offset % sector_size:
+            raise FlashError(f"Partie à 0x{offset:X} non alignée sur un secteur")
+        with open(path, 'rb') as f:
+            data = f.read()
+        sectors = [i // sector_size for i in range(0, len(data), sector_size)
+                   if data[i:i + sector_size] != ERASED_SECTOR[:len(data) - i]]
+        runs = sector_runs(sectors)
+        part_end = -(-len(data) // sector_size) * sector_size
+        for n, (first, count) in enumerate(runs):
+            start, end = first * sector_size, min((first + count) * sector_size, len(data))
+            erase_end = runs[n + 1][0] * sector_size if n + 1 < len(runs) else part_end
+            regions.append((offset + start, data[start:end], erase_end - start))
+    return regions
+
+def jedec_flash_size(flash_id):
+    """Taille de la flash d'après l'identifiant JEDEC (octet de capacité = log2 de la taille), ou None."""
+    capacity = (flash_id >> 16) & 0xFF if flash_id is not None else 0
+    return 1 << capacity if 0x12 <= capacity <= 0x1A else None
+
+def flash_parts(transport, parts, chip_family=None, progress=None, reboot=True):
+    """Flashe des parties [(offset, chemin)] : synchro, contrôle de la puce, vitesse, écriture compressée, MD5."""
+    loader = EspLoader(transport)
+    with METRICS.span("flash.write", parts=len(parts)) as span:
+        transport.flush_input()
+        if not loader.sync():
+            transport.reset()
+            if not loader.sync():
+                raise FlashError("Aucun bootloader ESP ne répond sur ce port")
+        chip = loader.detect_chip()
+        if chip_family and chip != chip_family:
+            raise FlashError(f"Puce {chip} détectée, le firmware attend {chip_family}")
+        span["baud"] = loader.negotiate_baud()
+        loader.spi_attach()
+        regions = flash_regions(parts)
+        end = max(offset + erase_size for offset, _, erase_size in regions) if regions else 0
+        flash_size = jedec_flash_size(loader.flash_id())
+        if flash_size and end > flash_size:
+            raise FlashError(f"Le firmware (0x{end:X} octets) dépasse la flash de la carte ({flash_size // 2**20} Mo)")
+        flash_size = flash_size or max(ESP_DEFAULT_FLASH_SIZE, 1 << (end - 1).bit_length())
+        loader.spi_set_params(flash_size) # Avant le premier FLASH_DEFL_BEGIN
+        loader.flash_deflate(regions, progress)
+        loader.finish(reboot)
+        span.update(bytes=sum(len(data) for _, data, _ in regions), wire_bytes=loader.bytes_sent, flash_size=flash_size)
+    return {"chip": chip, "baud": span["baud"], "regions": len(regions), "wire_bytes": loader.bytes_sent,
+            "flash_size": flash_size}
+
+class FirmwareFlash:
+    """Flash direct des parties téléchargées sur le port série, dans un thread d'arrière-plan.
+
+    Même cycle de vie que FirmwareDownload : finished, puis result ou error.
+    """
+
+    def __init__(self, port, parts, chip_family=None):
+        self.port = port
+        self.parts = parts
+        self.chip_family = chip_family
+        self.done = self.total = 0
+        self.result = None
+        self.error = None
+        self.finished = threading.Event()
+
+    def start(self):
+        BACKGROUND.spawn(self._run, "hako-flash")
+        return self
+
+    @property
+    def status_text(self):
+        if not self.total:
+            return f"Connexion au bootloader sur {self.port}..."
+        return f"Flash : {self.done * 100 // self.total} % ({self.done / 1e6:.2f}/{self.total / 1e6:.2f} Mo)"
+
+    def _progress(self, done, total):
+        self.done, self.total = done, total
+
+    def _run(self):
+        transport = None
+        try:
+            transport = SerialTransport(self.port)
+            self.result = flash_parts(transport, self.parts, self.chip_family, self._progress)
+        except OperationCancelled:
+            self.error = OperationCancelled("Flash interrompu")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            if transport:
+                transport.close()
+            self.finished.set()
+
+# ============================
+# UTIL : Moniteur série
+# ============================
+class LogRing:
+    """Tampon circulaire de lignes ; chaque ligne a un numéro absolu (seq) qui ne change jamais.
+
+    Les lignes plus anciennes que total - capacity sont écrasées ; first est la plus ancienne encore présente.
+    """
+
+    def __init__(self, capacity=MONITOR_LINES):
+        self.capacity = capacity
+        self.total = 0
+        self._lines = [""] * capacity
+        self._lock = threading.Lock()
+
+    @property
+    def first(self):
+        return max(0, self.total - self.capacity)
+
+    def extend(self, lines):
+        with self._lock:
+            if len(lines) > self.capacity: # Lot plus grand que le tampon : seule la fin est conservée
+                self.total += len(lines) - self.capacity
+                lines = lines[-self.capacity:]
+            start = self.total % self.capacity
+            head = min(len(lines), self.capacity - start)
+            self._lines[start:start + head] = lines[:head]
+            self._lines[:len(lines) - head] = lines[head:]
+            self.total += len(lines)
+
+    def get(self, start, stop):
+        """Lignes [start, stop) (numéros absolus), limitées à celles encore présentes ; retourne (start, lignes)."""
+        with self._lock:
+            start, stop = max(start, self.first), min(stop, self.total)
+            if start >= stop:
+                return start, []
+            a, b = start % self.capacity, stop % self.capacity
+            if a < b:
+                return start, self._lines[a:b]
+            return start, self._lines[a:] + self._lines[:b]
+
+    def pick(self, seqs):
+        """Lignes des numéros seqs encore présents, lues sous un seul verrou (les lignes écrasées sont omises)."""
+        with self._lock:
+            first = self.first
+            return [self._lines[seq % self.capacity] for seq in seqs if first <= seq < self.total]
+
+class LogFilter:
+    """Numéros des lignes du tampon qui correspondent à une expression régulière.
+
+    Le tampon est parcouru par tranches pendant au plus MONITOR_FILTER_BUDGET_MS à chaque image : changer de
+    filtre sur un tampon plein ne bloque jamais l'interface, le résultat se complète sur quelques images.
+    """
+
+    def __init__(self, ring, pattern):
+        from itertools import compress
+        self._compress = compress
+        self.ring = ring
+        self.search = re.compile(pattern, re.IGNORECASE).search # re.error si l'expression est invalide
+        self.matches = []
+        self.scanned = ring.first
+
+    @property
+    def pending(self):
+        return self.ring.total - max(self.scanned, self.ring.first)
+
+    def update(self, budget_ms=MONITOR_FILTER_BUDGET_MS):
+        deadline = time.perf_counter() + budget_ms / 1000
+        while self.pending and time.perf_counter() < deadline:
+            start, lines = self.ring.get(self.scanned, self.scanned + 2048)
+            self.matches += self._compress(range(start, start + len(lines)), map(self.search, lines))
+            self.scanned = start + len(lines)
+        first = self.ring.first
+        if self.matches and self.matches[0] < first: # Lignes écrasées dans le tampon
+            del self.matches[:bisect.bisect_left(self.matches, first)]
+
+class LogView:
+    """Fenêtre visible (rows lignes) sur le tampon, filtré ou non : seule cette fenêtre est rendue.
+
+    En mode suivi, la fenêtre reste collée aux dernières lignes ; sinon elle reste sur la ligne top_seq.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.filter = None
+        self.follow = True
+        self.top_seq = 0
+        self.index = self.count = 0
+
+    def set_filter(self, pattern):
+        self.filter = LogFilter(self.ring, pattern) if pattern else None
+        self.follow = True
+
+    def _seq_at(self, index):
+        if self.filter:
+            return self.filter.matches[index] if index < len(self.filter.matches) else self.ring.total
+        return self.ring.first + index
+
+    def window(self, rows):
+        """Met à jour le filtre et retourne (lignes visibles, index de la première, nombre total de lignes)."""
+        if self.filter:
+            self.filter.update()
+            matches = self.filter.matches
+            count = len(matches)
+            index = bisect.bisect_left(matches, self.top_seq)
+        else:
+            count = self.ring.total - self.ring.first
+            index = self.top_seq - self.ring.first
+        bottom = max(0, count - rows)
+        index = bottom if self.follow else max(0, min(index, bottom))
+        self.index, self.count = index, count
+        self.top_seq = self._seq_at(index)
+        if self.filter:
+            # Le thread de lecture peut écraser ces lignes depuis filter.update() : pick() les omet
+            lines = self.ring.pick(matches[index:index + rows])
+        else:
+            lines = self.ring.get(self.top_seq, self.top_seq + rows)[1]
+        return lines, index, count
+
+    def scroll_to(self, index, rows):
+        """Place la fenêtre sur la ligne index (le suivi reprend quand on revient en bas)."""
+        bottom = max(0, self.count - rows)
+        index = max(0, min(int(index), bottom))
+        self.follow = index >= bottom
+        self.top_seq = self._seq_at(index)
+
+class SerialMonitor:
+    """Lecture continue d'un port série dans un thread d'arrière-plan, découpée en lignes dans un LogRing.
+
+    Le thread ne fait que lire, découper et décoder par blocs ; l'interface relève la vue à son rythme.
+    """
+
+    def __init__(self, transport, capacity=MONITOR_LINES):
+        self.transport = transport
+        self.ring = LogRing(capacity)
+        self.view = LogView(self.ring)
+        self.bytes = 0
+        self.error = None
+        self.finished = threading.Event()
+        self._stopped = False
+
+    def start(self):
+        BACKGROUND.spawn(self._run, "hako-monitor")
+        return self
+
+    def stop(self):
+        self._stopped = True
+
+    def _run(self):
+        partial = b""
+        try:
+            while not self._stopped:
+                BACKGROUND.check()
+                chunk = self.transport.read(MONITOR_READ_SIZE, 0.05)
+                if not chunk:
+                    continue
+                self.bytes += len(chunk)
+                data = partial + chunk
+                end = data.rfind(b"\n")
+                if end < 0:
+                    if len(data) < MONITOR_MAX_LINE:
+                        partial = data
+                        continue
+                    end = len(data) # Ligne sans fin trop longue : coupée
+                partial = data[end + 1:]
+                text = data[:end].decode("utf-8", "replace").replace("\r", "")
+                self.ring.extend(text.split("\n"))
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.transport.close()
+            self.finished.set()
+
+# ============================
+# UTIL : Détection des cartes ESP32
+# ============================
+def list_serial_ports():
+    """Ports série présents : [{device, vid, pid, serial}] (pyserial si disponible, sinon /dev sous POSIX)."""
+    try:
+        from serial.tools import list_ports
+    except ImportError:
+        import glob
+        patterns = ("/dev/ttyACM*", "/dev/ttyUSB*", "/dev/cu.usbmodem*", "/dev/cu.usbserial*")
+        return [{"device": device, "vid": None, "pid": None, "serial": None}
+                for pattern in patterns for device in sorted(glob.glob(pattern))]
+    return [{"device": port.device, "vid": port.vid, "pid": port.pid, "serial": port.serial_number}
+            for port in list_ports.comports()]
+
+def device_key(port):
+    """Identité d'une carte : VID:PID + numéro de série USB si disponible, sinon le chemin du port."""
+    if port.get("vid") is not None:
+        return f"{port['vid']:04X}:{port['pid']:04X}:{port.get('serial') or port['device']}"
+    return port["device"]
+
+def probe_device(transport):
+    """Empreinte d'une carte en mode téléchargement : puce, MAC et taille de flash (None si non lisibles).
+
+    Retourne None si aucun bootloader ESP ne répond sur le port.
+    """
+    loader = EspLoader(transport)
+    transport.flush_input()
+    if not loader.sync(attempts=2, timeout=0.1):
+        transport.reset()
+        if not loader.sync(attempts=3, timeout=0.1):
+            return None
+    chip = loader.detect_chip()
+    loader.spi_attach()
+    return {"chip": chip, "mac": loader.read_mac(), "flash_size": jedec_flash_size(loader.flash_id())}
+
+class DeviceScanner:
+    """Détection concurrente des cartes, avec empreintes mémorisées par carte dans devices.json.
+
+    Une carte déjà connue (même clé, même port) n'est pas réinterrogée : son empreinte en cache est
+    retournée immédiatement. Un port sans bootloader ESP est mémorisé sans puce (chip None) et n'est
+    sondé à nouveau que si son identité change ou si force=True ; un port qui n'a pas pu être ouvert
+    (droits, port occupé) ou sondé jusqu'au bout n'est pas mémorisé et sera retenté. Seuls les ports nouveaux ou changés sont
+    sondés, tous en parallèle et dans la limite de PORT_PROBE_TIMEOUT_S.
+    """
+
+    def __init__(self, path=DEVICES_FILE, lister=list_serial_ports, opener=SerialTransport):
+        self.path = path
+        self.lister = lister
+        self.opener = opener
+        self.devices = {}
+        self.probed = 0
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding="utf-8") as f:
+                self.devices = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def cached(self, chip_family=None):
+        """Empreintes connues (sans ouvrir de port), filtrées par famille de puce."""
+        with self._lock:
+            return [device for device in self.devices.values()
+                    if device.get("chip") and chip_family in (None, device["chip"])]
+
+    def _probe(self, port):
+        transport = self.opener(port["device"])
+        try:
+            fingerprint = probe_device(transport)
+            if fingerprint:
+                transport.run_app()
+            return fingerprint
+        finally:
+            transport.close()
+
+    def _try_probe(self, port):
+        """Empreinte du port (sans puce si aucun bootloader ESP ne répond), ou None si la sonde a échoué."""
+        try:
+            fingerprint = self._probe(port)
+        except Exception as e: # Droits (groupe dialout), port occupé, carte débranchée pendant la sonde
+            print(f"Avertissement: port {port['device']} non sondé ({e})")
+            return None
+        return fingerprint or {"chip": None, "mac": None, "flash_size": None}
+
+    def scan(self, chip_family=None, force=False, timeout=PORT_PROBE_TIMEOUT_S):
+        """Ports présents portant une carte ESP (de chip_family si donné) ; sonde uniquement les inconnus."""
+        with METRICS.span("devices.scan") as span:
+            ports = self.lister()
+            found, to_probe = [], []
+            for port in ports:
+                known = self.devices.get(device_key(port))
+                if known and known["device"] == port["device"] and not force:
+                    found.append(known)
+                else:
+                    to_probe.append(port)
+            if to_probe:
+                # Threads démons suivis : un port muet ne retient ni le résultat ni la fermeture du launcher
+                results = queue.Queue()
+                for port in to_probe:
+                    BACKGROUND.spawn(lambda port=port: results.put((port, self._try_probe(port))), "hako-probe")
+                deadline = time.monotonic() + timeout
+                answered = []
+                for _ in to_probe:
+                    try:
+                        answered.append(results.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break # Toujours en cours après le délai : on retentera au prochain scan
+                with self._lock:
+                    for port, fingerprint in answered:
+                        if fingerprint is None:
+                            continue # Sonde en échec : ce n'est pas une absence de carte, on retentera
+                        device = dict(port, key=device_key(port), probed_at=time.time(), **fingerprint)
+                        self.devices[device["key"]] = device
+                        found.append(device)
+                    self.probed += len(to_probe)
+                self.save()
+            span.update(ports=len(ports), probed=len(to_probe), found=len(found))
+        return sorted((device for device in found if device["chip"] and chip_family in (None, device["chip"])),
+                      key=lambda device: device["device"])
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(self.devices, separators=(",", ":")).encode("utf-8")
+        try:
+            atomic_write(self.path, payload)
+        except OSError as e:
+            print(f"Avertissement: empreintes des cartes non enregistrées ({e})")
+
+DEVICES = DeviceScanner()
+
+# ============================
+# CLI (sans interface)
+# ============================
+# python HAKO-PRO-2026.py <commande> : une ligne JSON sur stdout, la progression éventuelle sur stderr.
+# Tk n'est jamais chargé pour ces commandes (tkinter n'est importé que par load_ui, avec l'interface).
+CLI_COMMANDS = ("status", "activate", "fetch", "serve", "vendor", "block-index")
+EXIT_OK = 0          # Licence active / opération réussie
+EXIT_INVALID = 1     # Pas de licence, clé refusée par le Worker
+EXIT_USAGE = 2       # Arguments invalides (argparse)
+EXIT_NETWORK = 3     # Worker ou site firmware injoignable, téléchargement en échec
+EXIT_FIRMWARE = 4    # Manifest ou image firmware invalide
+EXIT_CANCELLED = 130 # Interrompu (Ctrl+C)
+
+def cli_print(payload):
+    print(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), flush=True)
+
+def cli_license_state(data, lease, source):
+    return {"state": "active", "source": source, "license": data["license"][:4] + "..." + data["license"][-4:],
+            "expire": data.get("expire"), "validated_at": lease["validated_at"], "next_check": lease_next_check(lease)}
+
+def cli_verify(key):
+    """check_and_bind_key + mêmes effets que l'interface : bail enregistré si valide, clé effacée si refusée."""
+    ok, message, data = check_and_bind_key(key)
+    _, lease = revalidate_lease(key, (ok, message, data))
+    if ok:
+        return ok, message, load_license_data(), lease
+    return ok, message, data, None
 
-def save_license_data(data):
-    """Sauvegarde les données de licence dans un fichier local."""
+def cli_status(args):
+    """Licence locale : bail valide => active sans réseau ; bail absent, périmé ou --check => Worker."""
+    data = load_license_data()
+    if not data or not data.get("license"):
+        cli_print({"state": "none"})
+        return EXIT_INVALID
+    key = data["license"]
+    lease = load_license_lease(key)
+    if lease and not args.check and time.time() < lease_next_check(lease):
+        cli_print(cli_license_state(data, lease, "lease"))
+        return EXIT_OK
+    ok, message, checked = check_and_bind_key(key)
+    state, lease = revalidate_lease(key, (ok, message, checked))
+    if state == "active":
+        cli_print(cli_license_state(load_license_data(), lease, "worker"))
+        return EXIT_OK
+    if state == "revoked":
+        cli_print({"state": "invalid", "error": message})
+        return EXIT_INVALID
+    if state == "offline": # Worker injoignable : le bail reste utilisable hors-ligne
+        cli_print(dict(cli_license_state(data, lease, "lease"), warning=message))
+        return EXIT_OK
+    cli_print({"state": "unverified", "error": message})
+    return EXIT_NETWORK
+
+def cli_activate(args):
+    ok, message, data, lease = cli_verify(args.key)
+    if ok:
+        cli_print(dict(cli_license_state(data, lease, "worker"), result=message))
+        return EXIT_OK
+    cli_print({"state": "invalid" if data is not None else "unverified", "error": message})
+    return EXIT_INVALID if data is not None else EXIT_NETWORK
+
+def cli_fetch(args):
+    """Télécharge (cache, delta, reprise) et vérifie les parties d'un manifest ; nécessite une licence active."""
+    data = load_license_data()
+    if not data or not data.get("license") or load_license_lease(data["license"]) is None:
+        cli_print({"error": "Aucune licence active (python HAKO-PRO-2026.py activate <clé>)"})
+        return EXIT_INVALID
+    download = FirmwareDownload(args.manifest, base_url=args.base_url).start()
+    progress = sys.stderr.isatty()
     try:
-        with open(LICENSE_FILE, 'w') as f:
-            json.dump(data, f)
-    except IOError as e:
-        print(f"Erreur lors de la sauvegarde du fichier de licence: {e}")
+        while not download.finished.wait(DOWNLOAD_POLL_MS / 1000):
+            if progress:
+                print(f"\r{download.status_text:<78}", end="", file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        download.cancel()
+        download.finished.wait(SHUTDOWN_DEADLINE_S)
+        cli_print({"error": "Téléchargement interrompu (reprise possible)"})
+        return EXIT_CANCELLED
+    finally:
+        if progress:
+            print(file=sys.stderr)
+    if download.error is not None:
+        cli_print({"error": str(download.error), "type": type(download.error).__name__})
+        return EXIT_FIRMWARE if isinstance(download.error, (ManifestError, ImageError)) else EXIT_NETWORK
+    cli_print({"manifest": args.manifest, "chipFamily": download.chip_family,
+               "parts": [{key: result[key] for key in ("offset", "path", "size", "sha256", "cached")}
+                         for result in download.result],
+               "merged": download.merged["path"] if download.merged else None})
+    return EXIT_OK
 
-def load_license_data():
-    """Charge les données de licence depuis un fichier local."""
-    if os.path.exists(LICENSE_FILE):
-        try:
-            with open(LICENSE_FILE, 'r') as f:
-                return json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
-            # Si le fichier existe mais est corrompu, on le supprime
-            os.remove(LICENSE_FILE)
-            print(f"Fichier de licence corrompu/illisible. Suppression: {e}")
-            return None
-    return None
+def cli_serve(args):
+    server = WebFlasherServer(port=args.port)
+    print(f"Web-flasher local sur {server.url} (Ctrl+C pour arrêter)", file=sys.stderr)
+    try:
+        server._serve()
+    except KeyboardInterrupt:
+        pass
+    return EXIT_OK
 
-def delete_local_license():
-    """Supprime le fichier de licence localement."""
-    if os.path.exists(LICENSE_FILE):
-        try:
-            os.remove(LICENSE_FILE)
-            return True
-        except Exception as e:
-            print(f"Erreur lors de la suppression du fichier de licence: {e}")
-            return False
-    return True
+def cli_vendor(args):
+    """Copie dans vendor/ les bibliothèques des pages : le web-flasher local ne dépend plus des CDN."""
+    import requests
+    try:
+        files = vendor_web_assets(args.root)
+    except (DownloadError, requests.exceptions.RequestException, OSError) as e:
+        cli_print({"error": str(e), "type": type(e).__name__})
+        return EXIT_NETWORK
+    cli_print({"vendor": os.path.join(args.root, "vendor"), "files": files})
+    return EXIT_OK
 
-# ============================
-# LICENCE LOGIC (Worker Cloudflare)
-# ============================
-def check_and_bind_key(key):
-    """Vérifie la licence via le Worker Cloudflare et retourne tuple (ok, message, data)."""
-    hwid = get_hwid()
+def cli_block_index(args):
+    """Publication d'un firmware : <image>.blocks.json, à héberger à côté du .bin pour les mises à jour différentielles."""
+    indexes = [write_block_index(path) for path in args.images]
+    cli_print([{"path": path + ".blocks.json", "blocks": len(index["blocks"]), "block_size": index["block_size"],
+                "sha256": index["sha256"]} for path, index in zip(args.images, indexes)])
+    return EXIT_OK
+
+def cli_main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="HAKO-PRO-2026.py", description="Hako Launcher sans interface (sortie JSON).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    status = commands.add_parser("status", help="état de la licence locale (bail, ou Worker si nécessaire)")
+    status.add_argument("--check", action="store_true", help="toujours revalider auprès du Worker")
+    status.set_defaults(run=cli_status)
+    activate = commands.add_parser("activate", help="activer une clé et la lier à cette machine")
+    activate.add_argument("key")
+    activate.set_defaults(run=cli_activate)
+    fetch = commands.add_parser("fetch", help="télécharger et vérifier les parties d'un manifest")
+    fetch.add_argument("manifest", help="ex. manifest.json")
+    fetch.add_argument("--base-url", default=FIRMWARE_BASE_URL)
+    fetch.set_defaults(run=cli_fetch)
+    serve = commands.add_parser("serve", help="web-flasher local")
+    serve.add_argument("port", nargs="?", type=int, default=WEB_PORT)
+    serve.set_defaults(run=cli_serve)
+    vendor = commands.add_parser("vendor", help="copier en local les bibliothèques JS/CSS des pages (esp-web-tools, Font Awesome)")
+    vendor.add_argument("--root", default=WEB_ROOT)
+    vendor.set_defaults(run=cli_vendor)
+    block_index = commands.add_parser("block-index", help="écrire <image>.blocks.json pour chaque image")
+    block_index.add_argument("images", nargs="+")
+    block_index.set_defaults(run=cli_block_index)
+    args = parser.parse_args(argv)
     try:
-        r = requests.post(WORKER_URL, json={"license": key, "hwid": hwid}, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-
-        if not data.get("valid", False):
-            error_msg = data.get("error", "Erreur inconnue du Worker.")
-            return False, error_msg, None
-
-        return True, "activated" if data.get("hwid") == hwid else "already_bound", data
-
-    except requests.exceptions.HTTPError as http_err:
-        status_code = http_err.response.status_code
-        return False, f"Erreur de l'API: {status_code}. Vérifiez l'URL du Worker.", None
-    except requests.exceptions.ConnectionError:
-        return False, "Erreur de connexion réseau (Connexion refusée ou DNS échoué).", None
-    except requests.exceptions.Timeout:
-        return False, "Délai d'attente dépassé (Worker lent).", None
-    except requests.exceptions.RequestException as e:
-        return False, f"Erreur réseau générale: {e}", None
-    except ValueError:
-        return False, "Réponse invalide du Worker (JSON mal formé).", None
+        return args.run(args)
+    finally:
+        METRICS.flush() # Les commandes sont courtes : export à chaque exécution
+        BACKGROUND.shutdown(SHUTDOWN_GRACE_S)
 
 # ============================
-# UI : THEME / STYLES & ANIMATION
+# UI (chargée à la demande par load_ui : les commandes CLI n'importent jamais tkinter)
 # ============================
 PRIMARY_BG = "#0b0016"
 PANEL_BG = "#120022"
 NEON_PINK = "#ff2df2"
 NEON_PULSE_COLORS = ["#ff2df2", "#d400ff", "#ff66cc", "#ff00aa", "#cc00ff", "#00fff2", "#00ff66"]
-PULSE_SPEED_MS = 300
+PULSE_SPEED_MS = 300   # Intervalle entre deux images du pulse (un seul réveil, comme l'ancien menu_bg_pulse)
+PULSE_STEPS = 3        # Images interpolées par transition : une couleur néon toutes les 900 ms, sans réveil en plus
+PULSE_DIM = 5          # Facteur d'assombrissement du fond du menu
+ANIMATION_MAX_FPS = 30 # Plafond global des animations
+UI_NAMES = ("StallWatchdog", "ThemeFont", "ThemeText", "ThemeToken", "ThemeRegistry", "build_pulse_table",
+            "AnimationScheduler", "HakoApp", "HomePage", "DownloadPage", "OptionsPage", "InfoPage", "MonitorPage",
+            "SupportPage", "PAGE_CLASSES")
+
+def load_ui():
+    """Importe tkinter et définit l'interface (thème, animations, HakoApp, pages) dans ce module, une seule fois.
 
-def menu_bg_pulse(widget, app, idx=[0]):
-    """Anime le fond du menu avec un effet de couleur pulsée néon (plus subtil)."""
-    if not app.running:
+    Les noms de UI_NAMES restent des globales du module ; hors du module, hako.HakoApp (ou tout autre nom
+    de UI_NAMES) charge l'interface au premier accès (voir __getattr__).
+    """
+    global tk, messagebox, StallWatchdog, ThemeFont, ThemeText, ThemeToken, ThemeRegistry, build_pulse_table
+    global AnimationScheduler, HakoApp, HomePage, DownloadPage, OptionsPage, InfoPage, MonitorPage, SupportPage
+    global PAGE_CLASSES
+    if "HakoApp" in globals():
         return
-    
-    # 1. Calcul de la couleur de fond
-    color = NEON_PULSE_COLORS[idx[0] % len(NEON_PULSE_COLORS)]
-    try:
-        r = int(color[1:3], 16)
-        g = int(color[3:5], 16)
-        b = int(color[5:7], 16)
-        # Assombrir la couleur pour le fond du menu (effet "basse fréquence" du néon)
-        dark_color = f"#{r//5:02x}{g//5:02x}{b//5:02x}" 
-    except ValueError:
-        dark_color = "#080012" # Fallback color
+    start = time.perf_counter()
+    import tkinter as tk
+    from tkinter import messagebox
 
-    widget.configure(bg=dark_color)
-    
-    idx[0] += 1
-    # Stocker l'ID de l'animation pour pouvoir l'arrêter proprement
-    # Attention: Si 'app' est détruit avant 'after' mais 'running' est toujours True, cela peut causer un crash.
-    # L'appel à 'after' doit être la dernière chose faite dans le thread principal.
-    if app.running:
-        app.pulse_job = widget.after(PULSE_SPEED_MS, lambda: menu_bg_pulse(widget, app, idx))
+    class StallWatchdog(tk.CallWrapper):
+        """Enveloppe des callbacks Tk : tout callback plus long que STALL_THRESHOLD_MS est enregistré avec son nom.
 
-# ============================
-# MAIN APP
-# ============================
-class HakoApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Hako Rachon Launcher V4 PRO — Quantum")
-        self.geometry("760x460")
-        self.resizable(False, False)
-        self.running = True
-        self.pulse_job = None # ID du job pour l'animation Tkinter
-        
-        # Initialiser les couleurs et la police
-        self.theme_colors = {
-            "primary_bg": PRIMARY_BG,
-            "panel_bg": PANEL_BG,
-            "neon_accent": NEON_PINK,
-            "text_fg": "#d4b3ff",
-            "button_bg": "#0a0018",
-        }
-        self.current_font = DEFAULT_FONT
-        self.license_data = None
-        self.configure(bg=self.theme_colors["primary_bg"])
+        Installée via install() avant la création des widgets ; ne coûte rien quand la boucle est au repos.
+        """
+
+        def __call__(self, *args):
+            start = time.perf_counter()
+            try:
+                return super().__call__(*args)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                if ms > STALL_THRESHOLD_MS:
+                    METRICS.record("stall", "tk.stall", ms, callback=self.callback_name(self.func))
+
+        @staticmethod
+        def callback_name(func):
+            """Nom du callable réellement appelé : after()/after_idle() enveloppent le callback dans callit."""
+            if getattr(func, "__qualname__", "").endswith("after.<locals>.callit"):
+                for cell in func.__closure__ or ():
+                    try:
+                        inner = cell.cell_contents
+                    except ValueError: # Cellule vide
+                        continue
+                    if callable(inner) and getattr(inner, "__name__", None) == func.__name__:
+                        func = inner # tkinter recopie le nom du callback sur callit
+                        break
+            return getattr(func, "__qualname__", None) or getattr(func, "__name__", None) or repr(func)
+
+        @classmethod
+        def install(cls):
+            tk.CallWrapper = cls
+
+    class ThemeFont:
+        """Police dérivée du jeton current_font : ThemeFont(18, "bold") -> (current_font, 18, "bold")."""
+        deps = ("current_font",)
+
+        def __init__(self, size, *styles):
+            self.size = size
+            self.styles = styles
+
+        def resolve(self, tokens):
+            return (tokens["current_font"], self.size, *self.styles)
+
+    class ThemeText:
+        """Texte formaté à partir de jetons : ThemeText("Fond Principal ({primary_bg})")."""
+
+        def __init__(self, template):
+            self.template = template
+            self.deps = tuple(name for _, name, _, _ in string.Formatter().parse(template) if name)
+
+        def resolve(self, tokens):
+            return self.template.format(**tokens)
+
+    class ThemeToken:
+        """Valeur brute d'un jeton (forme implicite d'une chaîne passée à bind/create)."""
+
+        def __init__(self, name):
+            self.name = name
+            self.deps = (name,)
+
+        def resolve(self, tokens):
+            return tokens[self.name]
+
+    class ThemeRegistry:
+        """Registre des jetons de thème (couleurs, police) et des widgets qui y sont liés.
+
+        Chaque option de widget est liée à une spécification (nom de jeton, ThemeFont ou ThemeText).
+        update() ne reconfigure que les widgets liés aux jetons réellement modifiés,
+        en un seul passage et avec un seul appel configure() par widget. Les widgets sont référencés
+        faiblement : un widget détruit et libéré quitte le registre sans attendre le prochain update().
+        """
+
+        def __init__(self, tokens):
+            self.tokens = dict(tokens)
+            self._bindings = weakref.WeakKeyDictionary()  # widget -> {option: spec}
+            self._by_token = {}  # jeton -> WeakSet des widgets qui en dépendent
+
+        def resolve(self, specs):
+            """Valeurs actuelles d'un dictionnaire {option: spec}."""
+            return {option: spec.resolve(self.tokens) for option, spec in specs.items()}
+
+        def create(self, widget_class, parent, specs, **kwargs):
+            """Crée un widget directement avec ses valeurs de thème finales et le lie au registre."""
+            specs = self._register(None, specs)
+            widget = widget_class(parent, **kwargs, **self.resolve(specs))
+            self._register(widget, specs)
+            return widget
+
+        def bind(self, widget, **specs):
+            """Lie (ou relie) des options d'un widget existant à des jetons et les applique."""
+            specs = self._register(widget, specs)
+            widget.configure(**self.resolve(specs))
+            return widget
+
+        def unbind(self, widget, *options):
+            """Détache des options d'un widget (elles ne suivront plus le thème)."""
+            specs = self._bindings.get(widget, {})
+            for option in options:
+                specs.pop(option, None)
+            self._reindex(widget)
+
+        def update(self, **changes):
+            """Applique les jetons modifiés ; retourne le nombre de widgets reconfigurés."""
+            changed = {name for name, value in changes.items() if self.tokens.get(name) != value}
+            if not changed:
+                return 0
+            for name in changed:
+                self.tokens[name] = changes[name]
+
+            # Regroupe toutes les options touchées par widget : un seul configure() par widget
+            pending = {}
+            for name in changed:
+                for widget in self._by_token.get(name, ()):
+                    options = pending.setdefault(widget, {})
+                    for option, spec in self._bindings[widget].items():
+                        if name in spec.deps:
+                            options[option] = spec
+
+            for widget, options in pending.items():
+                try:
+                    widget.configure(**self.resolve(options))
+                except tk.TclError:
+                    self._forget(widget) # Widget détruit entre-temps
+            return len(pending)
+
+        def _register(self, widget, specs):
+            specs = {option: ThemeToken(spec) if isinstance(spec, str) else spec for option, spec in specs.items()}
+            if widget is not None:
+                self._bindings.setdefault(widget, {}).update(specs)
+                self._reindex(widget)
+            return specs
+
+        def _reindex(self, widget):
+            deps = {dep for spec in self._bindings.get(widget, {}).values() for dep in spec.deps}
+            for name, widgets in self._by_token.items():
+                if name not in deps:
+                    widgets.discard(widget)
+            for name in deps:
+                self._by_token.setdefault(name, weakref.WeakSet()).add(widget)
+
+        def _forget(self, widget):
+            self._bindings.pop(widget, None)
+            for widgets in self._by_token.values():
+                widgets.discard(widget)
+
+    def build_pulse_table(colors=NEON_PULSE_COLORS, steps=PULSE_STEPS, dim=PULSE_DIM):
+        """Précalcule les fonds du menu : interpolation entre couleurs néon consécutives (cycle), assombries."""
+        rgb = []
+        for color in colors:
+            try:
+                rgb.append((int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)))
+            except ValueError:
+                continue # Couleur invalide ignorée
+        if not rgb:
+            return ["#080012"] # Fallback color
+
+        table = []
+        for i, start in enumerate(rgb):
+            end = rgb[(i + 1) % len(rgb)]
+            for step in range(steps):
+                t = step / steps
+                r, g, b = (round(a + (z - a) * t) // dim for a, z in zip(start, end))
+                table.append(f"#{r:02x}{g:02x}{b:02x}")
+        return table
+
+    class AnimationScheduler:
+        """Planificateur unique des animations Tk (un seul job after() pour toutes).
+
+        Le rythme est plafonné à max_fps, les images en retard sont sautées plutôt que rattrapées,
+        et tout est suspendu tant que la fenêtre est réduite ou cachée (aucun réveil inutile).
+        """
+
+        def __init__(self, root, max_fps=ANIMATION_MAX_FPS):
+            self.root = root
+            self.min_interval = 1.0 / max_fps
+            self._animations = {} # nom -> [callback, intervalle (s), prochaine échéance, n° d'image]
+            self._job = None
+            self._paused = False
+            root.bind("<Unmap>", self._on_unmap, add="+")
+            root.bind("<Map>", self._on_map, add="+")
+
+        def add(self, name, callback, interval_ms):
+            """Ajoute (ou remplace) une animation : callback(n° d'image) toutes les interval_ms."""
+            interval = max(interval_ms / 1000.0, self.min_interval)
+            self._animations[name] = [callback, interval, time.monotonic(), 0]
+            self._reschedule()
+
+        def remove(self, name):
+            self._animations.pop(name, None)
+            self._reschedule()
+
+        def pause(self):
+            self._paused = True
+            self._cancel_job()
+
+        def resume(self):
+            if self._paused:
+                self._paused = False
+                now = time.monotonic()
+                for animation in self._animations.values():
+                    animation[2] = now
+                self._reschedule()
+
+        def cancel_all(self):
+            """Arrête et oublie toutes les animations (fermeture de l'application)."""
+            self._animations.clear()
+            self._cancel_job()
+
+        def _on_unmap(self, event):
+            if event.widget is self.root: # Les <Unmap> des widgets enfants remontent aussi ici
+                self.pause()
+
+        def _on_map(self, event):
+            if event.widget is self.root:
+                self.resume()
+
+        def _cancel_job(self):
+            if self._job is not None:
+                try:
+                    self.root.after_cancel(self._job)
+                except tk.TclError:
+                    pass
+                self._job = None
+
+        def _reschedule(self):
+            self._cancel_job()
+            if self._paused or not self._animations:
+                return
+            delay = min(animation[2] for animation in self._animations.values()) - time.monotonic()
+            # Arrondi au-dessus : un réveil en avance d'une fraction de ms ne trouverait rien à faire et
+            # relancerait after(0) en boucle jusqu'à l'échéance
+            self._job = self.root.after(max(0, math.ceil(delay * 1000)), self._tick)
+
+        def _tick(self):
+            self._job = None
+            now = time.monotonic()
+            for animation in list(self._animations.values()):
+                callback, interval, due, frame = animation
+                if due > now:
+                    continue
+                callback(frame)
+                animation[3] = frame + 1
+                # Pas de rattrapage : une image en retard est simplement sautée
+                animation[2] = max(due + interval, now + self.min_interval)
+            self._reschedule()
+
+    # ============================
+    # MAIN APP
+    # ============================
+    class HakoApp(tk.Tk):
+        def __init__(self):
+            StallWatchdog.install() # Avant tout enregistrement de callback Tk
+            super().__init__()
+            self.title("Hako Rachon Launcher V4 PRO — Quantum")
+            self.geometry("760x460")
+            self.resizable(False, False)
+            self.running = True
+            self.animations = None # Planificateur des animations (créé dans setup_ui)
+            self.license_job = None # ID du job de revalidation planifiée du bail
+            self.net_poll_job = None # ID du job de relève des résultats réseau
+            self.download_job = None # ID du job de relève de la progression du téléchargement firmware
+            self.firmware_download = None # FirmwareDownload en cours (un seul à la fois)
+            self.flash_job = None # ID du job de relève de la progression du flash série
+            self.firmware_flash = None # FirmwareFlash en cours
+            self.monitor_job = None # ID du job de rafraîchissement du moniteur série
+            self.serial_monitor = None # SerialMonitor ouvert (un port à la fois)
+            self.web_server = None # WebFlasherServer, démarré à la première ouverture de l'installateur local
+            self.settings = load_settings() # Lu une seule fois, avant la création du moindre widget
+            self.network = NetworkWorker()
+            self.network.start()
         
-        # Setup Widgets
-        self.setup_ui()
+            # Initialiser les couleurs et la police (jetons du thème) : le profil enregistré remplace les valeurs
+            # par défaut dès ici, les widgets sont donc créés directement avec leur style final
+            self.theme = ThemeRegistry({
+                "primary_bg": PRIMARY_BG,
+                "panel_bg": PANEL_BG,
+                "neon_accent": NEON_PINK,
+                "text_fg": "#d4b3ff",
+                "button_bg": "#0a0018",
+                "current_font": DEFAULT_FONT,
+                **self.settings["theme"],
+            })
+            # Lecture seule : les modifications passent par apply_theme() pour ne reconfigurer que le nécessaire
+            self.theme_colors = self.theme.tokens
+            self.license_data = None
+            self.theme.bind(self, bg="primary_bg")
+
+            # Préchauffe la connexion au Worker et collecte les infos système pendant la construction de la fenêtre.
+            # Hors du thread réseau : un Worker lent ne retarde pas la vérification de la licence.
+            BACKGROUND.spawn(prewarm_worker_session, "hako-prewarm")
+            SYSTEM_FACTS.start()
+        
+            # Setup Widgets
+            with METRICS.span("setup_ui"):
+                self.setup_ui()
         
-        # Tente de charger et de vérifier la licence au démarrage
-        self.load_initial_license() 
+            # Tente de charger et de vérifier la licence au démarrage
+            with METRICS.span("load_initial_license"):
+                self.load_initial_license() 
         
-        # Le protocole WM_DELETE_WINDOW garantit un arrêt propre lors de la fermeture de la fenêtre.
-        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+            # Le protocole WM_DELETE_WINDOW garantit un arrêt propre lors de la fermeture de la fenêtre.
+            self.protocol("WM_DELETE_WINDOW", self.on_closing)
         
 
-    def load_initial_license(self):
-        """Charge la clé sauvegardée et vérifie sa validité via le Worker en arrière-plan."""
-        saved_data = load_license_data()
-        # Assurez-vous que la page "home" est initialisée avant d'y accéder
-        if "home" not in self.pages:
-            self.pages["home"] = HomePage(self.container, self)
-            
-        self.pages["home"].set_buttons_active(False) # Désactiver le bouton d'activation pendant la vérification initiale
+        def load_initial_license(self):
+            """Charge la clé sauvegardée : bail local valide => accès immédiat, sinon vérification via le Worker."""
+            self.get_page("home").set_buttons_active(False) # Désactiver le bouton d'activation pendant la vérification initiale
+
+            # Le bail est lié au HWID : on attend la collecte des infos système (la fenêtre s'affiche entre-temps)
+            if not SYSTEM_FACTS.ready:
+                self.get_page("home").place(x=0, y=0, relwidth=1, relheight=1) # Premier affichage immédiat
+                self.get_page("home").set_status("Initialisation...")
+                self.on_system_facts(lambda facts: self.load_initial_license())
+                return
 
-        if saved_data and saved_data.get("license"):
-            key = saved_data["license"]
-            self.pages["home"].key_var.set(key) # Pré-remplit le champ
-            self.pages["home"].set_status("Vérification de la licence sauvegardée... (Réseau)", "#ffcc00")
-            self.config(cursor="watch") # Curseur de chargement
+            saved_data = load_license_data()
+            if saved_data and saved_data.get("license"):
+                key = saved_data["license"]
+                self.get_page("home").key_var.set(key) # Pré-remplit le champ
+
+                # Stale-while-revalidate : le bail local suffit pour ouvrir la page de téléchargement,
+                # la revalidation réseau est planifiée en arrière-plan.
+                lease = load_license_lease(key)
+                if lease:
+                    self.show_download_page(saved_data)
+                    self.schedule_license_recheck(key, lease_next_check(lease) - time.time())
+                    return
+
+                self.get_page("home").set_status("Vérification de la licence sauvegardée... (Réseau)", "#ffcc00")
+                self.config(cursor="watch") # Curseur de chargement
             
-            # Lance la vérification réseau dans un thread
-            threading.Thread(target=lambda: self._check_saved_key(key)).start()
-        else:
-            self.show_home() # Afficher l'accueil normal si aucune clé n'est sauvegardée
-            self.pages["home"].set_buttons_active(True)
-            self.pages["home"].set_status("Entrez une clé PRO pour activer.")
-
-    def _check_saved_key(self, key):
-        """Vérification réseau pour la clé sauvegardée."""
-        ok, msg, license_data = check_and_bind_key(key)
-        self.after(0, lambda: self._handle_saved_check_result(ok, msg, license_data, key))
-
-    def _handle_saved_check_result(self, ok, msg, license_data, key):
-        """Met à jour l'interface après la vérification de la clé sauvegardée."""
-        home_page = self.pages["home"]
-        self.config(cursor="") # Réinitialiser le curseur
-
-        if ok:
-            # Clé valide
-            self.save_license_data(license_data)
-            home_page.set_status("Licence valide, Bienvenue.", self.theme_colors["neon_accent"])
-            self.show_download_page(license_data) # Va directement à la page de téléchargement
-        else:
-            # Clé invalide ou erreur réseau/HWID
-            delete_local_license() # Supprimer la clé invalide localement
-            home_page.set_buttons_active(True)
-            home_page.set_status(f"Licence expirée/invalide. Veuillez entrer une clé. (Erreur: {msg})", "#ff4444")
-            self.show_home()
+                # Lance la vérification réseau (thread réseau partagé)
+                self.verify_key_async(key, lambda ok, msg, license_data: self._handle_saved_check_result(ok, msg, license_data, key))
+            else:
+                self.show_home() # Afficher l'accueil normal si aucune clé n'est sauvegardée
+                self.get_page("home").set_buttons_active(True)
+                self.get_page("home").set_status("Entrez une clé PRO pour activer.")
+
+        def verify_key_async(self, key, callback):
+            """Vérifie key dans le thread réseau ; callback(ok, msg, data) est appelé dans le thread Tk.
+
+            Si une vérification de la même clé est déjà en cours, elle est partagée au lieu d'être relancée.
+            """
+            self.network.verify_key(key, lambda result: callback(*result))
+            self._poll_network()
+
+        def _poll_network(self):
+            """Livre les résultats réseau disponibles ; la relève s'arrête d'elle-même quand plus rien n'est en cours."""
+            if self.net_poll_job:
+                self.after_cancel(self.net_poll_job)
+                self.net_poll_job = None
+            if not self.running:
+                return
+            self.network.deliver()
+            if self.network.busy:
+                self.net_poll_job = self.after(NETWORK_POLL_MS, self._poll_network)
+
+        def _handle_saved_check_result(self, ok, msg, license_data, key):
+            """Met à jour l'interface après la vérification de la clé sauvegardée."""
+            home_page = self.get_page("home")
+            self.config(cursor="") # Réinitialiser le curseur
+
+            if ok:
+                # Clé valide
+                self.save_license_data(license_data, key)
+                home_page.set_status("Licence valide, Bienvenue.", self.theme_colors["neon_accent"])
+                self.show_download_page(license_data) # Va directement à la page de téléchargement
+            else:
+                # Clé refusée par le Worker : suppression locale. Erreur réseau : on garde la clé pour le prochain lancement.
+                self.show_home() # Avant set_status : show_home remet le message d'accueil
+                home_page.set_buttons_active(True)
+                if license_data is not None:
+                    delete_local_license()
+                    home_page.set_status(f"Licence expirée/invalide. Veuillez entrer une clé. (Erreur: {msg})", "#ff4444")
+                else:
+                    home_page.set_status(f"Vérification impossible, clé conservée. Réessayez plus tard. ({msg})", "#ffcc00")
+
+        def schedule_license_recheck(self, key, delay_s):
+            """Planifie la revalidation du bail (remplace toute revalidation déjà planifiée)."""
+            self.cancel_license_recheck()
+            # Tk n'accepte pas les délais négatifs ; le TTL borne l'attente.
+            delay_ms = int(min(max(delay_s, 0), LEASE_TTL_S) * 1000)
+            self.license_job = self.after(delay_ms, lambda: self._start_license_recheck(key))
+
+        def cancel_license_recheck(self):
+            if self.license_job:
+                self.after_cancel(self.license_job)
+                self.license_job = None
+
+        def _start_license_recheck(self, key):
+            """Revalidation réseau du bail (en arrière-plan, l'interface reste utilisable)."""
+            self.license_job = None
+            self.verify_key_async(key, lambda ok, msg, license_data: self._handle_revalidation_result(ok, msg, license_data, key))
+
+        def _handle_revalidation_result(self, ok, msg, license_data, key):
+            """Applique le résultat de la revalidation en arrière-plan."""
+            if not self.license_data or self.license_data.get("license", key) != key:
+                return # La licence a été effacée ou changée entre-temps
+
+            state, lease = revalidate_lease(key, (ok, msg, license_data))
+            if state == "active":
+                self.license_data = load_license_data()
+                if "download" in self.pages:
+                    self.pages["download"].update_content(self.license_data)
+                self.schedule_license_recheck(key, lease_next_check(lease) - time.time())
+            elif state == "offline":
+                # Worker injoignable : le bail reste valable, on réessaie plus tard
+                self.schedule_license_recheck(key, LEASE_RETRY_S)
+            else:
+                # Refus explicite du Worker, ou bail trop ancien pour continuer hors-ligne
+                self.license_data = None
+                self.show_home()
+                self.get_page("home").set_status(f"Licence expirée/invalide. Veuillez entrer une clé. (Erreur: {msg})", "#ff4444")
             
-    def save_license_data(self, data):
-        """Fonction wrapper pour la sauvegarde de la clé."""
-        self.license_data = data
-        save_license_data(data)
-
-    def setup_ui(self):
-        # Barre supérieure
-        self.top = tk.Frame(self, bg=self.theme_colors["panel_bg"], height=70)
-        self.top.pack(fill="x", side="top")
-        self.top_title = tk.Label(self.top, text="HAKO RACHON LAUNCHER V4 PRO",
-                                 bg=self.theme_colors["panel_bg"], fg=self.theme_colors["neon_accent"],
-                                 font=(self.current_font, 20, "bold"))
-        self.top_title.pack(side="left", padx=16, pady=8)
-        self.top_hwid_text = f"HWID: {get_hwid()[:12]}..."
-        self.top_hwid = tk.Label(self.top, text=self.top_hwid_text, bg=self.theme_colors["panel_bg"],
-                                 fg=self.theme_colors["text_fg"], font=("Consolas", 10))
-        self.top_hwid.pack(side="right", padx=12)
-
-        # Menu de gauche RGB
-        self.menu = tk.Frame(self, bg=self.theme_colors["panel_bg"], width=200)
-        self.menu.place(x=0, y=70, height=390)
-        self.menu_buttons = []
-
-        self.pages = {}
-        
-        btn_cfg = [
-            ("HOME", self.show_home),
-            ("OPTIONS", self.show_options),
-            ("SYS INFO", self.show_info),
-            ("SUPPORT", self.show_support),
-        ]
-        
-        # Initialisation des pages (les placer ici assure qu'elles existent avant load_initial_license)
-        self.container = tk.Frame(self, bg=self.theme_colors["primary_bg"])
-        self.container.place(x=200, y=70, width=560, height=390)
-        self.pages["home"] = HomePage(self.container, self)
-        self.pages["options"] = OptionsPage(self.container, self)
-        self.pages["info"] = InfoPage(self.container, self)
-        self.pages["support"] = SupportPage(self.container, self)
-        
-        for i, (t, cmd) in enumerate(btn_cfg):
-            b = tk.Button(self.menu, text=t, command=cmd,
-                          bg=self.theme_colors["button_bg"], fg=self.theme_colors["neon_accent"],
-                          font=(self.current_font, 11, "bold"), relief="flat", 
-                          activebackground=self.theme_colors["neon_accent"], 
-                          activeforeground=self.theme_colors["button_bg"], 
-                          borderwidth=0 # Look pro
-                          ) 
-            b.place(x=10, y=10 + i*50, width=180, height=40)
-            self.menu_buttons.append(b)
+        def open_local_installer(self, manifest_name=FIRMWARE_MANIFEST):
+            """Démarre (une fois) le web-flasher local et ouvre la page d'installation du manifest dans le navigateur."""
+            import webbrowser
+            if self.web_server is None:
+                self.web_server = WebFlasherServer()
+                self.web_server.start()
+            webbrowser.open(self.web_server.url + WEB_PAGES.get(manifest_name, "index.html"))
+
+        def start_firmware_download(self, manifest_name=FIRMWARE_MANIFEST):
+            """Lance le téléchargement intégré des parties du manifest (ignoré si un téléchargement est en cours)."""
+            if self.firmware_download and not self.firmware_download.finished.is_set():
+                return False
+            self.firmware_download = FirmwareDownload(manifest_name).start()
+            self._poll_download()
+            return True
+
+        def cancel_firmware_download(self):
+            if self.firmware_download:
+                self.firmware_download.cancel()
+
+        def _poll_download(self):
+            """Affiche la progression sur DownloadPage jusqu'à la fin du téléchargement."""
+            self.download_job = None
+            download = self.firmware_download
+            if not self.running or download is None:
+                return
+            page = self.pages.get("download")
+            if not download.finished.is_set():
+                if page:
+                    page.show_download_progress(download.status_text)
+                self.download_job = self.after(DOWNLOAD_POLL_MS, self._poll_download)
+            elif page:
+                page.show_download_result(download.result, download.error, download.merged)
+
+        def start_firmware_flash(self, port):
+            """Flashe le dernier firmware téléchargé sur le port série ; retourne un message si c'est impossible."""
+            download = self.firmware_download
+            if download is None or not download.result:
+                return "Téléchargez d'abord le firmware."
+            if self.firmware_flash and not self.firmware_flash.finished.is_set():
+                return "Flash déjà en cours."
+            if not port:
+                return "Indiquez le port série (COM3, /dev/ttyACM0...)."
+            if self.serial_monitor and not self.serial_monitor.finished.is_set():
+                return "Fermez d'abord le moniteur série (port occupé)."
+            parts = [(result["offset"], result["path"]) for result in download.result]
+            self.firmware_flash = FirmwareFlash(port, parts, download.chip_family).start()
+            self._poll_flash()
+            return None
+
+        def _poll_flash(self):
+            self.flash_job = None
+            flash = self.firmware_flash
+            if not self.running or flash is None:
+                return
+            page = self.pages.get("download")
+            if not flash.finished.is_set():
+                if page:
+                    page.show_download_progress(flash.status_text)
+                self.flash_job = self.after(DOWNLOAD_POLL_MS, self._poll_flash)
+            elif page:
+                page.show_flash_result(flash.result, flash.error)
+
+        def detect_devices(self, callback, chip_family=None, force=False):
+            """Cherche les cartes ESP en arrière-plan ; callback(cartes, erreur) est appelé dans le thread Tk.
+
+            Comme pour les infos système, le résultat passe par la file relevée par _poll_network ; une
+            détection identique déjà en cours est partagée au lieu d'être relancée.
+            """
+            job_key = ("devices", chip_family, force)
+
+            def scan():
+                try:
+                    result = DEVICES.scan(chip_family, force), None
+                except Exception as e:
+                    result = [], e
+                self.network.resolve(job_key, result)
+
+            if self.network.expect(job_key, lambda result: callback(*result)):
+                BACKGROUND.spawn(scan, "hako-devices")
+            self._poll_network()
+
+        def start_serial_monitor(self, port, baud=MONITOR_BAUD):
+            """Ouvre le moniteur série sur port ; retourne un message si c'est impossible."""
+            if self.serial_monitor and not self.serial_monitor.finished.is_set():
+                return "Moniteur déjà ouvert."
+            if self.firmware_flash and not self.firmware_flash.finished.is_set():
+                return "Flash en cours sur le port série."
+            try:
+                transport = SerialTransport(port, baud)
+            except Exception as e:
+                return f"Impossible d'ouvrir {port} : {e}"
+            self.serial_monitor = SerialMonitor(transport).start()
+            self._poll_monitor()
+            return None
+
+        def stop_serial_monitor(self):
+            if self.serial_monitor:
+                self.serial_monitor.stop()
+
+        def _poll_monitor(self):
+            """Rend la vue du moniteur une fois par image : les lignes reçues entre deux images sont insérées en un lot."""
+            self.monitor_job = None
+            monitor = self.serial_monitor
+            if not self.running or monitor is None:
+                return
+            page = self.pages.get("monitor")
+            if page and page.winfo_ismapped():
+                page.render(monitor)
+            if monitor.finished.is_set():
+                if page:
+                    page.show_closed(monitor)
+                return
+            self.monitor_job = self.after(MONITOR_FRAME_MS, self._poll_monitor)
+
+        def on_system_facts(self, callback):
+            """Appelle callback(facts) dans le thread Tk dès que les infos système sont disponibles.
+
+            La collecte se termine dans son propre thread : le résultat passe par la file relevée par
+            _poll_network, jamais par un appel Tk depuis ce thread (mainloop n'a peut-être pas démarré).
+            """
+            self.network.expect(("sysfacts",), callback)
+            SYSTEM_FACTS.when_ready(lambda facts: self.network.resolve(("sysfacts",), facts))
+            self._poll_network()
+
+        def save_license_data(self, data, key=None):
+            """Fonction wrapper pour la sauvegarde de la clé et du bail associé (retourne le bail)."""
+            key = key or data.get("license")
+            if key and not data.get("license"):
+                data = dict(data, license=key)
+            self.license_data = data
+            lease = make_license_lease(key, data)
+            save_license_data(data, lease) # Clé et bail : une seule écriture atomique
+            return lease
+
+        @property
+        def current_font(self):
+            return self.theme.tokens["current_font"]
+
+        def setup_ui(self):
+            theme = self.theme
+            # Barre supérieure
+            self.top = theme.create(tk.Frame, self, {"bg": "panel_bg"}, height=70)
+            self.top.pack(fill="x", side="top")
+            self.top_title = theme.create(tk.Label, self.top, {"bg": "panel_bg", "fg": "neon_accent", "font": ThemeFont(20, "bold")},
+                                          text="HAKO RACHON LAUNCHER V4 PRO")
+            self.top_title.pack(side="left", padx=16, pady=8)
+            self.top_hwid = theme.create(tk.Label, self.top, {"bg": "panel_bg", "fg": "text_fg"},
+                                         text="HWID: ...", font=("Consolas", 10))
+            self.top_hwid.pack(side="right", padx=12)
+            self.on_system_facts(lambda facts: self.top_hwid.config(text=f"HWID: {facts['hwid'][:12]}..."))
+
+            # Menu de gauche RGB (le fond est piloté par l'animation, il n'est pas lié au thème)
+            self.menu = tk.Frame(self, bg=self.theme_colors["panel_bg"], width=200)
+            self.menu.place(x=0, y=70, height=390)
+            self.menu_buttons = []
+
+            self.pages = {}
+        
+            btn_cfg = [
+                ("HOME", self.show_home),
+                ("OPTIONS", self.show_options),
+                ("SYS INFO", self.show_info),
+                ("MONITOR", self.show_monitor),
+                ("SUPPORT", self.show_support),
+            ]
+        
+            # Les pages sont construites à la première navigation (voir get_page)
+            self.container = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            self.container.place(x=200, y=70, width=560, height=390)
+        
+            menu_button_theme = {
+                "bg": "button_bg", "fg": "neon_accent", "font": ThemeFont(11, "bold"),
+                "activebackground": "neon_accent", "activeforeground": "button_bg",
+            }
+            for i, (t, cmd) in enumerate(btn_cfg):
+                b = theme.create(tk.Button, self.menu, menu_button_theme, text=t, command=cmd,
+                                 relief="flat", borderwidth=0) # Look pro
+                b.place(x=10, y=10 + i*50, width=180, height=40)
+                self.menu_buttons.append(b)
             
-        # Start the pulsing background animation
-        # La première exécution initialise self.pulse_job
-        self.pulse_job = self.menu.after(0, lambda: menu_bg_pulse(self.menu, self)) 
+            # Start the pulsing background animation (couleurs précalculées, suspendue quand la fenêtre est réduite)
+            pulse_table = build_pulse_table()
+            self.animations = AnimationScheduler(self)
+            self.animations.add("menu_pulse", lambda frame: self.menu.configure(bg=pulse_table[frame % len(pulse_table)]),
+                                PULSE_SPEED_MS)
 
-    def on_closing(self):
-        # 1. Signaler l'arrêt
-        self.running = False
+        def on_closing(self):
+            # 1. Signaler l'arrêt (et prévenir immédiatement toutes les opérations d'arrière-plan)
+            self.running = False
+            BACKGROUND.cancel()
         
-        # 2. Arrêter l'animation (CRITIQUE pour le blocage)
-        if self.pulse_job:
+            # 2. Arrêter les animations (CRITIQUE pour le blocage), la revalidation planifiée et la relève réseau
+            if self.animations:
+                self.animations.cancel_all()
+            for job_attr in ("license_job", "net_poll_job", "download_job", "flash_job", "monitor_job"):
+                job = getattr(self, job_attr)
+                if job:
+                    try:
+                        # Tente d'annuler le job planifié
+                        self.after_cancel(job)
+                        setattr(self, job_attr, None)
+                    except Exception as e:
+                        print(f"Avertissement: Impossible d'annuler le job Tkinter ({job_attr}): {e}")
+        
+            METRICS.flush()
+
+            # 3. Forcer l'arrêt de la boucle Tkinter (pour les threads internes)
+            # Ceci est la principale modification pour garantir un arrêt immédiat.
             try:
-                # Tente d'annuler le job planifié
-                self.after_cancel(self.pulse_job)
-                self.pulse_job = None
+                self.quit() 
             except Exception as e:
-                print(f"Avertissement: Impossible d'annuler l'animation Tkinter: {e}")
-        
-        # 3. Forcer l'arrêt de la boucle Tkinter (pour les threads internes)
-        # Ceci est la principale modification pour garantir un arrêt immédiat.
-        try:
-            self.quit() 
-        except Exception as e:
-            print(f"Avertissement: Impossible d'appeler self.quit(): {e}")
+                print(f"Avertissement: Impossible d'appeler self.quit(): {e}")
             
-        # 4. Détruire la fenêtre principale
-        self.destroy() 
+            # 4. Détruire la fenêtre principale
+            self.destroy() 
+
 
+        def get_page(self, name):
+            """Retourne la page demandée, en la construisant au premier accès."""
+            page = self.pages.get(name)
+            if page is None:
+                page = PAGE_CLASSES[name](self.container, self)
+                self.pages[name] = page
+            return page
 
-    def hide_all(self):
-        for p in self.pages.values():
-            p.place_forget()
+        def hide_all(self):
+            for p in self.pages.values():
+                p.place_forget()
 
-    def show_home(self):
-        self.hide_all()
+        def show_home(self):
+            self.hide_all()
         
-        # NOUVELLE LOGIQUE : Si la licence est active, le bouton HOME redirige vers la page de téléchargement.
-        if self.license_data:
-            self.show_download_page(self.license_data)
-        else:
-            # Si aucune licence n'est chargée, afficher la page d'accueil d'activation.
-            self.pages["home"].place(x=0, y=0, relwidth=1, relheight=1)
-            self.pages["home"].set_buttons_active(True)
-            self.pages["home"].set_status("Entrez une clé PRO pour activer.")
-
-    def show_download_page(self, license_data):
-        self.license_data = license_data
-        self.hide_all()
-        if "download" not in self.pages:
-            self.pages["download"] = DownloadPage(self.container, self, self.license_data)
-        else:
-            self.pages["download"].update_content(self.license_data)
-        self.pages["download"].place(x=0, y=0, relwidth=1, relheight=1)
-
-    def show_options(self):
-        self.hide_all()
-        self.pages["options"].place(x=0, y=0, relwidth=1, relheight=1)
-
-    def show_info(self):
-        self.hide_all()
-        self.pages["info"].place(x=0, y=0, relwidth=1, relheight=1)
-
-    def show_support(self):
-        self.hide_all()
-        self.pages["support"].place(x=0, y=0, relwidth=1, relheight=1)
-
-    def change_color(self, key, title):
-        """Ouvre le sélecteur de couleur et met à jour le thème."""
-        color_code = colorchooser.askcolor(title=f"Choisir la couleur pour: {title}")
-        if color_code and color_code[1]: # (rgb_tuple, hex_code)
-            hex_color = color_code[1]
-            self.theme_colors[key] = hex_color
-            self.apply_theme()
-            messagebox.showinfo("Couleur Changée", f"'{title}' mis à jour en {hex_color}.")
-            
-    def set_font(self, font_name):
-        """Change la police principale de l'application et applique le thème."""
-        self.current_font = font_name
-        self.apply_theme()
-        messagebox.showinfo("Police Changée", f"La police principale est maintenant : {font_name}.")
-
-    def apply_theme(self):
-        """Applique les couleurs et la police du thème à l'application principale et à toutes les pages."""
-        
-        # 1. Mise à jour de la fenêtre principale et de la barre supérieure
-        self.configure(bg=self.theme_colors["primary_bg"])
-        self.top.configure(bg=self.theme_colors["panel_bg"])
-        self.top_title.configure(
-            bg=self.theme_colors["panel_bg"], 
-            fg=self.theme_colors["neon_accent"],
-            font=(self.current_font, 20, "bold")
-        )
-        self.top_hwid.configure(bg=self.theme_colors["panel_bg"], fg=self.theme_colors["text_fg"])
-        self.container.configure(bg=self.theme_colors["primary_bg"])
-        
-        # 2. Mise à jour des boutons du menu 
-        self.menu.configure(bg=self.theme_colors["button_bg"]) # Le pulse gère le fond, mais on donne une base
-        for button in self.menu_buttons:
-            button.configure(
-                font=(self.current_font, 11, "bold"),
-                bg=self.theme_colors["button_bg"], 
-                fg=self.theme_colors["neon_accent"],
-                activebackground=self.theme_colors["neon_accent"], 
-                activeforeground=self.theme_colors["button_bg"]
-            )
+            # NOUVELLE LOGIQUE : Si la licence est active, le bouton HOME redirige vers la page de téléchargement.
+            if self.license_data:
+                self.show_download_page(self.license_data)
+            else:
+                # Si aucune licence n'est chargée, afficher la page d'accueil d'activation.
+                self.get_page("home").place(x=0, y=0, relwidth=1, relheight=1)
+                self.get_page("home").set_buttons_active(True)
+                self.get_page("home").set_status("Entrez une clé PRO pour activer.")
+
+        def show_download_page(self, license_data):
+            self.license_data = license_data
+            self.hide_all()
+            if "download" not in self.pages:
+                self.pages["download"] = DownloadPage(self.container, self, self.license_data)
+            else:
+                self.pages["download"].update_content(self.license_data)
+            self.pages["download"].place(x=0, y=0, relwidth=1, relheight=1)
+
+        def show_options(self):
+            self.hide_all()
+            self.get_page("options").place(x=0, y=0, relwidth=1, relheight=1)
+
+        def show_info(self):
+            self.hide_all()
+            self.get_page("info").refresh_metrics()
+            self.get_page("info").place(x=0, y=0, relwidth=1, relheight=1)
+
+        def show_monitor(self):
+            self.hide_all()
+            self.get_page("monitor").place(x=0, y=0, relwidth=1, relheight=1)
+
+        def show_support(self):
+            self.hide_all()
+            self.get_page("support").place(x=0, y=0, relwidth=1, relheight=1)
+
+        def change_color(self, key, title):
+            """Ouvre le sélecteur de couleur et met à jour le thème."""
+            from tkinter import colorchooser
+            color_code = colorchooser.askcolor(title=f"Choisir la couleur pour: {title}")
+            if color_code and color_code[1]: # (rgb_tuple, hex_code)
+                hex_color = color_code[1]
+                self.apply_theme(**{key: hex_color})
+                messagebox.showinfo("Couleur Changée", f"'{title}' mis à jour en {hex_color}.")
             
-        # 3. Mettre à jour les pages (y compris la page de téléchargement si elle existe)
-        for page_name, page in self.pages.items():
-            if hasattr(page, 'update_theme'):
-                page.update_theme()
+        def set_font(self, font_name):
+            """Change la police principale de l'application et applique le thème."""
+            self.apply_theme(current_font=font_name)
+            messagebox.showinfo("Police Changée", f"La police principale est maintenant : {font_name}.")
+
+        def serve_instance(self, guard):
+            """Reçoit les lancements redirigés par guard ; on_forwarded_args est appelé dans le thread Tk.
+
+            argv passe par la file relevée par _poll_network ; le thread du canal réveille ensuite le thread Tk
+            par un événement virtuel (event_generate est relayé à la boucle Tk), sans relève permanente.
+            """
+            self.bind("<<HakoForwarded>>", lambda event: self._poll_network())
+
+            def forwarded(argv):
+                self.network.post(self.on_forwarded_args, argv)
+                try:
+                    self.event_generate("<<HakoForwarded>>", when="tail")
+                except (RuntimeError, tk.TclError): # Fenêtre fermée entre-temps : plus personne à réveiller
+                    pass
+
+            guard.serve(forwarded)
+
+        def on_forwarded_args(self, argv):
+            """Un second lancement a passé la main : fenêtre au premier plan, manifest éventuel sélectionné."""
+            if not self.running:
+                return
+            self.deiconify()
+            self.lift()
+            self.focus_force()
+            manifests = [arg for arg in argv if MANIFESTS.get(arg)]
+            if manifests and "download" in self.pages:
+                self.pages["download"].select_manifest(manifests[0])
+
+        def save_theme_profile(self, stealth):
+            """Enregistre les jetons de thème courants et les options ; retourne False en cas d'erreur d'écriture."""
+            tokens = self.theme.tokens
+            self.settings = {"theme": {key: tokens[key] for key in (*THEME_COLOR_TOKENS, "current_font")}, "stealth": stealth}
+            try:
+                save_settings(self.settings)
+            except OSError as e:
+                print(f"Erreur de sauvegarde du profil de thème : {e}")
+                return False
+            return True
+
+        def apply_theme(self, **changes):
+            """Applique les jetons de thème modifiés (couleurs, current_font).
+
+            Seuls les widgets liés aux jetons changés sont reconfigurés (voir ThemeRegistry) ;
+            les pages pas encore construites le seront directement avec le thème courant.
+            """
+            with METRICS.span("theme.apply", tokens=sorted(changes)) as span:
+                span["widgets"] = self.theme.update(**changes)
+            return span["widgets"]
             
 
 
-# ============================
-# PAGES (Home, Download, Options, Info, Support)
-# ============================
-
-class HomePage(tk.Frame):
-    def __init__(self, parent, app):
-        super().__init__(parent, bg=app.theme_colors["primary_bg"])
-        self.app = app
-        
-        self.title_label = tk.Label(self, text="Welcome to Hako Rachon Launcher V4 PRO", 
-                                     bg=app.theme_colors["primary_bg"],
-                                     fg=app.theme_colors["neon_accent"], 
-                                     font=(app.current_font, 18, "bold"))
-        self.title_label.pack(pady=12)
-        
-        self.subtitle_label = tk.Label(self, text="Enter your license below to activate (first use binds HWID).",
-                                         bg=app.theme_colors["primary_bg"], 
-                                         fg=app.theme_colors["text_fg"],
-                                         font=(app.current_font, 10))
-        self.subtitle_label.pack(pady=6)
-
-        entry_frame = tk.Frame(self, bg=app.theme_colors["primary_bg"])
-        entry_frame.pack(pady=8)
-        self.key_var = tk.StringVar()
-        self.entry_key = tk.Entry(entry_frame, textvariable=self.key_var, width=38, font=("Consolas", 12),
-                                 bg="#120022", fg="#ffb7ff", insertbackground="#ffffff", borderwidth=1, relief="solid")
-        self.entry_key.grid(row=0, column=0, padx=4, ipady=4)
-
-        self.act_btn = tk.Button(entry_frame, text="Activate", 
-                                 bg=app.theme_colors["neon_accent"], fg="#111",
-                                 font=(app.current_font, 11, "bold"), command=self.activate_key, borderwidth=0, relief="raised")
-        self.act_btn.grid(row=0, column=1, padx=6)
-
-        self.status_label = tk.Label(self, text="", bg=app.theme_colors["primary_bg"], fg="#b3a0ff", font=(app.current_font, 10))
-        self.status_label.pack(pady=6)
-
-    def set_status(self, text, color="#b3a0ff"):
-        """Fonction utilitaire pour mettre à jour le statut et la couleur."""
-        self.status_label.config(text=text, fg=color)
-
-    def set_buttons_active(self, active):
-        """Active ou désactive les éléments interactifs pendant les opérations réseau."""
-        state = tk.NORMAL if active else tk.DISABLED
-        self.entry_key.config(state=state)
-        self.act_btn.config(state=state)
-
-    def update_theme(self):
-        """Met à jour les couleurs et les polices des widgets de la page."""
-        self.configure(bg=self.app.theme_colors["primary_bg"])
-        self.title_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 18, "bold")
-        )
-        self.subtitle_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 10)
-        )
-        self.entry_key.master.configure(bg=self.app.theme_colors["primary_bg"])
-        self.act_btn.configure(
-            bg=self.app.theme_colors["neon_accent"], 
-            activebackground=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 11, "bold")
-        )
-        self.status_label.configure(
-            bg=self.app.theme_colors["primary_bg"],
-            font=(self.app.current_font, 10)
-        )
-
-
-    def activate_key(self):
-        key = self.key_var.get().strip()
-        if not key:
-            messagebox.showwarning("Attention", "Veuillez entrer une clé.")
-            return
+    # ============================
+    # PAGES (Home, Download, Options, Info, Support)
+    # ============================
+
+    class HomePage(tk.Frame):
+        def __init__(self, parent, app):
+            super().__init__(parent)
+            self.app = app
+            theme = app.theme
+            theme.bind(self, bg="primary_bg")
+        
+            self.title_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(18, "bold")},
+                                            text="Welcome to Hako Rachon Launcher V4 PRO")
+            self.title_label.pack(pady=12)
+        
+            self.subtitle_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(10)},
+                                               text="Enter your license below to activate (first use binds HWID).")
+            self.subtitle_label.pack(pady=6)
+
+            entry_frame = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            entry_frame.pack(pady=8)
+            self.key_var = tk.StringVar()
+            self.entry_key = tk.Entry(entry_frame, textvariable=self.key_var, width=38, font=("Consolas", 12),
+                                     bg="#120022", fg="#ffb7ff", insertbackground="#ffffff", borderwidth=1, relief="solid")
+            self.entry_key.grid(row=0, column=0, padx=4, ipady=4)
+
+            self.act_btn = theme.create(tk.Button, entry_frame, {"bg": "neon_accent", "activebackground": "neon_accent", "font": ThemeFont(11, "bold")},
+                                        text="Activate", fg="#111", command=self.activate_key, borderwidth=0, relief="raised")
+            self.act_btn.grid(row=0, column=1, padx=6)
+
+            # fg est piloté par set_status
+            self.status_label = theme.create(tk.Label, self, {"bg": "primary_bg", "font": ThemeFont(10)}, text="", fg="#b3a0ff")
+            self.status_label.pack(pady=6)
+
+        def set_status(self, text, color="#b3a0ff"):
+            """Fonction utilitaire pour mettre à jour le statut et la couleur."""
+            self.status_label.config(text=text, fg=color)
+
+        def set_buttons_active(self, active):
+            """Active ou désactive les éléments interactifs pendant les opérations réseau."""
+            state = tk.NORMAL if active else tk.DISABLED
+            self.entry_key.config(state=state)
+            self.act_btn.config(state=state)
+
+        def activate_key(self):
+            key = self.key_var.get().strip()
+            if not key:
+                messagebox.showwarning("Attention", "Veuillez entrer une clé.")
+                return
+        
+            # 1. Set busy state
+            self.set_buttons_active(False)
+            self.app.config(cursor="watch")
+            original_text = self.act_btn.cget("text")
+            self.act_btn.config(text="Vérification...")
+            self.set_status("Vérification en cours... (Réseau)", "#ffcc00")
+
+            self.app.verify_key_async(key, lambda ok, msg, license_data: self.handle_activation_result(ok, msg, license_data, original_text, key))
+
+        def handle_activation_result(self, ok, msg, license_data, original_text, key=None):
+            # 1. Reset busy state
+            self.set_buttons_active(True)
+            self.app.config(cursor="")
+            self.act_btn.config(text=original_text)
         
-        # 1. Set busy state
-        self.set_buttons_active(False)
-        self.app.config(cursor="watch")
-        original_text = self.act_btn.cget("text")
-        self.act_btn.config(text="Vérification...")
-        self.set_status("Vérification en cours... (Réseau)", "#ffcc00")
-
-        def worker_thread():
-            time.sleep(0.5) 
-            ok, msg, license_data = check_and_bind_key(key)
-            self.app.after(0, lambda: self.handle_activation_result(ok, msg, license_data, original_text))
-
-        threading.Thread(target=worker_thread).start()
-
-    def handle_activation_result(self, ok, msg, license_data, original_text):
-        # 1. Reset busy state
-        self.set_buttons_active(True)
-        self.app.config(cursor="")
-        self.act_btn.config(text=original_text)
-        
-        if ok:
-            # Succès: Sauvegarder les données et passer à la page de téléchargement
-            self.app.save_license_data(license_data)
+            if ok:
+                # Succès: Sauvegarder les données (et le bail) puis passer à la page de téléchargement
+                lease = self.app.save_license_data(license_data, key)
+                self.app.schedule_license_recheck(lease["license"], lease_next_check(lease) - time.time())
             
-            if msg == "activated":
-                final_msg = "Licence activée et liée à cet appareil ✅ (Données sauvegardées)"
-            elif msg == "already_bound":
-                final_msg = "Clé déjà activée sur cet appareil (HWID correspond)."
+                if msg == "activated":
+                    final_msg = "Licence activée et liée à cet appareil ✅ (Données sauvegardées)"
+                elif msg == "already_bound":
+                    final_msg = "Clé déjà activée sur cet appareil (HWID correspond)."
+                else:
+                    final_msg = "Licence valide ✅"
+                self.set_status(final_msg, self.app.theme_colors["neon_accent"])
+                self.app.show_download_page(license_data)
             else:
-                final_msg = "Licence valide ✅"
-            self.set_status(final_msg, self.app.theme_colors["neon_accent"])
-            self.app.show_download_page(license_data)
-        else:
-            # Échec: Afficher l'erreur
-            self.set_status(msg, "#ff4444")
-            delete_local_license()
-
-
-class DownloadPage(tk.Frame):
-    def __init__(self, parent, app, license_data):
-        super().__init__(parent, bg=app.theme_colors["primary_bg"])
-        self.app = app
-        self.download_link = DOWNLOAD_LINK
-        self.license_data = license_data
-        
-        self.title_label = tk.Label(self, text="🚀 TÉLÉCHARGEMENT & LICENCE ACTIVÉE 🚀", bg=app.theme_colors["primary_bg"],
-                                     fg=app.theme_colors["neon_accent"], font=(app.current_font, 18, "bold"))
-        self.title_label.pack(pady=12)
-
-        self.info_frame = tk.Frame(self, bg=app.theme_colors["primary_bg"])
-        self.info_frame.pack(pady=20, padx=20, fill='x')
-
-        self.key_label = tk.Label(self.info_frame, text="", bg=app.theme_colors["primary_bg"],
-                                     fg=app.theme_colors["text_fg"], font=("Consolas", 10))
-        self.key_label.pack(pady=2, anchor='w')
-        self.hwid_label = tk.Label(self.info_frame, text="", bg=app.theme_colors["primary_bg"],
-                                      fg=app.theme_colors["text_fg"], font=("Consolas", 10))
-        self.hwid_label.pack(pady=2, anchor='w')
-        self.expiry_label = tk.Label(self.info_frame, text="", bg=app.theme_colors["primary_bg"],
-                                          fg=app.theme_colors["text_fg"], font=("Consolas", 10, "bold"))
-        self.expiry_label.pack(pady=8, anchor='w')
-
-        self.message_label = tk.Label(self, text="Votre licence est valide. Vous pouvez maintenant télécharger le logiciel.",
-                                         bg=app.theme_colors["primary_bg"], fg=app.theme_colors["text_fg"], font=(app.current_font, 11))
-        self.message_label.pack(pady=10)
-
-        self.download_button = tk.Button(self, text="Télécharger le Logiciel",
-                                             command=self.open_download_link,
-                                             bg=app.theme_colors["neon_accent"],
-                                             fg="#111",
-                                             font=(app.current_font, 14, "bold"),
-                                             width=30, borderwidth=0, relief="raised")
-        self.download_button.pack(pady=15)
-
-        self.unbind_button = tk.Button(self, text="Effacer la Licence Locale (Changer de clé)",
-                                             command=self.clear_license_prompt,
-                                             bg="#551111", # Rouge sombre pour l'opération de sécurité
-                                             fg="#ffaaaa",
-                                             font=(app.current_font, 9),
-                                             width=40, borderwidth=0, relief="flat")
-        self.unbind_button.pack(pady=5)
-        
-        self.link_label = tk.Label(self, text=f"Lien Direct : {self.download_link}",
-                                      bg=app.theme_colors["primary_bg"], fg=app.theme_colors["text_fg"], font=("Consolas", 9))
-        self.link_label.pack(pady=4)
-
-        self.update_content(license_data)
-        
-    def clear_license_prompt(self):
-        """Demande confirmation avant de supprimer la licence locale."""
-        if messagebox.askyesno("Confirmation", 
-                               "Êtes-vous sûr de vouloir supprimer la clé de licence de cet appareil ?\n\n"
-                               "Cela vous ramènera à l'écran d'activation."):
-            self.clear_license()
-
-    def clear_license(self):
-        """Supprime la licence locale et retourne à la page d'accueil."""
-        if delete_local_license():
-            messagebox.showinfo("Licence Effacée", "La clé de licence a été effacée de cet appareil. Veuillez réentrer une clé si vous souhaitez réutiliser le logiciel.")
-            self.app.license_data = None
-            self.app.pages["home"].key_var.set("") # Vide le champ d'entrée
-            self.app.pages["home"].set_status("Clé locale effacée. Veuillez activer à nouveau.", self.app.theme_colors["text_fg"])
-            self.app.show_home()
-        else:
-            messagebox.showerror("Erreur", "Impossible de supprimer le fichier de licence. Veuillez vérifier les permissions.")
-
-
-    def update_theme(self):
-        """Met à jour les couleurs et les polices des widgets de la page."""
-        self.configure(bg=self.app.theme_colors["primary_bg"])
-        self.title_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 18, "bold")
-        )
-        self.info_frame.configure(bg=self.app.theme_colors["primary_bg"])
-        self.key_label.configure(bg=self.app.theme_colors["primary_bg"], fg=self.app.theme_colors["text_fg"])
-        self.hwid_label.configure(bg=self.app.theme_colors["primary_bg"], fg=self.app.theme_colors["text_fg"])
-        # self.expiry_label color is handled by update_content
-        self.message_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 11)
-        )
-        self.download_button.configure(
-            bg=self.app.theme_colors["neon_accent"], 
-            activebackground=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 14, "bold")
-        )
-        self.unbind_button.configure(
-            bg="#551111", 
-            activebackground="#882222",
-            font=(self.app.current_font, 9)
-        )
-        self.link_label.configure(bg=self.app.theme_colors["primary_bg"], fg=self.app.theme_colors["text_fg"])
-
-
-    def update_content(self, license_data):
-        """Met à jour les informations de licence affichées."""
-        self.license_data = license_data
-        if license_data:
-            key_display = license_data.get('license', 'N/A')
-            # Affichage partiel de la clé pour la sécurité/clarté
-            masked_key = key_display[:4] + '...' + key_display[-4:]
-            
-            self.key_label.config(text=f"Clé: {masked_key} (Affichage partiel)")
-            self.hwid_label.config(text=f"HWID Lié: {license_data.get('hwid', 'N/A')[:12]}...")
-            expiry_date = license_data.get("expire", "Date non spécifiée")
-            self.expiry_label.config(text=f"Expire le: {expiry_date}")
-            
-            if expiry_date != "Date non spécifiée" and expiry_date not in ["Lifetime", "N/A"]:
-                self.expiry_label.config(fg="#ffcc00") # Jaune pour l'expiration
-            elif expiry_date == "Lifetime":
-                self.expiry_label.config(fg=self.app.theme_colors["neon_accent"]) # Néon pour Lifetime
+                # Échec: Afficher l'erreur (la clé locale n'est effacée que si le Worker l'a refusée)
+                self.set_status(msg, "#ff4444")
+                if license_data is not None:
+                    delete_local_license()
+
+
+    class DownloadPage(tk.Frame):
+        def __init__(self, parent, app, license_data):
+            super().__init__(parent)
+            self.app = app
+            self.download_link = DOWNLOAD_LINK
+            self.license_data = license_data
+            theme = app.theme
+            theme.bind(self, bg="primary_bg")
+        
+            self.title_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(18, "bold")},
+                                            text="🚀 TÉLÉCHARGEMENT & LICENCE ACTIVÉE 🚀")
+            self.title_label.pack(pady=12)
+
+            self.info_frame = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            self.info_frame.pack(pady=20, padx=20, fill='x')
+
+            self.key_label = theme.create(tk.Label, self.info_frame, {"bg": "primary_bg", "fg": "text_fg"}, text="", font=("Consolas", 10))
+            self.key_label.pack(pady=2, anchor='w')
+            self.hwid_label = theme.create(tk.Label, self.info_frame, {"bg": "primary_bg", "fg": "text_fg"}, text="", font=("Consolas", 10))
+            self.hwid_label.pack(pady=2, anchor='w')
+            # fg est piloté par update_content (lié au thème seulement pour les licences Lifetime / sans date)
+            self.expiry_label = theme.create(tk.Label, self.info_frame, {"bg": "primary_bg"}, text="", font=("Consolas", 10, "bold"))
+            self.expiry_label.pack(pady=8, anchor='w')
+
+            self.message_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(11)},
+                                              text="Votre licence est valide. Vous pouvez maintenant télécharger le logiciel.")
+            self.message_label.pack(pady=10)
+
+            self.download_button = theme.create(tk.Button, self, {"bg": "neon_accent", "activebackground": "neon_accent", "font": ThemeFont(14, "bold")},
+                                                text="Télécharger le Logiciel",
+                                                command=self.open_download_link,
+                                                fg="#111",
+                                                width=30, borderwidth=0, relief="raised")
+            self.download_button.pack(pady=15)
+
+            self.unbind_button = theme.create(tk.Button, self, {"font": ThemeFont(9)},
+                                              text="Effacer la Licence Locale (Changer de clé)",
+                                              command=self.clear_license_prompt,
+                                              bg="#551111", # Rouge sombre pour l'opération de sécurité
+                                              activebackground="#882222",
+                                              fg="#ffaaaa",
+                                              width=40, borderwidth=0, relief="flat")
+            self.unbind_button.pack(pady=5)
+        
+            self.link_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg"},
+                                           text=f"Lien Direct : {self.download_link}", font=("Consolas", 9))
+            self.link_label.pack(pady=4)
+
+            # Téléchargement intégré du firmware (parties du manifest, reprise + SHA-256)
+            firmware_frame = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            firmware_frame.pack(pady=(10, 0))
+            theme.create(tk.Label, firmware_frame, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(9)}, text="Firmware : ").pack(side="left")
+            self.manifest_var = tk.StringVar(value=FIRMWARE_MANIFEST)
+            self.manifest_menu = tk.OptionMenu(firmware_frame, self.manifest_var, FIRMWARE_MANIFEST, command=self.select_manifest)
+            theme.bind(self.manifest_menu, bg="text_fg", font=ThemeFont(9))
+            self.manifest_menu.config(fg="#111", relief="flat", borderwidth=0)
+            theme.bind(self.manifest_menu["menu"], bg="button_bg", fg="text_fg", activebackground="neon_accent",
+                       activeforeground="button_bg", font=ThemeFont(9))
+            self.manifest_menu.pack(side="left", padx=5)
+            self.layout_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg"}, text="", font=("Consolas", 9), justify="left")
+            self.layout_label.pack(pady=2)
+
+            self.firmware_button = theme.create(tk.Button, self, {"bg": "panel_bg", "fg": "neon_accent", "font": ThemeFont(11, "bold")},
+                                                text="Télécharger le Firmware",
+                                                command=self.toggle_firmware_download,
+                                                width=40, borderwidth=0, relief="flat")
+            self.firmware_button.pack(pady=2)
+            self.firmware_status = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg"}, text="", font=("Consolas", 9))
+            self.firmware_status.pack(pady=2)
+            self.installer_button = theme.create(tk.Button, self, {"bg": "panel_bg", "fg": "text_fg", "font": ThemeFont(9)},
+                                                 text="Ouvrir l'installateur web local",
+                                                 command=lambda: self.app.open_local_installer(self.manifest_var.get()),
+                                                 width=40, borderwidth=0, relief="flat")
+            self.installer_button.pack(pady=2)
+            flash_frame = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            flash_frame.pack(pady=2)
+            theme.create(tk.Label, flash_frame, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(9)}, text="Port : ").pack(side="left")
+            self.port_var = tk.StringVar()
+            theme.create(tk.Entry, flash_frame, {"bg": "text_fg", "font": ThemeFont(9)}, textvariable=self.port_var,
+                         width=16, fg="#111", borderwidth=0).pack(side="left", padx=5)
+            self.flash_button = theme.create(tk.Button, flash_frame, {"bg": "panel_bg", "fg": "neon_accent", "font": ThemeFont(9, "bold")},
+                                             text="Flasher", command=self.flash_firmware, borderwidth=0, relief="flat")
+            self.flash_button.pack(side="left")
+            self.detect_button = theme.create(tk.Button, flash_frame, {"bg": "panel_bg", "fg": "text_fg", "font": ThemeFont(9)},
+                                              text="Détecter", command=self.detect_device, borderwidth=0, relief="flat")
+            self.detect_button.pack(side="left", padx=5)
+
+            self.update_content(license_data)
+        
+        def clear_license_prompt(self):
+            """Demande confirmation avant de supprimer la licence locale."""
+            if messagebox.askyesno("Confirmation", 
+                                   "Êtes-vous sûr de vouloir supprimer la clé de licence de cet appareil ?\n\n"
+                                   "Cela vous ramènera à l'écran d'activation."):
+                self.clear_license()
+
+        def clear_license(self):
+            """Supprime la licence locale et retourne à la page d'accueil."""
+            if delete_local_license():
+                messagebox.showinfo("Licence Effacée", "La clé de licence a été effacée de cet appareil. Veuillez réentrer une clé si vous souhaitez réutiliser le logiciel.")
+                self.app.license_data = None
+                self.app.cancel_license_recheck()
+                self.app.get_page("home").key_var.set("") # Vide le champ d'entrée
+                self.app.get_page("home").set_status("Clé locale effacée. Veuillez activer à nouveau.", self.app.theme_colors["text_fg"])
+                self.app.show_home()
             else:
-                self.expiry_label.config(fg=self.app.theme_colors["text_fg"])
-
-    def open_download_link(self):
-        # Modification légère pour s'assurer que l'appel au navigateur se fait après un court délai
-        # Le délai n'aide pas à fermer le navigateur, mais il aide l'OS à gérer la séquence.
-        def open_browser():
-            webbrowser.open(self.download_link)
-            messagebox.showinfo("Téléchargement", "Le téléchargement va s'ouvrir dans votre navigateur. Veuillez utiliser la clé PRO pour décompresser l'archive si nécessaire.")
-
-        # Lancer la commande dans le thread principal de Tkinter après un délai minimal.
-        self.app.after(100, open_browser)
-
-
-class OptionsPage(tk.Frame):
-    def __init__(self, parent, app):
-        super().__init__(parent, bg=app.theme_colors["primary_bg"])
-        self.app = app
-        
-        # Titre
-        self.title_label = tk.Label(self, text="Options de Personnalisation", bg=app.theme_colors["primary_bg"], 
-                                     fg=app.theme_colors["neon_accent"], font=(app.current_font, 16, "bold"))
-        self.title_label.pack(pady=8)
-        
-        # --- Personnalisation des couleurs ---
-        self.subtitle_colors = tk.Label(self, text="--- Thème & Couleurs ---", bg=app.theme_colors["primary_bg"],
-                                             fg=app.theme_colors["text_fg"], font=(app.current_font, 11))
-        self.subtitle_colors.pack(pady=5)
-
-        # Helper function to create color buttons
-        def create_color_button(text, key):
-            btn = tk.Button(self, text=f"{text} ({self.app.theme_colors[key]})",
-                              command=lambda: self.app.change_color(key, text),
-                              bg=self.app.theme_colors["text_fg"], 
-                              fg="#111", relief="flat", font=(app.current_font, 9), borderwidth=0)
-            btn.pack(pady=3, padx=20, anchor="w")
-            return btn
-
-        self.btn_bg = create_color_button("Fond Principal", "primary_bg")
-        self.btn_neon = create_color_button("Couleur Néon (Accent)", "neon_accent")
-        self.btn_btn_bg = create_color_button("Fond Boutons Menu", "button_bg")
-        self.btn_text_fg = create_color_button("Texte Secondaire", "text_fg")
-        
-        # --- Personnalisation de l'Apparence ---
-        self.subtitle_apparence = tk.Label(self, text="--- Apparence & Police ---", bg=app.theme_colors["primary_bg"],
-                                                fg=app.theme_colors["text_fg"], font=(app.current_font, 11))
-        self.subtitle_apparence.pack(pady=5)
-        
-        # Sélecteur de police
-        font_frame = tk.Frame(self, bg=app.theme_colors["primary_bg"])
-        font_frame.pack(pady=5, padx=20, anchor="w")
-        tk.Label(font_frame, text="Police : ", bg=app.theme_colors["primary_bg"], fg=app.theme_colors["text_fg"], font=(app.current_font, 9)).pack(side="left")
-        
-        self.font_var = tk.StringVar(value=app.current_font)
-        
-        # Utiliser un OptionMenu pour le choix des polices
-        self.font_option_menu = tk.OptionMenu(font_frame, self.font_var, app.current_font, *ALT_FONTS, command=app.set_font)
-        self.font_option_menu.config(bg=app.theme_colors["text_fg"], fg="#111", relief="flat", font=(app.current_font, 9), borderwidth=0)
-        # Style du menu déroulant (pour le rendre dark/pro)
-        self.font_option_menu["menu"].config(
-            bg=app.theme_colors["button_bg"], 
-            fg=app.theme_colors["text_fg"], 
-            activebackground=app.theme_colors["neon_accent"], 
-            activeforeground=app.theme_colors["button_bg"], 
-            font=(app.current_font, 9)
-        )
-        self.font_option_menu.pack(side="left", padx=5)
-
-        # --- Autres Options ---
-        self.subtitle_other = tk.Label(self, text="--- Autres Fonctions PRO ---", bg=app.theme_colors["primary_bg"],
-                                            fg=app.theme_colors["text_fg"], font=(app.current_font, 11))
-        self.subtitle_other.pack(pady=5)
-        
-        # Checkbutton 
-        self.var_stealth = tk.BooleanVar(value=False)
-        self.check_stealth = tk.Checkbutton(self, text="Mode furtif (Cache Console/Fenêtre)", bg=app.theme_colors["primary_bg"],
-                                             fg=app.theme_colors["text_fg"], selectcolor=app.theme_colors["neon_accent"],
-                                             variable=self.var_stealth, font=(app.current_font, 10))
-        self.check_stealth.pack(anchor="w", padx=20, pady=3)
-        
-        # Bouton d'action pour le démarrage automatique (exemple simple)
-        self.btn_startup = tk.Button(self, text="Activer le Démarrage Automatique (Windows)", 
-                                     command=lambda: messagebox.showinfo("Fonctionnalité PRO", "L'implémentation complète nécessite des droits d'admin pour modifier le Registre Windows. Cette fonction est désactivée dans cette démo."),
-                                     bg=app.theme_colors["text_fg"], fg="#111", relief="flat", font=(app.current_font, 9), borderwidth=0)
-        self.btn_startup.pack(anchor="w", padx=20, pady=3)
-        
-        self.btn_save = tk.Button(self, text="Sauvegarder les Paramètres du Thème", 
-                                     command=lambda: messagebox.showinfo("OK", "Paramètres du thème sauvegardés (La persistance des thèmes doit être implémentée)."),
-                                     bg=app.theme_colors["neon_accent"], fg="#111", relief="flat", font=(app.current_font, 10, "bold"), borderwidth=0)
-        self.btn_save.pack(pady=10, padx=20, anchor="w")
-        
-        self.color_buttons = [self.btn_bg, self.btn_neon, self.btn_btn_bg, self.btn_text_fg]
-
-    def update_theme(self):
-        """Met à jour les couleurs et les polices des widgets de la page."""
-        self.configure(bg=self.app.theme_colors["primary_bg"])
-        
-        # Labels and Titles
-        self.title_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 16, "bold")
-        )
-        for sub in [self.subtitle_colors, self.subtitle_apparence, self.subtitle_other]:
-            sub.configure(
-                bg=self.app.theme_colors["primary_bg"], 
-                fg=self.app.theme_colors["text_fg"],
-                font=(self.app.current_font, 11)
-            )
-        
-        # Checkbutton & other buttons
-        self.check_stealth.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            selectcolor=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 10)
-        )
-        self.btn_startup.configure(
-            bg=self.app.theme_colors["text_fg"], 
-            activebackground=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 9)
-        )
-        self.btn_save.configure(
-            bg=self.app.theme_colors["neon_accent"], 
-            activebackground=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 10, "bold")
-        )
-
-        # Update Color Buttons
-        for btn in self.color_buttons:
-            # Update button text with current color code
-            text = btn.cget("text").split('(')[0].strip()
-            key = [k for k, v in self.app.theme_colors.items() if v == self.app.theme_colors.get(text.split(' ')[-1]) or v == self.app.theme_colors.get(text.split(' ')[-2])] # Tricky way to re-find key based on old text
+                messagebox.showerror("Erreur", "Impossible de supprimer le fichier de licence. Veuillez vérifier les permissions.")
+
+
+        def update_content(self, license_data):
+            """Met à jour les informations de licence affichées."""
+            self.license_data = license_data
+            self.refresh_manifests()
+            if license_data:
+                key_display = license_data.get('license', 'N/A')
+                # Affichage partiel de la clé pour la sécurité/clarté
+                masked_key = key_display[:4] + '...' + key_display[-4:]
             
-            # Simple manual update (less error prone for this fixed structure)
-            if 'Principal' in text: btn.config(text=f"Fond Principal ({self.app.theme_colors['primary_bg']})")
-            elif 'Néon' in text: btn.config(text=f"Couleur Néon (Accent) ({self.app.theme_colors['neon_accent']})")
-            elif 'Menu' in text: btn.config(text=f"Fond Boutons Menu ({self.app.theme_colors['button_bg']})")
-            elif 'Secondaire' in text: btn.config(text=f"Texte Secondaire ({self.app.theme_colors['text_fg']})")
-
-            btn.configure(
-                bg=self.app.theme_colors["text_fg"], 
-                activebackground=self.app.theme_colors["text_fg"],
-                font=(self.app.current_font, 9)
-            )
+                self.key_label.config(text=f"Clé: {masked_key} (Affichage partiel)")
+                self.hwid_label.config(text=f"HWID Lié: {license_data.get('hwid', 'N/A')[:12]}...")
+                expiry_date = license_data.get("expire", "Date non spécifiée")
+                self.expiry_label.config(text=f"Expire le: {expiry_date}")
             
-        # Update Font Menu
-        font_frame = self.font_option_menu.master
-        font_frame.config(bg=self.app.theme_colors["primary_bg"])
-        font_frame.winfo_children()[0].config(bg=self.app.theme_colors["primary_bg"], fg=self.app.theme_colors["text_fg"], font=(self.app.current_font, 9))
-
-        self.font_option_menu.config(
-            bg=self.app.theme_colors["text_fg"], 
-            fg="#111", 
-            font=(self.app.current_font, 9)
-        )
-        self.font_option_menu["menu"].config(
-            bg=self.app.theme_colors["button_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            activebackground=self.app.theme_colors["neon_accent"],
-            activeforeground=self.app.theme_colors["button_bg"],
-            font=(self.app.current_font, 9)
-        )
-        self.font_var.set(self.app.current_font)
-
-
-class InfoPage(tk.Frame):
-    def __init__(self, parent, app):
-        super().__init__(parent, bg=app.theme_colors["primary_bg"])
-        self.app = app
-        
-        self.title_label = tk.Label(self, text="Informations Système", bg=app.theme_colors["primary_bg"], 
-                                     fg=app.theme_colors["neon_accent"], font=(app.current_font, 16, "bold"))
-        self.title_label.pack(pady=8)
-        
-        info = f"""
-        OS: {platform.system()} {platform.release()} 
-        Version: {platform.version()}
-        Machine: {platform.machine()}
-        Processeur: {platform.processor()}
-        Python: {platform.python_version()}
+                if expiry_date != "Date non spécifiée" and expiry_date not in ["Lifetime", "N/A"]:
+                    self.app.theme.unbind(self.expiry_label, "fg")
+                    self.expiry_label.config(fg="#ffcc00") # Jaune pour l'expiration
+                elif expiry_date == "Lifetime":
+                    self.app.theme.bind(self.expiry_label, fg="neon_accent") # Néon pour Lifetime
+                else:
+                    self.app.theme.bind(self.expiry_label, fg="text_fg")
+
+        def toggle_firmware_download(self):
+            """Démarre le téléchargement du firmware, ou l'interrompt s'il est en cours (reprise au prochain clic)."""
+            if self.app.start_firmware_download(self.manifest_var.get()):
+                self.firmware_button.config(text="Interrompre le téléchargement")
+            else:
+                self.app.cancel_firmware_download()
+
+        def refresh_manifests(self):
+            """Relit les manifests modifiés et met à jour la liste des firmwares disponibles."""
+            MANIFESTS.refresh()
+            menu = self.manifest_menu["menu"]
+            menu.delete(0, "end")
+            for manifest in MANIFESTS.manifests():
+                menu.add_command(label=f"{manifest['name']} v{manifest['version']} ({manifest['file']})",
+                                 command=lambda file=manifest["file"]: self.select_manifest(file))
+            self.select_manifest(self.manifest_var.get())
+
+        def select_manifest(self, file):
+            """Affiche la disposition flash (offset, partie) du manifest choisi."""
+            self.manifest_var.set(file)
+            manifest = MANIFESTS.get(file)
+            if manifest is None:
+                self.layout_label.config(text=MANIFESTS.errors.get(file, f"{file} : manifest introuvable"))
+                return
+            build = manifest["builds"][0]
+            self.layout_label.config(text=f"{manifest['name']} v{manifest['version']} — {build['chipFamily']}\n{describe_build(build)}")
+            self.fill_port(DEVICES.cached(build["chipFamily"])) # Carte déjà connue : aucun port n'est ouvert
+
+        def selected_chip_family(self):
+            manifest = MANIFESTS.get(self.manifest_var.get())
+            return manifest["builds"][0]["chipFamily"] if manifest else None
+
+        def fill_port(self, devices):
+            """Propose la première carte compatible avec le firmware choisi (sans écraser une saisie)."""
+            if devices and not self.port_var.get():
+                self.port_var.set(devices[0]["device"])
+
+        def detect_device(self):
+            """Sonde tous les ports (en parallèle) et retient la carte dont la puce correspond au manifest."""
+            chip_family = self.selected_chip_family()
+            self.firmware_status.config(text="Recherche des cartes...")
+            self.detect_button.config(state="disabled")
+            self.app.detect_devices(lambda devices, error: self.show_detected(devices, error, chip_family), chip_family, force=True)
+
+        def show_detected(self, devices, error, chip_family):
+            self.detect_button.config(state="normal")
+            if error is not None:
+                self.firmware_status.config(text=f"Détection impossible : {error}")
+            elif not devices:
+                self.firmware_status.config(text=f"Aucune carte {chip_family or 'ESP'} en mode téléchargement (BOOT + RESET).")
+            else:
+                self.port_var.set(devices[0]["device"])
+                self.firmware_status.config(text="  |  ".join(
+                    f"{d['device']} : {d['chip']}, MAC {d['mac'] or '?'}, flash {d['flash_size'] // 2**20 if d['flash_size'] else '?'} Mo"
+                    for d in devices))
+
+        def flash_firmware(self):
+            """Flashe directement le firmware téléchargé via le bootloader série de l'ESP32."""
+            problem = self.app.start_firmware_flash(self.port_var.get().strip())
+            if problem:
+                self.firmware_status.config(text=problem)
+
+        def show_flash_result(self, result, error):
+            if error is not None:
+                self.firmware_status.config(text=f"Échec du flash : {error}")
+                return
+            self.firmware_status.config(text=f"{result['chip']} flashé à {result['baud']} bauds — {result['regions']} zone(s), "
+                                             f"{result['wire_bytes'] / 1e3:.0f} ko transmis, MD5 vérifiés")
+
+        def show_download_progress(self, text):
+            self.firmware_status.config(text=text)
+
+        def show_download_result(self, results, error, merged=None):
+            self.firmware_button.config(text="Télécharger le Firmware")
+            if error is not None:
+                self.firmware_status.config(text=f"Échec : {error}")
+                return
+            size = sum(result["size"] for result in results)
+            ms = sum(result["ms"] for result in results)
+            cached = sum(1 for result in results if result.get("cached"))
+            validate_ms = sum(result["validation"]["ms"] for result in results)
+            self.firmware_status.config(text=f"{len(results)} partie(s) ({cached} depuis le cache), {size / 1e6:.1f} Mo en {ms / 1000:.1f} s, "
+                                             f"images vérifiées en {validate_ms:.0f} ms — SHA-256 "
+                                             + ", ".join(result["sha256"][:12] for result in results))
+            if merged:
+                used = sum(count for _, count in merged["data_sectors"])
+                total = -(-merged["image_size"] // merged["sector_size"])
+                self.firmware_status.config(text=self.firmware_status.cget("text")
+                                            + f"\nImage fusionnée : {used}/{total} secteurs de 4 Ko à écrire")
+
+        def open_download_link(self):
+            # Modification légère pour s'assurer que l'appel au navigateur se fait après un court délai
+            # Le délai n'aide pas à fermer le navigateur, mais il aide l'OS à gérer la séquence.
+            def open_browser():
+                import webbrowser
+                webbrowser.open(self.download_link)
+                messagebox.showinfo("Téléchargement", "Le téléchargement va s'ouvrir dans votre navigateur. Veuillez utiliser la clé PRO pour décompresser l'archive si nécessaire.")
+
+            # Lancer la commande dans le thread principal de Tkinter après un délai minimal.
+            self.app.after(100, open_browser)
+
+
+    class OptionsPage(tk.Frame):
+        def __init__(self, parent, app):
+            super().__init__(parent)
+            self.app = app
+            theme = app.theme
+            theme.bind(self, bg="primary_bg")
+            subtitle_theme = {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(11)}
+        
+            # Titre
+            self.title_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(16, "bold")},
+                                            text="Options de Personnalisation")
+            self.title_label.pack(pady=8)
+        
+            # --- Personnalisation des couleurs ---
+            self.subtitle_colors = theme.create(tk.Label, self, subtitle_theme, text="--- Thème & Couleurs ---")
+            self.subtitle_colors.pack(pady=5)
+
+            # Helper function to create color buttons (le texte affiche la couleur courante du jeton)
+            def create_color_button(text, key):
+                btn = theme.create(tk.Button, self,
+                                   {"text": ThemeText(f"{text} ({{{key}}})"), "bg": "text_fg", "activebackground": "text_fg", "font": ThemeFont(9)},
+                                   command=lambda: self.app.change_color(key, text),
+                                   fg="#111", relief="flat", borderwidth=0)
+                btn.pack(pady=3, padx=20, anchor="w")
+                return btn
+
+            self.btn_bg = create_color_button("Fond Principal", "primary_bg")
+            self.btn_neon = create_color_button("Couleur Néon (Accent)", "neon_accent")
+            self.btn_btn_bg = create_color_button("Fond Boutons Menu", "button_bg")
+            self.btn_text_fg = create_color_button("Texte Secondaire", "text_fg")
+        
+            # --- Personnalisation de l'Apparence ---
+            self.subtitle_apparence = theme.create(tk.Label, self, subtitle_theme, text="--- Apparence & Police ---")
+            self.subtitle_apparence.pack(pady=5)
+        
+            # Sélecteur de police
+            font_frame = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            font_frame.pack(pady=5, padx=20, anchor="w")
+            theme.create(tk.Label, font_frame, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(9)}, text="Police : ").pack(side="left")
+        
+            self.font_var = tk.StringVar(value=app.current_font)
+        
+            # Utiliser un OptionMenu pour le choix des polices
+            self.font_option_menu = tk.OptionMenu(font_frame, self.font_var, app.current_font, *ALT_FONTS, command=app.set_font)
+            theme.bind(self.font_option_menu, bg="text_fg", font=ThemeFont(9))
+            self.font_option_menu.config(fg="#111", relief="flat", borderwidth=0)
+            # Style du menu déroulant (pour le rendre dark/pro)
+            theme.bind(self.font_option_menu["menu"], bg="button_bg", fg="text_fg", activebackground="neon_accent",
+                       activeforeground="button_bg", font=ThemeFont(9))
+            self.font_option_menu.pack(side="left", padx=5)
+
+            # --- Autres Options ---
+            self.subtitle_other = theme.create(tk.Label, self, subtitle_theme, text="--- Autres Fonctions PRO ---")
+            self.subtitle_other.pack(pady=5)
+        
+            # Checkbutton 
+            self.var_stealth = tk.BooleanVar(value=app.settings["stealth"])
+            self.check_stealth = theme.create(tk.Checkbutton, self,
+                                              {"bg": "primary_bg", "fg": "text_fg", "selectcolor": "neon_accent", "font": ThemeFont(10)},
+                                              text="Mode furtif (Démarrer la fenêtre réduite)", variable=self.var_stealth)
+            self.check_stealth.pack(anchor="w", padx=20, pady=3)
+        
+            # Bouton d'action pour le démarrage automatique (exemple simple)
+            self.btn_startup = theme.create(tk.Button, self, {"bg": "text_fg", "activebackground": "text_fg", "font": ThemeFont(9)},
+                                            text="Activer le Démarrage Automatique (Windows)", 
+                                            command=lambda: messagebox.showinfo("Fonctionnalité PRO", "L'implémentation complète nécessite des droits d'admin pour modifier le Registre Windows. Cette fonction est désactivée dans cette démo."),
+                                            fg="#111", relief="flat", borderwidth=0)
+            self.btn_startup.pack(anchor="w", padx=20, pady=3)
+        
+            self.btn_save = theme.create(tk.Button, self, {"bg": "neon_accent", "activebackground": "neon_accent", "font": ThemeFont(10, "bold")},
+                                         text="Sauvegarder les Paramètres du Thème", 
+                                         command=self.save_theme,
+                                         fg="#111", relief="flat", borderwidth=0)
+            self.btn_save.pack(pady=10, padx=20, anchor="w")
+        
+            self.color_buttons = [self.btn_bg, self.btn_neon, self.btn_btn_bg, self.btn_text_fg]
+
+        def save_theme(self):
+            """Enregistre couleurs, police (déjà appliquées) et mode furtif (pris en compte au prochain lancement)."""
+            if self.app.save_theme_profile(self.var_stealth.get()):
+                messagebox.showinfo("OK", "Paramètres du thème sauvegardés. Couleurs et police sont déjà appliquées ; "
+                                          "le mode furtif (fenêtre réduite au démarrage) prendra effet au prochain lancement.")
+            else:
+                messagebox.showerror("Erreur", "Impossible d'enregistrer les paramètres du thème. Veuillez vérifier les permissions.")
+
+
+    class InfoPage(tk.Frame):
+        def __init__(self, parent, app):
+            super().__init__(parent)
+            self.app = app
+            theme = app.theme
+            theme.bind(self, bg="primary_bg")
+        
+            self.title_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(16, "bold")},
+                                            text="Informations Système")
+            self.title_label.pack(pady=8)
+        
+            # Les infos système sont remplies dès que la collecte en arrière-plan est terminée
+            self.info_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(10)},
+                                           text="\n        Collecte des informations système...\n", justify=tk.LEFT)
+            self.info_label.pack(pady=6, padx=20, anchor='w')
+
+            self.hwid_display = tk.Label(self, text="...", bg="#000000", fg="#00ff00", font=("Consolas", 8), wraplength=500)
+            self.hwid_display.pack(pady=2, padx=20, anchor='w')
+            app.on_system_facts(self.fill_facts)
+        
+            self.copy_btn = theme.create(tk.Button, self, {"bg": "text_fg", "activebackground": "text_fg", "font": ThemeFont(10)},
+                                         text="Copier HWID COMPLET", command=lambda: self.copy_hwid(app),
+                                         fg="#111", relief="flat", borderwidth=0)
+            self.copy_btn.pack(pady=8)
+
+            self.metrics_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg"}, text="", font=("Consolas", 9))
+            self.metrics_label.pack(pady=2, padx=20, anchor='w')
+
+        def refresh_metrics(self):
+            """Affiche les percentiles de latence du Worker et l'état du cache firmware pour cette session."""
+            p = METRICS.percentiles("worker.check")
+            if not p:
+                text = "Latence Worker : aucune mesure pour l'instant"
+            else:
+                text = (f"Latence Worker (ms) : p50 {p[50]:.0f} | p90 {p[90]:.0f} | p99 {p[99]:.0f}"
+                        f"  ({METRICS.count('worker.check')} requêtes)")
+            endpoints = WORKER_ENDPOINTS.snapshot()
+            if len(endpoints) > 1: # Classement courant des endpoints (le premier reçoit les requêtes)
+                text += "".join(f"\n  {url[:40]} : " + (f"{ewma:.0f} ms" if ewma is not None else "pas de mesure")
+                                + f", échecs {failures:.0%}" for url, ewma, failures, _ in endpoints)
+            cache = FIRMWARE_CACHE
+            text += (f"\nCache firmware : {cache.hits} hit(s) | {cache.misses} miss(es) | "
+                     f"{cache.total_bytes / 1e6:.1f}/{cache.max_bytes / 1e6:.0f} Mo")
+            self.metrics_label.config(text=text)
+
+        def fill_facts(self, facts):
+            """Affiche les informations système collectées."""
+            info = f"""
+        OS: {facts['system']} {facts['release']} 
+        Version: {facts['version']}
+        Machine: {facts['machine']}
+        Processeur: {facts['processor']}
+        Python: {facts['python']}
         HWID Complet (pour Support):
-        """
+            """
+            self.info_label.config(text=info)
+            self.hwid_display.config(text=facts["hwid"])
+
+        def copy_hwid(self, app):
+            try:
+                app.clipboard_clear()
+                app.clipboard_append(get_hwid())
+                messagebox.showinfo("Copié", "HWID complet copié dans le presse-papiers.")
+            except tk.TclError:
+                messagebox.showerror("Erreur", "Impossible d'accéder au presse-papiers.")
+
+    class MonitorPage(tk.Frame):
+        """Moniteur série : seules les MONITOR_ROWS lignes visibles du tampon sont insérées dans le widget Text."""
+
+        def __init__(self, parent, app):
+            super().__init__(parent)
+            self.app = app
+            theme = app.theme
+            theme.bind(self, bg="primary_bg")
+            self._shown = None
+
+            self.title_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(16, "bold")},
+                                            text="Moniteur Série")
+            self.title_label.pack(pady=(8, 4))
+
+            bar = theme.create(tk.Frame, self, {"bg": "primary_bg"})
+            bar.pack(fill="x", padx=10)
+            theme.create(tk.Label, bar, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(9)}, text="Port : ").pack(side="left")
+            known = DEVICES.cached() # Dernière carte détectée, sans ouvrir de port
+            self.port_var = tk.StringVar(value=known[0]["device"] if known else "")
+            theme.create(tk.Entry, bar, {"bg": "text_fg", "font": ThemeFont(9)}, textvariable=self.port_var,
+                         width=14, fg="#111", borderwidth=0).pack(side="left", padx=4)
+            self.baud_var = tk.StringVar(value=str(MONITOR_BAUD))
+            theme.create(tk.Entry, bar, {"bg": "text_fg", "font": ThemeFont(9)}, textvariable=self.baud_var,
+                         width=8, fg="#111", borderwidth=0).pack(side="left", padx=4)
+            self.connect_button = theme.create(tk.Button, bar, {"bg": "panel_bg", "fg": "neon_accent", "font": ThemeFont(9, "bold")},
+                                               text="Ouvrir", command=self.toggle_monitor, borderwidth=0, relief="flat", width=8)
+            self.connect_button.pack(side="left", padx=4)
+            theme.create(tk.Label, bar, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(9)}, text="Filtre : ").pack(side="left")
+            self.filter_var = tk.StringVar()
+            self.filter_var.trace_add("write", lambda *_: self.set_filter())
+            theme.create(tk.Entry, bar, {"bg": "text_fg", "font": ThemeFont(9)}, textvariable=self.filter_var,
+                         width=14, fg="#111", borderwidth=0).pack(side="left", padx=4)
+
+            view = tk.Frame(self, bg="#000000")
+            view.pack(fill="both", expand=True, padx=10, pady=6)
+            self.scrollbar = tk.Scrollbar(view, command=self.on_scrollbar)
+            self.scrollbar.pack(side="right", fill="y")
+            self.text = tk.Text(view, height=MONITOR_ROWS, wrap="none", bg="#000000", fg="#00ff00", font=("Consolas", 8),
+                                borderwidth=0, state="disabled")
+            self.text.pack(side="left", fill="both", expand=True)
+            self.text.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+            self.text.bind("<Button-4>", lambda e: self.scroll_by(-3))
+            self.text.bind("<Button-5>", lambda e: self.scroll_by(3))
+
+            self.status_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg"}, text="Port fermé", font=("Consolas", 9))
+            self.status_label.pack(pady=(0, 6))
+
+        def toggle_monitor(self):
+            monitor = self.app.serial_monitor
+            if monitor and not monitor.finished.is_set():
+                self.app.stop_serial_monitor()
+                return
+            try:
+                baud = int(self.baud_var.get())
+            except ValueError:
+                self.status_label.config(text="Vitesse invalide")
+                return
+            problem = self.app.start_serial_monitor(self.port_var.get().strip(), baud)
+            if problem:
+                self.status_label.config(text=problem)
+                return
+            self._shown = None
+            self.connect_button.config(text="Fermer")
+            self.set_filter()
+
+        def set_filter(self):
+            monitor = self.app.serial_monitor
+            if monitor is None:
+                return
+            try:
+                monitor.view.set_filter(self.filter_var.get())
+            except re.error as e:
+                self.status_label.config(text=f"Filtre invalide : {e}")
+                return
+            self._shown = None
+            self.render(monitor)
+
+        def scroll_by(self, rows):
+            monitor = self.app.serial_monitor
+            if monitor:
+                monitor.view.scroll_to(monitor.view.index + rows, MONITOR_ROWS)
+                self.render(monitor)
+            return "break"
+
+        def on_scrollbar(self, action, *args):
+            monitor = self.app.serial_monitor
+            if monitor is None:
+                return
+            view = monitor.view
+            if action == "moveto":
+                view.scroll_to(float(args[0]) * view.count, MONITOR_ROWS)
+            else:
+                step = MONITOR_ROWS if args[1] == "pages" else 1
+                view.scroll_to(view.index + int(args[0]) * step, MONITOR_ROWS)
+            self.render(monitor)
+
+        def render(self, monitor):
+            """Remplace le contenu du Text par la fenêtre visible (coût constant, quel que soit le débit)."""
+            view = monitor.view
+            lines, index, count = view.window(MONITOR_ROWS)
+            key = (view.top_seq, count, monitor.ring.total if index + len(lines) >= count else 0)
+            if key != self._shown:
+                self._shown = key
+                self.text.config(state="normal")
+                self.text.delete("1.0", "end")
+                self.text.insert("1.0", "\n".join(lines))
+                self.text.config(state="disabled")
+                self.scrollbar.set(index / count if count else 0, (index + len(lines)) / count if count else 1)
+            pending = view.filter.pending if view.filter else 0
+            self.status_label.config(text=f"{monitor.bytes / 1e3:.0f} ko reçus — {monitor.ring.total} lignes"
+                                          + (f" — {count} correspondance(s)" if view.filter else "")
+                                          + (f" (filtrage : {pending} restantes)" if pending else "")
+                                          + ("" if view.follow else " — défilement figé"))
+
+        def show_closed(self, monitor):
+            self.connect_button.config(text="Ouvrir")
+            if monitor.error is not None:
+                self.status_label.config(text=f"Port fermé : {monitor.error}")
+            else:
+                self.status_label.config(text=self.status_label.cget("text") + " — port fermé")
+
+    class SupportPage(tk.Frame):
+        def __init__(self, parent, app):
+            super().__init__(parent)
+            self.app = app
+            theme = app.theme
+            theme.bind(self, bg="primary_bg")
+        
+            self.title_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(16, "bold")},
+                                            text="Support Technique PRO")
+            self.title_label.pack(pady=8)
         
-        self.info_label = tk.Label(self, text=info, bg=app.theme_colors["primary_bg"], 
-                                      fg=app.theme_colors["text_fg"], font=(app.current_font, 10), justify=tk.LEFT)
-        self.info_label.pack(pady=6, padx=20, anchor='w')
-
-        self.hwid_display = tk.Label(self, text=get_hwid(), bg="#000000", fg="#00ff00", font=("Consolas", 8), wraplength=500)
-        self.hwid_display.pack(pady=2, padx=20, anchor='w')
-        
-        self.copy_btn = tk.Button(self, text="Copier HWID COMPLET", command=lambda: self.copy_hwid(app),
-                                     bg=app.theme_colors["text_fg"], fg="#111", relief="flat", font=(app.current_font, 10), borderwidth=0)
-        self.copy_btn.pack(pady=8)
-
-    def update_theme(self):
-        """Met à jour les couleurs et les polices des widgets de la page."""
-        self.configure(bg=self.app.theme_colors["primary_bg"])
-        self.title_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 16, "bold")
-        )
-        self.info_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 10)
-        )
-        self.hwid_display.configure(
-            bg="#000000",
-            fg="#00ff00"
-        )
-        self.copy_btn.configure(
-            bg=self.app.theme_colors["text_fg"], 
-            activebackground=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 10)
-        )
-
-    def copy_hwid(self, app):
-        try:
-            app.clipboard_clear()
-            app.clipboard_append(get_hwid())
-            messagebox.showinfo("Copié", "HWID complet copié dans le presse-papiers.")
-        except tk.TclError:
-            messagebox.showerror("Erreur", "Impossible d'accéder au presse-papiers.")
-
-class SupportPage(tk.Frame):
-    def __init__(self, parent, app):
-        super().__init__(parent, bg=app.theme_colors["primary_bg"])
-        self.app = app
-        
-        self.title_label = tk.Label(self, text="Support Technique PRO", bg=app.theme_colors["primary_bg"], 
-                                     fg=app.theme_colors["neon_accent"], font=(app.current_font, 16, "bold"))
-        self.title_label.pack(pady=8)
-        
-        self.message_label = tk.Label(self, text="Pour toute question technique ou de licence, veuillez contacter:", 
-                                         bg=app.theme_colors["primary_bg"], fg=app.theme_colors["text_fg"], font=(app.current_font, 10))
-        self.message_label.pack(pady=4)
-        
-        self.email_label = tk.Label(self, text="Email: 075pablo@gmail.com", bg=app.theme_colors["primary_bg"],
-                                       fg=self.app.theme_colors["neon_accent"], font=(app.current_font, 12, "bold"))
-        self.email_label.pack(pady=4)
-        
-        self.response_label = tk.Label(self, text="Temps de réponse PRO: 24h maximum (en général 1-2h).", bg=app.theme_colors["primary_bg"],
-                                         fg=self.app.theme_colors["text_fg"], font=(app.current_font, 10))
-        self.response_label.pack(pady=4)
-
-        self.tip_label = tk.Label(self, text="\nCONSEIL: Incluez votre HWID (voir SYS INFO) dans votre email pour un traitement plus rapide.",
-                                        bg=app.theme_colors["primary_bg"], fg="#ffaa00", font=(app.current_font, 9, "italic"))
-        self.tip_label.pack(pady=10)
-
-    def update_theme(self):
-        """Met à jour les couleurs et les polices des widgets de la page."""
-        self.configure(bg=self.app.theme_colors["primary_bg"])
-        self.title_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 16, "bold")
-        )
-        self.message_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 10)
-        )
-        self.email_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["neon_accent"],
-            font=(self.app.current_font, 12, "bold")
-        )
-        self.response_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg=self.app.theme_colors["text_fg"],
-            font=(self.app.current_font, 10)
-        )
-        self.tip_label.configure(
-            bg=self.app.theme_colors["primary_bg"], 
-            fg="#ffaa00",
-            font=(self.app.current_font, 9, "italic")
-        )
+            self.message_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(10)},
+                                              text="Pour toute question technique ou de licence, veuillez contacter:")
+            self.message_label.pack(pady=4)
+        
+            self.email_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "neon_accent", "font": ThemeFont(12, "bold")},
+                                            text="Email: 075pablo@gmail.com")
+            self.email_label.pack(pady=4)
+        
+            self.response_label = theme.create(tk.Label, self, {"bg": "primary_bg", "fg": "text_fg", "font": ThemeFont(10)},
+                                               text="Temps de réponse PRO: 24h maximum (en général 1-2h).")
+            self.response_label.pack(pady=4)
+
+            self.tip_label = theme.create(tk.Label, self, {"bg": "primary_bg", "font": ThemeFont(9, "italic")},
+                                          text="\nCONSEIL: Incluez votre HWID (voir SYS INFO) dans votre email pour un traitement plus rapide.",
+                                          fg="#ffaa00")
+            self.tip_label.pack(pady=10)
+
+
+    # Pages construites à la demande par HakoApp.get_page (la page de téléchargement a son propre chemin)
+    PAGE_CLASSES = {
+        "home": HomePage,
+        "options": OptionsPage,
+        "info": InfoPage,
+        "monitor": MonitorPage,
+        "support": SupportPage,
+    }
+    METRICS.record("span", "ui.import", (time.perf_counter() - start) * 1000)
+
+
+def __getattr__(name):
+    """hako.HakoApp, hako.ThemeRegistry... depuis un autre module : l'interface est chargée au premier accès."""
+    if name in UI_NAMES:
+        load_ui()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+METRICS.record("span", "import", (time.perf_counter() - _T0) * 1000)
 
 
 # ============================
 # RUN
 # ============================
-if __name__ == "__main__":
+def main(argv=None):
+    """Commande sans interface (voir la section CLI) si argv en nomme une, sinon l'interface."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] and argv[0] in CLI_COMMANDS:
+        return cli_main(argv)
+    # Instance unique, vérifiée avant de charger Tk : un second lancement transmet ses arguments à la
+    # fenêtre déjà ouverte et s'arrête (pas de second calcul du HWID ni de vérification concurrente de license.dat)
+    instance = InstanceGuard()
+    if not instance.acquire():
+        if instance.forward(argv):
+            return 0
+        print("Une autre instance du launcher est en cours mais ne répond pas.")
+        return 1
+
     # Optionnel: Cacher la console si l'application est compilée en .exe (Windows seulement)
     if platform.system() == "Windows":
         try:
             # Tente de cacher la console, seulement si elle existe
+            import ctypes
             if ctypes.windll.kernel32.GetConsoleWindow() != 0:
                 ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
         except:
             pass # Ignorer si la console n'est pas présente ou si ctypes échoue
 
+    load_ui()
     app = HakoApp()
-    app.mainloop()
\ No newline at end of file
+    if app.settings["stealth"]: # Mode furtif : fenêtre réduite au démarrage ; un nouveau lancement la ramène
+        app.iconify()
+    app.serve_instance(instance)
+    app.mainloop()
+    instance.close()
+    # Les opérations encore en cours (ex. requête bloquée sur un Worker lent) sont abandonnées passé ce délai
+    BACKGROUND.shutdown(SHUTDOWN_GRACE_S)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""Chargement du launcher (HAKO-PRO-2026.py) comme module pour les benchmarks."""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAUNCHER_PATH = os.path.join(ROOT, "HAKO-PRO-2026.py")
+
+
+def load_launcher():
+    """Importe HAKO-PRO-2026.py (nom non importable directement) sous le nom 'hako'."""
+    if "hako" in sys.modules:
+        return sys.modules["hako"]
+    spec = importlib.util.spec_from_file_location("hako", LAUNCHER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["hako"] = module
+    spec.loader.exec_module(module)
+    return module
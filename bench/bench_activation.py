@@ -0,0 +1,48 @@
+"""Latence d'activation à froid (nouvelle connexion) vs à chaud (session préchauffée).
+
+Usage : python bench/bench_activation.py [--runs 20] [--connect-delay 0.08] [--latency 0.02]
+"""
+import argparse
+import statistics
+import time
+
+from _hako import load_launcher
+from mock_worker import MockWorker
+
+
+def measure(hako, runs, warm):
+    timings = []
+    for _ in range(runs):
+        hako.reset_worker_session()
+        if warm:
+            hako.prewarm_worker_session()
+        start = time.perf_counter()
+        ok, msg, _ = hako.check_and_bind_key("BENCH-KEY")
+        timings.append((time.perf_counter() - start) * 1000)
+        assert ok, msg
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<6} médiane {statistics.median(timings):7.1f} ms   p95 {p95:7.1f} ms   max {timings[-1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--connect-delay", type=float, default=0.08, help="coût simulé DNS+TCP+TLS (s)")
+    parser.add_argument("--latency", type=float, default=0.02, help="temps de traitement du Worker (s)")
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    with MockWorker(latency=args.latency, connect_delay=args.connect_delay) as worker:
+        hako.WORKER_ENDPOINTS = hako.WorkerEndpoints([worker.url])
+        report("froid", measure(hako, args.runs, warm=False))
+        report("chaud", measure(hako, args.runs, warm=True))
+    hako.reset_worker_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Mise à jour différentielle entre deux versions d'une application ESP32-S3 : octets transférés, reconstruction.
+
+La nouvelle version est dérivée de l'ancienne comme lors d'une vraie recompilation : code inséré au milieu
+de .text (tout ce qui suit est décalé), littéraux d'adresses modifiés çà et là, chaîne de version changée.
+
+Usage : python bench/bench_delta.py [--app-kb 1536] [--insert 300] [--patches 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from _hako import load_launcher
+from esp_images import esp_image
+from mock_firmware import MockFirmwareServer
+
+
+def synthetic_text(size, rng):
+    """Pseudo-code machine : motifs répétitifs (prologues, appels) mêlés d'octets aléatoires."""
+    patterns = [bytes(rng.randrange(256) for _ in range(rng.choice((3, 4, 6, 8)))) for _ in range(64)]
+    out = bytearray()
+    while len(out) < size:
+        out += rng.choice(patterns) if rng.random() < 0.7 else rng.randbytes(rng.randrange(4, 32))
+    return out[:size]
+
+
+def new_version(text, rodata, insert, patches, rng):
+    text = bytearray(text)
+    middle = len(text) // 2
+    text[middle:middle] = rng.randbytes(insert)
+    for _ in range(patches):
+        offset = rng.randrange(0, len(text) - 4) & ~3
+        text[offset:offset + 4] = rng.randbytes(4)
+    rodata = bytearray(rodata)
+    rodata[:16] = b"HAKO v1.3.0\0\0\0\0\0"
+    return bytes(text), bytes(rodata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-kb", type=int, default=1536)
+    parser.add_argument("--insert", type=int, default=300, help="octets de code insérés au milieu de .text")
+    parser.add_argument("--patches", type=int, default=200, help="mots de 4 octets modifiés")
+    args = parser.parse_args()
+
+    rng = random.Random(2026)
+    text = synthetic_text(args.app_kb * 1024 * 3 // 4, rng)
+    rodata = b"HAKO v1.2.0\0\0\0\0\0" + synthetic_text(args.app_kb * 1024 // 4, rng)
+    old = esp_image([(0x3C000020, rodata), (0x42000020, text)])
+    new_text, new_rodata = new_version(text, rodata, args.insert, args.patches, rng)
+    new = esp_image([(0x3C000020, new_rodata), (0x42000020, new_text)])
+
+    hako = load_launcher()
+    directory = tempfile.mkdtemp()
+    old_path = os.path.join(directory, "old.bin")
+    with open(old_path, "wb") as f:
+        f.write(old)
+    for block_size in (1024, 2048, 4096):
+        new_path = os.path.join(directory, "app.bin")
+        with open(new_path, "wb") as f:
+            f.write(new)
+        index = hako.write_block_index(new_path, block_size)
+        with open(new_path + ".blocks.json", "rb") as f:
+            files = {"app.bin": new, "app.bin.blocks.json": f.read()}
+        with MockFirmwareServer(files) as server:
+            dest = os.path.join(directory, "rebuilt.bin")
+            start = time.perf_counter()
+            result = hako.DeltaDownloader(server.url + "app.bin", dest, old_path, index).run()
+            ms = (time.perf_counter() - start) * 1000
+            sent = server.server.bytes_sent
+        assert result["sha256"] == index["sha256"]
+        print(f"blocs {block_size:>5} o : {sent / 1e3:7.1f} Ko transférés (+ index {len(files['app.bin.blocks.json']) / 1e3:5.1f} Ko) "
+              f"sur {len(new) / 1e3:7.1f} Ko ({(sent + len(files['app.bin.blocks.json'])) * 100 / len(new):4.1f} %)   "
+              f"reconstruction {ms:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
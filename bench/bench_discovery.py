@@ -0,0 +1,81 @@
+"""Détection des cartes sur des pseudo-terminaux : sondage séquentiel vs concurrent, puis relance avec cache.
+
+Chaque carte est un bootloader simulé (USB 303A:1001, numéro de série propre) ; les ports « muets » ne
+répondent pas, comme un adaptateur série sans carte. On remplace ensuite une carte par une autre sur le même
+port : seule celle-ci doit être réinterrogée.
+
+Usage : python bench/bench_discovery.py [--boards 4] [--silent 2]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tty
+
+from _hako import load_launcher
+from stub_bootloader import StubBootloader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=4)
+    parser.add_argument("--silent", type=int, default=2, help="ports sans carte")
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    stubs = [StubBootloader(flash_size=(8 if i % 2 else 16) * 1024 * 1024, mac=f"f4:12:fa:00:00:{i:02x}")
+             for i in range(args.boards)]
+    resets, ports = {}, []
+    for i, stub in enumerate(stubs):
+        device = os.ttyname(stub.port_fd)
+        resets[device] = stub.reset
+        ports.append({"device": device, "vid": 0x303A, "pid": 0x1001, "serial": f"HAKO{i:04d}"})
+    silent = []
+    for _ in range(args.silent):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        silent.append((master, slave))
+        ports.append({"device": os.ttyname(slave), "vid": None, "pid": None, "serial": None})
+
+    def opener(device):
+        return hako.FdTransport(os.open(device, os.O_RDWR | os.O_NOCTTY), reset=resets.get(device))
+
+    path = os.path.join(tempfile.mkdtemp(), "devices.json")
+    scanner = hako.DeviceScanner(path, lister=lambda: [dict(port) for port in ports], opener=opener)
+
+    started = time.perf_counter()
+    for port in ports:
+        try:
+            scanner._probe(port)
+        except hako.FlashError:
+            pass
+    print(f"Sondage séquentiel de {len(ports)} ports : {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    started = time.perf_counter()
+    found = scanner.scan("ESP32-S3")
+    print(f"Sondage concurrent : {(time.perf_counter() - started) * 1000:.0f} ms, {len(found)} carte(s) ESP32-S3")
+    for device in found:
+        print(f"  {device['device']} {device['key']} MAC {device['mac']} flash {device['flash_size'] // 2**20} Mo")
+
+    relaunched = hako.DeviceScanner(path, lister=lambda: [dict(port) for port in ports], opener=opener)
+    started = time.perf_counter()
+    found = relaunched.scan("ESP32-S3")
+    print(f"Relance (cache) : {(time.perf_counter() - started) * 1000:.1f} ms, {len(found)} carte(s), "
+          f"{relaunched.probed} port(s) sondé(s) (ports muets inclus)")
+
+    ports[0]["serial"] = "HAKO9999" # Autre carte branchée sur le même port
+    probed = relaunched.probed
+    started = time.perf_counter()
+    relaunched.scan("ESP32-S3")
+    print(f"Carte remplacée : {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{relaunched.probed - probed} port(s) sondé(s)")
+
+    for stub in stubs:
+        stub.close()
+    for fds in silent:
+        for fd in fds:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+    main()
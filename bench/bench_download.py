@@ -0,0 +1,56 @@
+"""Débit du téléchargeur de firmware : 1 connexion vs N connexions Range, puis reprise après coupure.
+
+Usage : python bench/bench_download.py [--size-mb 16] [--rate-mb 4] [--connections 4]
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+from _hako import load_launcher
+from mock_firmware import MockFirmwareServer
+
+
+def download(hako, url, dest, connections):
+    downloader = hako.ChunkedDownloader(url, dest, connections=connections)
+    result = downloader.run()
+    os.remove(dest)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=16)
+    parser.add_argument("--rate-mb", type=float, default=4.0, help="débit max par connexion (Mo/s)")
+    parser.add_argument("--connections", type=int, default=4)
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    data = os.urandom(args.size_mb * 1024 * 1024)
+    expected = hashlib.sha256(data).hexdigest()
+    dest = os.path.join(tempfile.mkdtemp(), "image.bin")
+
+    with MockFirmwareServer({"image.bin": data}, rate=int(args.rate_mb * 1e6)) as server:
+        url = server.url + "image.bin"
+        for connections in (1, args.connections):
+            result = download(hako, url, dest, connections)
+            assert result["sha256"] == expected
+            print(f"{connections} connexion(s) : {result['ms']:8.1f} ms   {len(data) / result['ms'] / 1e3:6.1f} Mo/s")
+
+        # Coupure après la moitié du fichier, puis reprise : seuls les blocs manquants sont retéléchargés
+        server.server.fail_after = len(data) // 2
+        hako.DOWNLOAD_RETRIES = 0
+        try:
+            hako.ChunkedDownloader(url, dest, connections=args.connections).run()
+        except Exception as e:
+            print(f"interrompu : {type(e).__name__}")
+        server.server.fail_after = None
+        sent_before = server.server.bytes_sent
+        result = hako.ChunkedDownloader(url, dest, connections=args.connections).run()
+        assert result["sha256"] == expected
+        print(f"reprise   : {result['resumed_bytes'] / 1e6:.1f} Mo conservés, "
+              f"{(server.server.bytes_sent - sent_before) / 1e6:.1f} Mo retéléchargés, SHA-256 OK")
+
+
+if __name__ == "__main__":
+    main()
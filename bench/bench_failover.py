@@ -0,0 +1,85 @@
+"""Repli multi-endpoints du Worker : hedging sur latence de queue, endpoint en panne, endpoint dégradé.
+
+Trois Workers factices locaux :
+  - « principal » : rapide, mais une requête sur --tail-rate répond en --tail s (latence de queue) ;
+  - « secours » : latence constante un peu plus élevée ;
+  - une adresse fermée (connexion refusée) pour la panne.
+
+Usage : python bench/bench_failover.py [--runs 60] [--tail 0.6] [--tail-rate 0.2]
+"""
+import argparse
+import random
+import socket
+import statistics
+
+from _hako import load_launcher
+from mock_worker import MockWorker
+
+
+def closed_url():
+    """URL d'un port local sans serveur (connexion refusée immédiatement)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/"
+
+
+def run(hako, urls, runs, before=None):
+    """runs vérifications séquentielles ; retourne (durées ms, endpoint gagnant de chaque requête)."""
+    import time
+    hako.WORKER_ENDPOINTS = hako.WorkerEndpoints(urls)
+    hako.reset_worker_session()
+    timings, winners = [], []
+    for i in range(runs):
+        if before:
+            before(i)
+        start = time.perf_counter()
+        r = hako.worker_post({"license": "BENCH-KEY", "hwid": "bench"})
+        timings.append((time.perf_counter() - start) * 1000)
+        assert r.status_code == 200 and r.json()["valid"]
+        winners.append(urls.index(r.url))
+    return timings, winners
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    pick = lambda p: timings[min(len(timings) - 1, len(timings) * p // 100)]
+    print(f"  {label:<34} p50 {pick(50):6.0f} ms   p90 {pick(90):6.0f} ms   p99 {pick(99):6.0f} ms   "
+          f"moyenne {statistics.mean(timings):6.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=60)
+    parser.add_argument("--tail", type=float, default=0.6, help="latence de queue du principal (s)")
+    parser.add_argument("--tail-rate", type=float, default=0.2, help="part des requêtes en latence de queue")
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    rng = random.Random(2026)
+    with MockWorker(latency=0.02) as primary, MockWorker(latency=0.06) as backup:
+        def tail(_):
+            primary.server.latency = args.tail if rng.random() < args.tail_rate else 0.02
+
+        print("Latence de queue sur le principal :")
+        report("principal seul", run(hako, [primary.url], args.runs, tail)[0])
+        timings, winners = run(hako, [primary.url, backup.url], args.runs, tail)
+        report("principal + secours (hedging)", timings)
+        print(f"    réponses du secours : {winners.count(1)}/{args.runs}")
+
+        print("Principal en panne (connexion refusée) :")
+        timings, winners = run(hako, [closed_url(), backup.url], args.runs)
+        report("panne + secours", timings)
+
+        print("Principal dégradé à mi-parcours (0,4 s constant) :")
+        def degrade(i):
+            primary.server.latency = 0.02 if i < args.runs // 2 else 0.4
+        timings, winners = run(hako, [primary.url, backup.url], args.runs, degrade)
+        report("dégradation", timings[args.runs // 2:])
+        late = winners[-args.runs // 4:]
+        print(f"    dernier quart : {late.count(1)}/{len(late)} réponses du secours ; "
+              f"classement final {[url for url, *_ in hako.WORKER_ENDPOINTS.snapshot()] == [backup.url, primary.url] and 'secours en tête' or 'principal en tête'}")
+    hako.reset_worker_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Flash série d'une image fusionnée vers le bootloader simulé : durée, octets sur le fil, vitesse négociée, MD5.
+
+Compare l'envoi bloc par bloc (profondeur 1) à l'envoi en pipeline, et l'envoi de toute l'image à celui
+des seuls secteurs non vides.
+
+Usage : python bench/bench_flash.py [--app-kb 512] [--max-baud 2000000] [--depth 2]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _hako import load_launcher
+from esp_images import merged_image
+from stub_bootloader import StubBootloader
+
+
+def flash_once(hako, parts, max_baud, depth, skip_empty):
+    with StubBootloader(max_baud=max_baud) as stub:
+        transport = hako.FdTransport(stub.port_fd, reset=stub.reset)
+        loader = hako.EspLoader(transport)
+        started = time.perf_counter()
+        assert loader.sync(), "pas de SYNC"
+        chip = loader.detect_chip()
+        baud = loader.negotiate_baud()
+        loader.spi_attach()
+        if skip_empty:
+            regions = hako.flash_regions(parts)
+        else:
+            regions = []
+            for offset, path in parts:
+                with open(path, "rb") as f:
+                    data = f.read()
+                regions.append((offset, data, len(data)))
+        loader.flash_deflate(regions, depth=depth)
+        loader.finish()
+        elapsed = time.perf_counter() - started
+        expected = True
+        for offset, path in parts:
+            with open(path, "rb") as f:
+                data = f.read()
+            expected &= bytes(stub.flash[offset:offset + len(data)]) == data
+    return {"chip": chip, "baud": baud, "s": elapsed, "wire": loader.bytes_sent, "written": stub.bytes_written,
+            "ok": expected}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-kb", type=int, default=512)
+    parser.add_argument("--max-baud", type=int, default=2000000, help="vitesse maximale tenue par la liaison simulée")
+    parser.add_argument("--depth", type=int, default=2, help="profondeur du pipeline comparée à 1")
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "full.bin")
+    image = merged_image(app_size=args.app_kb * 1024)
+    with open(path, "wb") as f:
+        f.write(image)
+    parts = [(0, path)]
+    print(f"Image : {len(image) / 1e6:.2f} Mo, liaison jusqu'à {args.max_baud} bauds")
+    for depth, skip_empty in ((1, False), (1, True), (args.depth, True)):
+        result = flash_once(hako, parts, args.max_baud, depth, skip_empty)
+        print(f"  profondeur {depth}, secteurs vides {'sautés' if skip_empty else 'envoyés'} : "
+              f"{result['s']:.2f} s à {result['baud']} bauds, {result['wire'] / 1e3:.0f} ko sur le fil, "
+              f"{result['written'] / 1e3:.0f} ko écrits, flash {'identique' if result['ok'] else 'DIFFÉRENTE'}")
+
+
+if __name__ == "__main__":
+    main()
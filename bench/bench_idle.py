@@ -0,0 +1,89 @@
+"""Coût au repos de l'animation du menu : réveils de la boucle par seconde et CPU du processus.
+
+Avec un affichage (DISPLAY, ou xvfb-run sous Linux), l'application complète reste au repos --seconds s.
+Sans affichage, AnimationScheduler tourne sur une racine factice (mêmes after()/after_cancel()) :
+seuls les réveils et le coût Python du planificateur sont alors mesurés, pas le rendu Tk.
+
+Usage : python bench/bench_idle.py [--seconds 10] [--interval-ms 300]
+--interval-ms remplace l'intervalle du pulse (ex. 50 pour l'ancien réglage à 20 images/s).
+"""
+import argparse
+import heapq
+import itertools
+import os
+import time
+
+from _hako import load_launcher
+
+
+class StubRoot:
+    """Racine Tk minimale : file de jobs after() exécutés par run()."""
+
+    def __init__(self):
+        self._jobs = []
+        self._ids = itertools.count()
+        self._cancelled = set()
+        self.wakeups = 0
+
+    def after(self, ms, callback):
+        job = next(self._ids)
+        heapq.heappush(self._jobs, (time.monotonic() + ms / 1000, job, callback))
+        return job
+
+    def after_cancel(self, job):
+        self._cancelled.add(job)
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def run(self, seconds):
+        end = time.monotonic() + seconds
+        while self._jobs and self._jobs[0][0] < end:
+            due, job, callback = heapq.heappop(self._jobs)
+            if job in self._cancelled:
+                continue
+            time.sleep(max(0.0, due - time.monotonic()))
+            self.wakeups += 1
+            callback()
+        time.sleep(max(0.0, end - time.monotonic()))
+
+
+def measure(hako, seconds, interval_ms):
+    table = hako.build_pulse_table()
+    if os.environ.get("DISPLAY") or os.name == "nt":
+        app = hako.HakoApp()
+        if interval_ms:
+            app.animations.add("menu_pulse", lambda frame: app.menu.configure(bg=table[frame % len(table)]), interval_ms)
+        app.update()
+        start_cpu, end = time.process_time(), time.monotonic() + seconds
+        while time.monotonic() < end:
+            app.update()
+            time.sleep(0.005)
+        frames = app.animations._animations["menu_pulse"][3]
+        cpu = time.process_time() - start_cpu
+        app.on_closing()
+        return "application", frames, cpu
+
+    root, colors = StubRoot(), []
+    scheduler = hako.AnimationScheduler(root)
+    scheduler.add("menu_pulse", lambda frame: colors.append(table[frame % len(table)]),
+                  interval_ms or hako.PULSE_SPEED_MS)
+    start_cpu = time.process_time()
+    root.run(seconds)
+    return "planificateur seul (sans affichage)", root.wakeups, time.process_time() - start_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval-ms", type=int, default=0, help="intervalle du pulse (défaut : PULSE_SPEED_MS)")
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    mode, wakeups, cpu = measure(hako, args.seconds, args.interval_ms)
+    print(f"{mode} : {wakeups / args.seconds:.1f} réveils/s, CPU {cpu / args.seconds * 100:.2f} % "
+          f"({cpu * 1000:.0f} ms en {args.seconds:.0f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Instance unique : délai de passage de main d'un second lancement, et reprise après un arrêt brutal.
+
+Une instance principale (processus séparé, sans interface) tient le verrou et écoute le canal ; on mesure
+le second lancement complet (python HAKO-PRO-2026.py manifest.json) jusqu'à sa sortie, et la seule
+transmission des arguments. L'instance principale est ensuite tuée (SIGKILL) : le lancement suivant doit
+récupérer le verrou malgré le socket resté sur le disque.
+
+Usage : python bench/bench_instance.py [--runs 10]
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _hako import LAUNCHER_PATH, load_launcher
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def primary():
+    """Instance principale minimale : affiche chaque argv reçu."""
+    hako = load_launcher()
+    guard = hako.InstanceGuard()
+    if not guard.acquire():
+        print("occupé", flush=True)
+        return
+    guard.serve(lambda argv: print(" ".join(argv), flush=True))
+    print("prêt", flush=True)
+    while True:
+        time.sleep(1)
+
+
+def start_primary(env):
+    proc = subprocess.Popen([sys.executable, __file__, "--primary"], env=env, stdout=subprocess.PIPE, text=True)
+    assert proc.stdout.readline().strip() == "prêt"
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--primary", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.primary:
+        return primary()
+
+    data_dir = tempfile.mkdtemp()
+    os.environ["HAKO_DATA_DIR"] = data_dir
+    env = dict(os.environ)
+    hako = load_launcher()
+    proc = start_primary(env)
+
+    launches, forwards = [], []
+    for i in range(args.runs):
+        started = time.perf_counter()
+        second = subprocess.run([sys.executable, LAUNCHER_PATH, "manifest.json", str(i)], env=env,
+                                capture_output=True, text=True)
+        launches.append((time.perf_counter() - started) * 1000)
+        assert second.returncode == 0, second.stdout + second.stderr
+        assert proc.stdout.readline().strip() == f"manifest.json {i}"
+    guard = hako.InstanceGuard()
+    assert not guard.acquire(), "le verrou devrait être tenu par l'instance principale"
+    for i in range(args.runs):
+        started = time.perf_counter()
+        assert guard.forward(["ping"])
+        forwards.append((time.perf_counter() - started) * 1000)
+        proc.stdout.readline()
+    print(f"Second lancement complet (processus) : médiane {statistics.median(launches):.0f} ms, max {max(launches):.0f} ms")
+    print(f"Transmission des arguments seule : médiane {statistics.median(forwards):.2f} ms")
+
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+    stale = os.path.exists(os.path.join(data_dir, "instance.sock"))
+    started = time.perf_counter()
+    proc = start_primary(env)
+    print(f"Après SIGKILL (socket restant : {'oui' if stale else 'non'}) : nouvelle instance principale en "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+    proc.kill()
+    proc.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Image flash fusionnée : durée de construction, octets réellement occupés sur disque, carte des secteurs.
+
+Usage : python bench/bench_merge.py [--flash-mb 16] [--app-kb 1024]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _hako import load_launcher
+from esp_images import esp_image, partition_table
+
+
+def disk_usage(path):
+    """Octets alloués sur disque (fichier creux compris), ou taille apparente si st_blocks n'existe pas."""
+    st = os.stat(path)
+    return st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flash-mb", type=int, default=16)
+    parser.add_argument("--app-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    directory = tempfile.mkdtemp()
+    app_data = os.urandom(args.app_kb * 512) + b"\xff" * (args.app_kb * 512) # Moitié de l'app déjà à 0xFF
+    files = {
+        0x0: esp_image([(0x3FCD0000, os.urandom(0x3000))], hash_appended=False),
+        0x8000: partition_table([("factory", 0, 0, 0x10000, 0x300000), ("spiffs", 1, 0x82, 0xC00000, 0x100000)]),
+        0x10000: esp_image([(0x42000020, app_data)]),
+        0xC00000: os.urandom(0x2000), # Petit système de fichiers loin dans la flash
+    }
+    parts = []
+    for offset, data in files.items():
+        path = os.path.join(directory, f"part_{offset:06x}.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        parts.append((offset, path))
+    used = sum(len(data) for data in files.values())
+
+    modes = (("fin de la dernière partie", None, False), ("taille de flash", args.flash_mb << 20, False),
+             ("taille de flash, creux", args.flash_mb << 20, True))
+    reference = None
+    for label, flash_size, sparse in modes:
+        out = os.path.join(directory, "merged.bin")
+        start = time.perf_counter()
+        result = hako.build_merged_image(parts, out, flash_size, sparse)
+        ms = (time.perf_counter() - start) * 1000
+        sectors = sum(count for _, count in result["data_sectors"])
+        total = -(-result["image_size"] // result["sector_size"])
+        print(f"{label:<26} {ms:7.1f} ms   image {result['image_size'] / 1e6:5.1f} Mo   "
+              f"disque {disk_usage(out) / 1e6:5.1f} Mo   secteurs utiles {sectors}/{total} "
+              f"({sectors * 4096 / 1e6:.1f} Mo à flasher, {used / 1e6:.1f} Mo de parties)")
+        flashed = sum(len(data) for _, data in hako.iter_data_sectors(out))
+        assert sectors * 4096 - 4096 < flashed <= sectors * 4096
+        image = b"".join(data for _, data in hako.iter_image(out)) # Lue à travers la carte : trous à 0xFF
+        if flash_size and not sparse:
+            reference = image
+        elif sparse:
+            assert image == reference, "image creuse différente de l'image complète une fois lue par la carte"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Moniteur série sur un pseudo-terminal en boucle : débit tenu, lignes perdues, coût d'une image de la vue.
+
+Un thread écrit des journaux type ESP-IDF au débit d'une liaison à --baud (10 bits par octet) ; la boucle
+principale simule l'interface : une relève de la vue toutes les MONITOR_FRAME_MS, comme HakoApp._poll_monitor.
+Une image plus longue que STALL_THRESHOLD_MS compte comme blocage.
+
+Usage : python bench/bench_monitor.py [--baud 2000000] [--seconds 5] [--filter "wifi|E \\("]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import tty
+
+from _hako import load_launcher
+
+TAGS = ["wifi", "ble", "display", "sentinel", "main", "httpd", "nvs"]
+
+
+def log_lines(rng):
+    tick = 0
+    while True:
+        tick += rng.randrange(1, 20)
+        level = rng.choice("IIIIIIWDE")
+        yield (f"{level} ({tick}) {rng.choice(TAGS)}: " + "x" * rng.randrange(10, 90) + "\r\n").encode()
+
+
+def writer(fd, rate, seconds, sent):
+    rng = random.Random(2026)
+    lines = log_lines(rng)
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        batch = b"".join(next(lines) for _ in range(64))
+        os.write(fd, batch)
+        sent["bytes"] += len(batch)
+        sent["lines"] += 64
+        delay = sent["bytes"] / rate - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baud", type=int, default=2000000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--filter", default=r"wifi|E \(")
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    device_fd, port_fd = os.openpty()
+    tty.setraw(device_fd)
+    tty.setraw(port_fd)
+    monitor = hako.SerialMonitor(hako.FdTransport(port_fd)).start()
+    sent = {"bytes": 0, "lines": 0}
+    thread = threading.Thread(target=writer, args=(device_fd, args.baud / 10, args.seconds, sent), daemon=True)
+    thread.start()
+
+    frames, stalls, worst = 0, 0, 0.0
+    filter_at = time.perf_counter() + args.seconds / 2 # Filtre posé en cours de route, sur un tampon déjà rempli
+    while thread.is_alive() or monitor.ring.total < sent["lines"]:
+        started = time.perf_counter()
+        if filter_at and started >= filter_at:
+            monitor.view.set_filter(args.filter)
+            filter_at = None
+        lines, _, _ = monitor.view.window(hako.MONITOR_ROWS)
+        "\n".join(lines)
+        ms = (time.perf_counter() - started) * 1000
+        frames += 1
+        worst = max(worst, ms)
+        stalls += ms > hako.STALL_THRESHOLD_MS
+        time.sleep(max(0.0, hako.MONITOR_FRAME_MS / 1000 - ms / 1000))
+        if not thread.is_alive() and time.perf_counter() - started > 2:
+            break
+    monitor.stop()
+    monitor.finished.wait(2)
+    os.close(device_fd)
+
+    print(f"Envoyé : {sent['lines']} lignes, {sent['bytes'] / 1e6:.2f} Mo en {args.seconds:.0f} s "
+          f"({sent['bytes'] * 10 / args.seconds / 1e6:.2f} Mbaud effectifs)")
+    print(f"Reçu : {monitor.ring.total} lignes, {monitor.bytes / 1e6:.2f} Mo — {sent['lines'] - monitor.ring.total} perdue(s)")
+    print(f"Vue : {frames} images, pire {worst:.2f} ms, {stalls} blocage(s) > {hako.STALL_THRESHOLD_MS} ms ; "
+          f"filtre « {args.filter} » : {len(monitor.view.filter.matches) if monitor.view.filter else 0} lignes")
+
+
+if __name__ == "__main__":
+    main()
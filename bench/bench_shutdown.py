@@ -0,0 +1,79 @@
+"""Fermeture de l'application pendant une activation bloquée sur un Worker volontairement lent.
+
+Usage : python bench/bench_shutdown.py [--runs 3] [--latency 10]
+Le launcher tourne dans un processus fils ; on mesure le temps entre l'appel à on_closing()
+et la fin du processus. Code de sortie 1 si ce temps dépasse SHUTDOWN_DEADLINE_S ou si la requête n'était pas en vol.
+Nécessite un affichage (DISPLAY, ou xvfb-run sous Linux).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _hako import load_launcher
+from mock_worker import MockWorker
+
+
+def child(worker_url):
+    """Lance l'activation, attend qu'elle soit en vol, puis ferme la fenêtre comme l'utilisateur."""
+    os.environ["HAKO_DATA_DIR"] = tempfile.mkdtemp()
+    os.chdir(os.environ["HAKO_DATA_DIR"])
+    hako = load_launcher()
+    hako.WORKER_ENDPOINTS = hako.WorkerEndpoints([worker_url])
+    app = hako.HakoApp()
+
+    def activate():
+        home = app.get_page("home")
+        home.key_var.set("BENCH-SLOW-KEY")
+        home.activate_key()
+        app.after(300, close)
+
+    def close():
+        print("closing", flush=True)
+        app.on_closing()
+
+    app.after(200, activate)
+    # Même séquence de sortie que le bloc __main__ du launcher
+    app.mainloop()
+    hako.BACKGROUND.shutdown(hako.SHUTDOWN_GRACE_S)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=10.0, help="latence du Worker factice (s)")
+    parser.add_argument("--child", metavar="URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    deadline_ms = load_launcher().SHUTDOWN_DEADLINE_S * 1000
+    failed = False
+    with MockWorker(latency=args.latency) as worker:
+        for run in range(args.runs):
+            requests_before = worker.server.requests
+            connections_before = worker.server.connections
+            proc = subprocess.Popen([sys.executable, __file__, "--child", worker.url], stdout=subprocess.PIPE, text=True)
+            if proc.stdout.readline().strip() != "closing":
+                proc.kill()
+                print("ÉCHEC : le launcher n'a pas atteint la fermeture")
+                return 1
+            closed_at = time.perf_counter()
+            proc.wait()
+            exit_ms = (time.perf_counter() - closed_at) * 1000
+            # La requête est arrivée au Worker mais n'a pas reçu de réponse : elle était bien "en vol" à la fermeture
+            in_flight = worker.server.connections > connections_before and worker.server.requests == requests_before
+            ok = in_flight and exit_ms <= deadline_ms
+            status = "OK" if ok else "ÉCHEC"
+            failed |= not ok
+            print(f"essai {run + 1}: sortie en {exit_ms:6.1f} ms (budget {deadline_ms:.0f} ms), "
+                  f"requête en vol: {'oui' if in_flight else 'non'}  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Budget de démarrage : temps jusqu'au premier affichage de la fenêtre et coût des imports.
+
+Usage : python bench/bench_startup.py [--runs 5] [--budget-ms 1000] [--theme-profile]
+Chaque mesure se fait dans un processus neuf. Nécessite un affichage (DISPLAY, ou xvfb-run sous Linux).
+Code de sortie 1 si la médiane du premier affichage dépasse le budget
+ou si un module censé être chargé à la demande est importé au démarrage.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAZY_MODULES = ("requests", "uuid", "tkinter.colorchooser", "webbrowser", "ctypes")
+
+
+THEME_PROFILE = {"theme": {"primary_bg": "#001018", "neon_accent": "#00fff2", "current_font": "Consolas"}, "stealth": True}
+
+
+def child(theme_profile=False):
+    """Mesure dans le processus courant : import du launcher, construction, premier affichage."""
+    t0 = time.perf_counter()
+    from _hako import load_launcher
+    os.environ["HAKO_DATA_DIR"] = tempfile.mkdtemp() # Pas de licence sauvegardée : chemin "premier lancement"
+    os.chdir(os.environ["HAKO_DATA_DIR"])
+    if theme_profile: # Profil personnalisé enregistré lors d'une session précédente
+        with open(os.path.join(os.environ["HAKO_DATA_DIR"], "settings.json"), "w", encoding="utf-8") as f:
+            json.dump(THEME_PROFILE, f)
+    hako = load_launcher()
+    t_import = time.perf_counter()
+    eager = [name for name in LAZY_MODULES if name in sys.modules]
+
+    hako.WORKER_ENDPOINTS = hako.WorkerEndpoints(["http://127.0.0.1:9/"]) # Le préchauffage ne doit pas sortir sur le réseau
+    app = hako.HakoApp()
+    t_init = time.perf_counter()
+    while not app.winfo_viewable():
+        app.update()
+    app.update_idletasks()
+    t_paint = time.perf_counter()
+    app.on_closing()
+
+    print(json.dumps({
+        "import_ms": (t_import - t0) * 1000,
+        "init_ms": (t_init - t_import) * 1000,
+        "first_paint_ms": (t_paint - t0) * 1000,
+        "eager_imports": eager,
+        "theme_applies": hako.METRICS.count("theme.apply"), # Reconfigurations de thème avant l'affichage
+    }))
+
+
+def _importtime(code):
+    """Imports de premier niveau (nom -> µs cumulées) d'après python -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "): # Le nom est indenté pour les imports imbriqués
+            rows[name.strip()] = int(cumulative)
+    return rows
+
+
+def import_profile(top=8):
+    """Les imports les plus coûteux du launcher (hors démarrage de l'interpréteur)."""
+    baseline = _importtime("pass")
+    code = f"import sys; sys.path.insert(0, {BENCH_DIR!r}); from _hako import load_launcher; load_launcher()"
+    rows = [(us, name) for name, us in _importtime(code).items() if name not in baseline]
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="budget du premier affichage")
+    parser.add_argument("--theme-profile", action="store_true", help="démarrer avec un profil de thème enregistré")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.theme_profile)
+        return 0
+
+    print("Imports les plus coûteux (python -X importtime, cumulé) :")
+    for cumulative_us, name in import_profile():
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    results = []
+    for _ in range(args.runs):
+        command = [sys.executable, __file__, "--child"] + (["--theme-profile"] if args.theme_profile else [])
+        out = subprocess.run(command, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for key in ("import_ms", "init_ms", "first_paint_ms"):
+        values = [r[key] for r in results]
+        print(f"{key:<15} médiane {statistics.median(values):7.1f} ms   max {max(values):7.1f} ms")
+
+    failed = False
+    eager = sorted({name for r in results for name in r["eager_imports"]})
+    if eager:
+        print(f"ÉCHEC : modules importés au démarrage : {', '.join(eager)}")
+        failed = True
+    restyles = max(r["theme_applies"] for r in results)
+    if restyles:
+        print(f"ÉCHEC : {restyles} reconfiguration(s) de thème avant le premier affichage")
+        failed = True
+    first_paint = statistics.median(r["first_paint_ms"] for r in results)
+    if first_paint > args.budget_ms:
+        print(f"ÉCHEC : premier affichage {first_paint:.0f} ms > budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Suite de benchmarks reproductible : démarrage, latence d'activation, mémoire, blocages de la boucle Tk.
+
+Chaque mesure tourne dans un processus neuf, face au Worker factice local (mock_worker) et ses pannes
+injectées : latence variable avec queue, HTTP 5xx, connexions réinitialisées, JSON tronqué. Les mesures
+d'interface ont besoin d'un affichage ; sous Linux sans DISPLAY, un Xvfb est lancé pour la durée de la suite.
+Sans Xvfb, ces mesures sont marquées « skipped » et le reste de la suite tourne quand même.
+
+Les résultats sont enregistrés en JSON (--output) ; --compare ANCIEN.json affiche l'écart de chaque mesure
+et sort en code 1 si l'une se dégrade de plus de --tolerance %.
+
+Usage : python bench/bench_suite.py [--runs 30] [--output bench_suite.json] [--compare ancien.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _hako import LAUNCHER_PATH, ROOT, load_launcher
+from mock_worker import MockWorker
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED = 2026
+
+# Scénarios d'activation : réglages du Worker factice (voir MockWorker)
+SCENARIOS = {
+    "nominal": {"latency": 0.02},
+    "latence": {"latency": 0.02, "jitter": 0.5, "tail_rate": 0.1, "tail_latency": 0.4},
+    "http_5xx": {"latency": 0.02, "error_rate": 0.3},
+    "resets": {"latency": 0.02, "reset_rate": 0.3},
+    "json_tronque": {"latency": 0.02, "malformed_rate": 0.2},
+    "mixte": {"latency": 0.02, "jitter": 0.5, "tail_rate": 0.05, "tail_latency": 0.4,
+              "error_rate": 0.1, "reset_rate": 0.1, "malformed_rate": 0.05},
+}
+PAGES = ("options", "info", "monitor", "support", "home")
+# Écart absolu en deçà duquel une variation relève du bruit de mesure, quel que soit le pourcentage
+NOISE_FLOORS = {"_ms": 5.0, "_mb": 2.0, "stalls": 1, "success_rate": 0.0}
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus courant (Mo) ; None si la plateforme ne le fournit pas."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1) # Octets sous macOS, Ko ailleurs
+
+
+def percentiles(values, points=(50, 90, 99)):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {f"p{p}_ms": round(values[min(len(values) - 1, len(values) * p // 100)], 1) for p in points}
+
+
+def outcome(ok, msg):
+    """Catégorie d'un résultat de check_and_bind_key (le message est destiné à l'utilisateur)."""
+    if ok:
+        return "ok"
+    for prefix, name in (("Erreur de l'API", "http"), ("Erreur de connexion", "connexion"),
+                         ("Délai", "timeout"), ("Réponse invalide", "json"), ("Opération annulée", "annulé")):
+        if msg.startswith(prefix):
+            return name
+    return "autre"
+
+
+def load_for_child(url):
+    """Launcher dans un dossier de données vierge, pointé sur le Worker factice, au jitter de backoff reproductible."""
+    os.environ["HAKO_DATA_DIR"] = tempfile.mkdtemp() # Avant l'import : les chemins de données en dépendent
+    os.chdir(os.environ["HAKO_DATA_DIR"])
+    hako = load_launcher()
+    hako.WORKER_ENDPOINTS = hako.WorkerEndpoints([url])
+    hako.random.seed(SEED)
+    return hako
+
+
+# ----------------------------------------------------------------------------------------------------------
+# Processus fils : chacun imprime une ligne JSON sur stdout
+# ----------------------------------------------------------------------------------------------------------
+def child_activation(url, runs):
+    """Activations successives sur une session préchauffée, comme un utilisateur qui réessaie."""
+    hako = load_for_child(url)
+    hako.prewarm_worker_session()
+    timings, outcomes = [], {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        ok, msg, _ = hako.check_and_bind_key("BENCH-KEY")
+        timings.append((time.perf_counter() - start) * 1000)
+        outcomes[outcome(ok, msg)] = outcomes.get(outcome(ok, msg), 0) + 1
+    hako.BACKGROUND.shutdown(hako.SHUTDOWN_GRACE_S)
+    return {**percentiles(timings), "success_rate": round(outcomes.get("ok", 0) / runs, 3), "outcomes": outcomes,
+            "attempts": hako.METRICS.count("worker.request"), "peak_rss_mb": peak_rss_mb()}
+
+
+def child_session(url, activations, seconds):
+    """Session d'interface : activations par la page d'accueil puis navigation, sous le watchdog de blocages."""
+    hako = load_for_child(url)
+    app = hako.HakoApp()
+    home = app.get_page("home")
+    timings, outcomes, state = [], {}, {"done": 0, "started": 0.0}
+
+    def activate():
+        app.license_data = None # Sinon show_home renvoie vers la page de téléchargement après un succès
+        app.show_home()
+        home.key_var.set("BENCH-KEY")
+        state["started"] = time.perf_counter()
+        home.activate_key()
+        app.after(5, wait_result)
+
+    def wait_result():
+        if str(home.act_btn.cget("state")) != "normal": # Boutons réactivés par handle_activation_result
+            app.after(5, wait_result)
+            return
+        timings.append((time.perf_counter() - state["started"]) * 1000)
+        text = home.status_label.cget("text")
+        result = "ok" if "✅" in text or "HWID" in text else outcome(False, text)
+        outcomes[result] = outcomes.get(result, 0) + 1
+        state["done"] += 1
+        if state["done"] < activations:
+            app.after(50, activate)
+        else:
+            state["until"] = time.perf_counter() + seconds
+            app.after(50, lambda: navigate(0))
+
+    def navigate(i):
+        if time.perf_counter() >= state["until"]:
+            app.on_closing()
+            return
+        getattr(app, f"show_{PAGES[i % len(PAGES)]}")()
+        app.after(100, lambda: navigate(i + 1))
+
+    app.after(200, activate)
+    app.mainloop()
+    hako.BACKGROUND.shutdown(hako.SHUTDOWN_GRACE_S)
+    hako.METRICS.flush() # on_closing a déjà exporté l'essentiel ; on relit l'export comme un outil externe
+    with open(hako.METRICS.path, encoding="utf-8") as f:
+        stalls = [entry for entry in map(json.loads, f) if entry["name"] == "tk.stall"]
+    worst = sorted(stalls, key=lambda entry: entry["ms"], reverse=True)[:5]
+    return {**percentiles(timings), "outcomes": outcomes, "stalls": len(stalls),
+            "stall_max_ms": round(max((entry["ms"] for entry in stalls), default=0.0), 1),
+            "worst_callbacks": [f"{entry['callback']} ({entry['ms']:.0f} ms)" for entry in worst],
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def run_child(args, env=None):
+    proc = subprocess.run([sys.executable, __file__, "--child"] + args, capture_output=True, text=True, env=env)
+    if proc.returncode:
+        raise RuntimeError(f"processus de mesure en échec ({' '.join(args)}) :\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ----------------------------------------------------------------------------------------------------------
+# Mesures
+# ----------------------------------------------------------------------------------------------------------
+def wall_ms(command, env, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, capture_output=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 1)
+
+
+def measure_cli(url, runs):
+    """Démarrage de la commande headless `status` (réponse depuis le bail), comparé à l'interpréteur nu."""
+    env = dict(os.environ, HAKO_DATA_DIR=tempfile.mkdtemp(), HAKO_WORKER_URLS=url)
+    activate = subprocess.run([sys.executable, LAUNCHER_PATH, "activate", "BENCH-KEY"], env=env, capture_output=True)
+    interpreter = wall_ms([sys.executable, "-c", "pass"], env, runs)
+    status = wall_ms([sys.executable, LAUNCHER_PATH, "status"], env, runs)
+    return {"activate_exit": activate.returncode, "interpreter_ms": interpreter, "status_ms": status,
+            "status_overhead_ms": round(status - interpreter, 1)}
+
+
+def measure_startup(runs, env):
+    """Premier affichage de la fenêtre (médianes) : réutilise le processus fils de bench_startup."""
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, os.path.join(BENCH_DIR, "bench_startup.py"), "--child"],
+                             capture_output=True, text=True, env=env, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    medians = {key: round(statistics.median(r[key] for r in results), 1)
+               for key in ("import_ms", "init_ms", "first_paint_ms")}
+    return {**medians, "first_paint_max_ms": round(max(r["first_paint_ms"] for r in results), 1),
+            "eager_imports": sorted({name for r in results for name in r["eager_imports"]})}
+
+
+def start_virtual_display():
+    """Lance Xvfb sur un numéro d'affichage libre ; retourne (processus, DISPLAY) ou (None, None)."""
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        return None, None
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen([xvfb, "-displayfd", str(write_fd), "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip() # Xvfb écrit le numéro choisi une fois prêt
+    if not number:
+        proc.kill()
+        return None, None
+    return proc, f":{number}"
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "-C", ROOT, "describe", "--always", "--dirty"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def run_suite(args):
+    results = {"activation": {}}
+    for name, settings in SCENARIOS.items():
+        with MockWorker(seed=SEED, **settings) as worker:
+            results["activation"][name] = run_child(["activation", worker.url, str(args.runs)])
+            results["activation"][name]["faults"] = dict(worker.server.faults)
+        print(f"  activation/{name}: {results['activation'][name]}", file=sys.stderr)
+
+    with MockWorker(latency=0.02, seed=SEED) as worker:
+        results["cli"] = measure_cli(worker.url, args.startup_runs)
+    print(f"  cli: {results['cli']}", file=sys.stderr)
+
+    display, xvfb = os.environ.get("DISPLAY"), None
+    if not display and sys.platform.startswith("linux") and not args.no_gui:
+        xvfb, display = start_virtual_display()
+    gui = display or (sys.platform in ("win32", "darwin") and not args.no_gui)
+    try:
+        if not gui:
+            reason = "désactivé (--no-gui)" if args.no_gui else "aucun affichage (DISPLAY absent, Xvfb introuvable)"
+            results["startup"] = results["session"] = {"skipped": reason}
+        else:
+            env = dict(os.environ, **({"DISPLAY": display} if display else {}))
+            results["startup"] = measure_startup(args.startup_runs, env)
+            with MockWorker(seed=SEED, **SCENARIOS["mixte"]) as worker:
+                results["session"] = run_child(["session", worker.url, str(args.activations), str(args.seconds)],
+                                               env=env)
+        print(f"  startup: {results['startup']}\n  session: {results['session']}", file=sys.stderr)
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+
+    return {
+        "meta": {"revision": git_revision(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "python": platform.python_version(), "platform": platform.platform(), "runs": args.runs,
+                 "display": "xvfb" if xvfb else ("natif" if gui else None)},
+        "results": results,
+    }
+
+
+# ----------------------------------------------------------------------------------------------------------
+# Comparaison entre deux versions
+# ----------------------------------------------------------------------------------------------------------
+def flatten(tree, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, mesures numériques seulement."""
+    flat = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def noise_floor(key):
+    """Écart absolu minimal pour juger la mesure ; None pour les valeurs descriptives (sans verdict)."""
+    name = key.rsplit(".", 1)[-1]
+    if name == "interpreter_ms": # Référence de la machine, pas du launcher
+        return None
+    for suffix, floor in NOISE_FLOORS.items():
+        if name.endswith(suffix):
+            return floor
+    return None
+
+
+def compare(old, new, tolerance):
+    """Affiche l'écart de chaque mesure commune ; retourne le nombre de régressions au-delà de tolerance %."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    print(f"Comparaison {old['meta'].get('revision')} -> {new['meta'].get('revision')} (tolérance {tolerance:.0f} %)")
+    if old["meta"].get("runs") != new["meta"].get("runs"):
+        print(f"  attention : {old['meta'].get('runs')} puis {new['meta'].get('runs')} activations par scénario")
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        floor = noise_floor(key)
+        if floor is None:
+            continue
+        a, b = before[key], after[key]
+        change = (b - a) / a * 100 if a else (0.0 if b == a else float("inf"))
+        higher_is_better = key.endswith("success_rate")
+        worse = (-change if higher_is_better else change) > tolerance and abs(b - a) > floor
+        regressions += worse
+        print(f"  {key:<42} {a:>9} -> {b:>9}  {change:+7.1f} %{'  RÉGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30, help="activations par scénario")
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--activations", type=int, default=10, help="activations par la page d'accueil")
+    parser.add_argument("--seconds", type=float, default=5.0, help="durée de la navigation entre pages")
+    parser.add_argument("--no-gui", action="store_true", help="ignorer les mesures d'interface")
+    parser.add_argument("--output", default="bench_suite.json")
+    parser.add_argument("--compare", metavar="ANCIEN.json")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="dégradation tolérée (%%)")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, url, *rest = args.child
+        result = child_activation(url, int(rest[0])) if kind == "activation" else \
+            child_session(url, int(rest[0]), float(rest[1]))
+        print(json.dumps(result))
+        return 0
+
+    report = run_suite(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Résultats enregistrés dans {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return 1 if compare(json.load(f), report, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Latence d'un changement de thème selon le nombre de widgets : parcours complet vs jetons modifiés.
+
+Usage : python bench/bench_theme.py [--sizes 100 500 1000 2000] [--repeat 10]
+Nécessite un affichage (DISPLAY, ou xvfb-run sous Linux).
+"""
+import argparse
+import statistics
+import time
+import tkinter as tk
+
+from _hako import load_launcher
+
+TOKENS = ("primary_bg", "text_fg", "neon_accent", "button_bg")
+
+
+def build(hako, root, count):
+    """count labels répartis sur les jetons de couleur, tous liés à la police courante."""
+    theme = hako.ThemeRegistry({
+        "primary_bg": hako.PRIMARY_BG,
+        "panel_bg": hako.PANEL_BG,
+        "neon_accent": hako.NEON_PINK,
+        "text_fg": "#d4b3ff",
+        "button_bg": "#0a0018",
+        "current_font": hako.DEFAULT_FONT,
+    })
+    frame = tk.Frame(root)
+    frame.pack()
+    widgets = []
+    for i in range(count):
+        fg = TOKENS[i % len(TOKENS)]
+        label = theme.create(tk.Label, frame, {"bg": "primary_bg", "fg": fg, "font": hako.ThemeFont(10)}, text=str(i))
+        label.grid(row=i // 40, column=i % 40)
+        widgets.append((label, fg))
+    root.update()
+    return theme, frame, widgets
+
+
+def full_walk(theme, widgets):
+    """Ancienne approche : chaque widget reçoit toutes ses options à chaque changement."""
+    tokens = theme.tokens
+    for label, fg in widgets:
+        label.configure(bg=tokens["primary_bg"], fg=tokens[fg], font=(tokens["current_font"], 10))
+
+
+def timed(root, action, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        action(i)
+        root.update_idletasks() # Inclut le recalcul/affichage déclenché par Tk
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    root = tk.Tk()
+    colors = ("#ff2df2", "#00fff2")
+    print(f"{'widgets':>8} {'parcours complet':>17} {'jeton neon_accent':>18} {'widgets touchés':>16}")
+    for count in args.sizes:
+        theme, frame, widgets = build(hako, root, count)
+
+        def walk(i):
+            theme.tokens["neon_accent"] = colors[i % 2]
+            full_walk(theme, widgets)
+
+        touched = []
+        walk_ms = timed(root, walk, args.repeat)
+        # Chaque itération change réellement le jeton (la première part de la couleur laissée par walk)
+        current = colors.index(theme.tokens["neon_accent"])
+        diff_ms = timed(root, lambda i: touched.append(theme.update(neon_accent=colors[(current + 1 + i) % 2])),
+                        args.repeat)
+        assert min(touched) > 0, "update() sans effet : la mesure porterait sur un changement vide"
+        print(f"{count:>8} {walk_ms:>14.2f} ms {diff_ms:>15.2f} ms {max(touched):>16}")
+        frame.destroy()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Validation des parties firmware (mmap) : durée par partie, débit du XOR de contrôle, détection de corruption.
+
+Usage : python bench/bench_validate.py [--parts 4] [--app-mb 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _hako import load_launcher
+from esp_images import merged_image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parts", type=int, default=4)
+    parser.add_argument("--app-mb", type=int, default=3)
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    directory = tempfile.mkdtemp()
+    parts = []
+    for i in range(args.parts):
+        path = os.path.join(directory, f"part{i}.bin")
+        with open(path, "wb") as f:
+            f.write(merged_image(app_size=args.app_mb * 1024 * 1024))
+        parts.append((path, 0))
+
+    start = time.perf_counter()
+    reports = hako.validate_firmware_parts(parts, "ESP32-S3")
+    total = (time.perf_counter() - start) * 1000
+    assert all(report["ok"] for report in reports), [report["error"] for report in reports]
+    per_part = ", ".join(f"{report['ms']:.1f}" for report in reports)
+    print(f"{len(parts)} parties : {total:7.1f} ms au total   par partie (ms) : {per_part}")
+
+    data = memoryview(os.urandom(16 * 1024 * 1024))
+    start = time.perf_counter()
+    hako.xor_bytes(data, hako.ESP_CHECKSUM_SEED)
+    print(f"xor_bytes : {len(data) / 1e6 / (time.perf_counter() - start):.0f} Mo/s")
+
+    # Corruptions : octet modifié dans l'application, puis fichier tronqué
+    path = parts[0][0]
+    with open(path, "r+b") as f:
+        f.seek(0x20000)
+        byte = f.read(1)
+        f.seek(0x20000)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    report = hako.validate_firmware_part(path, 0, "ESP32-S3")
+    print(f"octet modifié : {report['error']} ({report['ms']:.1f} ms)")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+    report = hako.validate_firmware_part(path, 0, "ESP32-S3")
+    print(f"tronqué       : {report['error']} ({report['ms']:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
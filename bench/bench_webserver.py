@@ -0,0 +1,96 @@
+"""Débit du web-flasher local face à un générateur de charge (connexions keep-alive concurrentes).
+
+Compare au serveur statique de la bibliothèque standard (http.server.SimpleHTTPRequestHandler) :
+pages (gzip), revalidations (304) et image firmware (sendfile).
+
+Usage : python bench/bench_webserver.py [--clients 8] [--seconds 3] [--image-mb 4]
+"""
+import argparse
+import functools
+import http.client
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from _hako import ROOT, load_launcher
+
+
+def load(host, port, path, clients, seconds, headers):
+    """Lance `clients` connexions keep-alive qui répètent GET path ; retourne (requêtes/s, octets/s)."""
+    counts = [0] * clients
+    sizes = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(n):
+        connection = http.client.HTTPConnection(host, port)
+        while time.perf_counter() < deadline:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            sizes[n] += len(response.read())
+            counts[n] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(counts) / elapsed, sum(sizes) / elapsed
+
+
+def etag_of(host, port, path, headers):
+    connection = http.client.HTTPConnection(host, port)
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.getheader("ETag")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--image-mb", type=int, default=4)
+    args = parser.parse_args()
+
+    hako = load_launcher()
+    root = tempfile.mkdtemp()
+    for name in ("index.html", "manifest.json"):
+        shutil.copy(os.path.join(ROOT, name), root)
+    with open(os.path.join(root, "Hako_Sentinel_Full.bin"), "wb") as f:
+        f.write(os.urandom(args.image_mb * 1024 * 1024))
+
+    launcher = hako.WebFlasherServer(port=0, site=hako.StaticSite(root, cache=None))
+    launcher.start()
+    SimpleHTTPRequestHandler.protocol_version = "HTTP/1.1"
+    SimpleHTTPRequestHandler.disable_nagle_algorithm = True # Même réglage TCP : seul le service des fichiers diffère
+    stdlib = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(SimpleHTTPRequestHandler, directory=root))
+    stdlib.daemon_threads = True
+    threading.Thread(target=stdlib.serve_forever, daemon=True).start()
+    SimpleHTTPRequestHandler.log_message = lambda *a: None
+
+    gzip = {"Accept-Encoding": "gzip"}
+    for label, server in (("launcher", launcher.server), ("stdlib", stdlib)):
+        host, port = server.server_address[:2]
+        page_rps, page_bps = load(host, port, "/index.html", args.clients, args.seconds, gzip)
+        etag = etag_of(host, port, "/index.html", gzip)
+        revalidate = "    n/a (pas d'ETag)"
+        if etag:
+            rps, _ = load(host, port, "/index.html", args.clients, args.seconds, dict(gzip, **{"If-None-Match": etag}))
+            revalidate = f"{rps:7.0f} req/s"
+        _, image_bps = load(host, port, "/Hako_Sentinel_Full.bin", args.clients, args.seconds, {})
+        print(f"{label:<9} index.html {page_rps:7.0f} req/s ({page_bps / 1e6:5.1f} Mo/s transférés)   "
+              f"304 {revalidate}   image {image_bps / 1e6:7.1f} Mo/s")
+
+    launcher.stop()
+    stdlib.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Images ESP32 synthétiques (format du bootloader ROM) pour les benchmarks et vérifications."""
+import hashlib
+import os
+import struct
+
+CHIP_ID_ESP32S3 = 9
+
+
+def esp_image(segments, chip_id=CHIP_ID_ESP32S3, entry=0x40380000, hash_appended=True):
+    """Image ESP : segments = [(adresse de chargement, données)], octet de contrôle et SHA-256 optionnel."""
+    header = struct.pack("<BBBBI", 0xE9, len(segments), 2, 0x20, entry)
+    header += struct.pack("<B3sHBHH4sB", 0xEE, b"\0\0\0", chip_id, 0, 0, 0xFFFF, b"\0" * 4, 1 if hash_appended else 0)
+    body = bytearray(header)
+    checksum = 0xEF
+    for address, data in segments:
+        body += struct.pack("<II", address, len(data)) + data
+        for byte in data:
+            checksum ^= byte
+    body += b"\0" * (15 - len(body) % 16)
+    body.append(checksum)
+    if hash_appended:
+        body += hashlib.sha256(body).digest()
+    return bytes(body)
+
+
+def partition_table(entries):
+    """Table de partitions : entries = [(label, type, sous-type, offset, taille)], suivie de l'entrée MD5."""
+    table = b"".join(struct.pack("<2sBBII16sI", b"\xaa\x50", kind, subtype, offset, size, label.encode(), 0)
+                     for label, kind, subtype, offset, size in entries)
+    table += b"\xeb\xeb" + b"\xff" * 14 + hashlib.md5(table).digest()
+    return table + b"\xff" * (0xC00 - len(table))
+
+
+def merged_image(app_size=1024 * 1024, flash_size=None):
+    """Image fusionnée type « _Full.bin » : bootloader @0x0, table @0x8000, application @0x10000."""
+    bootloader = esp_image([(0x3FCD0000, os.urandom(0x3000)), (0x403C8000, os.urandom(0x2000))], hash_appended=False)
+    app = esp_image([(0x3C000020, os.urandom(app_size // 2)), (0x42000020, os.urandom(app_size // 2))])
+    table = partition_table([("nvs", 1, 2, 0x9000, 0x6000), ("phy_init", 1, 1, 0xF000, 0x1000),
+                             ("factory", 0, 0, 0x10000, 0x300000)])
+    image = bytearray(b"\xff" * (0x10000 + len(app)))
+    image[0:len(bootloader)] = bootloader
+    image[0x8000:0x8000 + len(table)] = table
+    image[0x10000:] = app
+    if flash_size:
+        image += b"\xff" * (flash_size - len(image))
+    return bytes(image)
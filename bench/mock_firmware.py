@@ -0,0 +1,149 @@
+"""Site firmware factice (local) : manifests + images .bin servis avec support des requêtes Range.
+
+`rate` limite le débit de chaque connexion (octets/s), comme un CDN qui plafonne par flux ;
+`fail_after` coupe la connexion après ce nombre d'octets envoyés (simulation d'interruption) ;
+`ranges=False` simule un serveur qui ignore l'en-tête Range.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class MockFirmwareHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass # Client parti (annulation, coupure simulée)
+
+    def do_GET(self):
+        self.server.requests += 1
+        data = self.server.files.get(self.path.lstrip("/"))
+        if data is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()[:16]
+        match = RANGE_RE.match(self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and self.server.ranges and (if_range is None or if_range == etag):
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            body = memoryview(data)[start:end + 1]
+        else:
+            self.send_response(200)
+            body = memoryview(data)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        self.send_body(body)
+
+    def send_body(self, body):
+        step = 64 * 1024
+        started = time.perf_counter()
+        for sent in range(0, len(body), step):
+            with self.server.lock:
+                budget = self.server.fail_after
+                if budget is not None:
+                    if budget <= 0:
+                        self.close_connection = True
+                        return
+                    self.server.fail_after = budget - min(step, len(body) - sent)
+            try:
+                self.wfile.write(body[sent:sent + step])
+            except (BrokenPipeError, ConnectionResetError):
+                return # Le client a abandonné la connexion
+            self.server.bytes_sent += min(step, len(body) - sent)
+            if self.server.rate:
+                delay = (sent + step) / self.server.rate - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockFirmwareServer:
+    """Serveur local démarré dans un thread ; utilisable comme context manager."""
+
+    def __init__(self, files, rate=0, fail_after=None, ranges=True, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), MockFirmwareHandler)
+        self.server.daemon_threads = True
+        self.server.files = dict(files)
+        self.server.rate = rate
+        self.server.fail_after = fail_after
+        self.server.ranges = ranges
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.bytes_sent = 0
+        self.thread = None
+
+    @classmethod
+    def with_manifest(cls, parts, name="manifest.json", **kwargs):
+        """Construit un site avec un manifest esp-web-tools listant parts = {chemin: (offset, données)}."""
+        manifest = {"name": "BENCH", "version": "1.0", "builds": [{"chipFamily": "ESP32-S3", "parts": [
+            {"path": path, "offset": offset} for path, (offset, _) in parts.items()]}]}
+        files = {path: data for path, (_, data) in parts.items()}
+        files[name] = json.dumps(manifest).encode("utf-8")
+        return cls(files, **kwargs)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Site firmware factice")
+    parser.add_argument("directory", help="dossier contenant les manifests et les .bin")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--rate", type=int, default=0, help="débit max par connexion (octets/s, 0 = illimité)")
+    args = parser.parse_args()
+
+    files = {}
+    for name in os.listdir(args.directory):
+        path = os.path.join(args.directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                files[name] = f.read()
+    server = MockFirmwareServer(files, rate=args.rate, port=args.port)
+    print(f"Site firmware factice sur {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Worker Cloudflare factice (local) pour les benchmarks du launcher.
+
+Répond comme le Worker de licence : POST {"license", "hwid"} -> {"valid", "license", "hwid", "expire"}.
+`connect_delay` simule le coût d'une nouvelle connexion (DNS + TCP + TLS),
+`latency` le temps de traitement de chaque requête.
+
+Distribution de latence : `latency` multiplié par un facteur log-normal d'écart-type `jitter`, et une
+requête sur `tail_rate` répond en `tail_latency` (latence de queue). Pannes injectées, tirées par requête
+dans cet ordre (taux entre 0 et 1) : `error_rate` -> HTTP `error_status`, `reset_rate` -> connexion
+réinitialisée (RST) sans réponse, `malformed_rate` -> 200 avec un JSON tronqué. Les tirages suivent `seed`.
+"""
+import argparse
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockWorkerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, comme un vrai edge Cloudflare
+    disable_nagle_algorithm = True # Pas de délai d'ACK artificiel entre en-têtes et corps
+
+    def setup(self):
+        super().setup()
+        # Nouvelle connexion : on facture le "handshake" une seule fois
+        time.sleep(self.server.connect_delay)
+        self.server.connections += 1
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+        time.sleep(self.draw_latency())
+        self.server.requests += 1
+
+        fault = self.draw_fault()
+        if fault:
+            self.server.faults[fault] += 1
+        if fault == "error":
+            self.send_json(self.server.error_status, {"error": "Erreur interne simulée."})
+            return
+        if fault == "reset":
+            self.reset_connection()
+            return
+        if fault == "malformed":
+            data = b'{"valid": true, "license": "' # Réponse coupée en plein JSON
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        payload = {
+            "valid": body.get("license") not in self.server.rejected_keys,
+            "license": body.get("license"),
+            "hwid": body.get("hwid"),
+            "expire": "Lifetime",
+        }
+        if not payload["valid"]:
+            payload["error"] = "Clé invalide."
+        self.send_json(200, payload)
+
+    def draw_latency(self):
+        server = self.server
+        with server.rng_lock:
+            if server.tail_rate and server.rng.random() < server.tail_rate:
+                return server.tail_latency
+            return server.latency * (server.rng.lognormvariate(0, server.jitter) if server.jitter else 1)
+
+    def draw_fault(self):
+        server = self.server
+        with server.rng_lock:
+            for fault, rate in (("error", server.error_rate), ("reset", server.reset_rate),
+                                ("malformed", server.malformed_rate)):
+                if rate and server.rng.random() < rate:
+                    return fault
+        return None
+
+    def reset_connection(self):
+        """Ferme la socket avec SO_LINGER à 0 : le client reçoit un RST (« connection reset by peer »)."""
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.close_connection = True
+        self.connection.close()
+
+    def finish(self):
+        try:
+            super().finish()
+        except (OSError, ValueError):
+            pass # Socket déjà fermée par reset_connection
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass # Silencieux pendant les mesures
+
+
+class MockWorker:
+    """Serveur local démarré dans un thread ; utilisable comme context manager."""
+
+    handler_class = MockWorkerHandler
+
+    def __init__(self, latency=0.0, connect_delay=0.0, host="127.0.0.1", port=0, rejected_keys=(),
+                 jitter=0.0, tail_rate=0.0, tail_latency=0.0, error_rate=0.0, error_status=503,
+                 reset_rate=0.0, malformed_rate=0.0, seed=None):
+        self.server = ThreadingHTTPServer((host, port), self.handler_class)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.connect_delay = connect_delay
+        self.server.rejected_keys = set(rejected_keys)
+        self.server.connections = 0
+        self.server.requests = 0
+        self.server.faults = Counter()
+        self.server.rng = random.Random(seed)
+        self.server.rng_lock = threading.Lock()
+        self.configure(jitter=jitter, tail_rate=tail_rate, tail_latency=tail_latency, error_rate=error_rate,
+                       error_status=error_status, reset_rate=reset_rate, malformed_rate=malformed_rate)
+        self.thread = None
+
+    def configure(self, **settings):
+        """Change la latence ou les taux de pannes en cours de route (attributs du serveur)."""
+        for name, value in settings.items():
+            setattr(self.server, name, value)
+        return self
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de licence factice")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="secondes par requête")
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="secondes par nouvelle connexion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="écart-type log-normal de la latence")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="part des requêtes en latence de queue")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="secondes d'une latence de queue")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part des réponses HTTP --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="part des connexions réinitialisées")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="part des réponses au JSON tronqué")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    worker = MockWorker(latency=args.latency, connect_delay=args.connect_delay, port=args.port, jitter=args.jitter,
+                        tail_rate=args.tail_rate, tail_latency=args.tail_latency, error_rate=args.error_rate,
+                        error_status=args.error_status, reset_rate=args.reset_rate,
+                        malformed_rate=args.malformed_rate, seed=args.seed)
+    print(f"Mock Worker sur {worker.url}")
+    try:
+        worker.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Bootloader ROM ESP32-S3 simulé sur un pseudo-terminal : SYNC, READ/WRITE_REG, CHANGE_BAUDRATE, FLASH_DEFL_*, MD5.
+
+Le temps de transfert sur le fil est simulé (10 bits par octet à la vitesse courante), ainsi que l'effacement
+et l'écriture de la flash : un bloc peut transiter pendant que le précédent s'écrit, comme sur une vraie liaison.
+Au-delà de `max_baud` la liaison est « brouillée » : plus aucune trame n'est reçue jusqu'au prochain reset().
+"""
+import hashlib
+import os
+import queue
+import struct
+import threading
+import time
+import tty
+import zlib
+
+ROM_BAUD = 115200
+CHIP_MAGIC_ESP32S3 = 0x00000009
+EFUSE_MAC_REG = 0x60007044
+SPI1_BASE = 0x60002000
+SPI_CMD_USR = 1 << 18
+
+
+def slip_frames(buffer):
+    """Extrait les trames SLIP complètes de buffer (bytearray modifié sur place)."""
+    frames = []
+    while True:
+        start = buffer.find(b"\xc0")
+        end = buffer.find(b"\xc0", start + 1) if start >= 0 else -1
+        if end < 0:
+            return frames
+        raw = bytes(buffer[start + 1:end])
+        del buffer[:end]
+        if raw:
+            frames.append(raw.replace(b"\xdb\xdc", b"\xc0").replace(b"\xdb\xdd", b"\xdb"))
+
+
+class StubBootloader:
+    """Côté cible d'une paire pty ; `port_fd` est l'extrémité à passer au launcher (FdTransport)."""
+
+    def __init__(self, flash_size=16 * 1024 * 1024, max_baud=2000000, chip_magic=CHIP_MAGIC_ESP32S3,
+                 write_rate=400 * 1024, erase_rate=4 * 1024 * 1024, mac="f4:12:fa:00:00:01"):
+        self.flash = bytearray(b"\xff" * flash_size)
+        mac = bytes.fromhex(mac.replace(":", ""))
+        self.registers = {EFUSE_MAC_REG: int.from_bytes(mac[2:], "big"), EFUSE_MAC_REG + 4: int.from_bytes(mac[:2], "big")}
+        self.jedec_id = 0xEF | 0x40 << 8 | (flash_size.bit_length() - 1) << 16 # Winbond, capacité = log2(taille)
+        self.max_baud = max_baud
+        self.chip_magic = chip_magic
+        self.write_rate = write_rate
+        self.erase_rate = erase_rate
+        self.baud = ROM_BAUD
+        self.garbled = False
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.bytes_written = 0
+        self.erased = 0
+        self._inflate = None
+        self._pending_baud = None
+        self._frames = queue.Queue()
+        self._stop = threading.Event()
+        self.target_fd, self.port_fd = os.openpty()
+        tty.setraw(self.target_fd)
+        tty.setraw(self.port_fd)
+        self._threads = [threading.Thread(target=self._receive, daemon=True),
+                         threading.Thread(target=self._process, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def reset(self):
+        """Équivalent du reset DTR/RTS : retour au bootloader à ROM_BAUD."""
+        self.baud = ROM_BAUD
+        self.garbled = False
+        self._inflate = None
+
+    def close(self):
+        self._stop.set()
+        self._frames.put(None)
+        for thread in self._threads:
+            thread.join(1)
+        for fd in (self.target_fd, self.port_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def wire_time(self, size):
+        return size * 10 / self.baud
+
+    def _receive(self):
+        """Décode les trames et leur donne une heure d'arrivée (le fil ne transporte qu'une trame à la fois)."""
+        import select
+        buffer = bytearray()
+        line_free_at = 0.0
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self.target_fd], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self.target_fd, 65536)
+            except OSError:
+                return
+            buffer += chunk
+            for frame in slip_frames(buffer):
+                arrival = max(time.perf_counter(), line_free_at) + self.wire_time(len(frame) + 2)
+                line_free_at = arrival
+                self._frames.put((arrival, frame))
+
+    def _process(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            arrival, frame = item
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.garbled or len(frame) < 8 or frame[0] != 0:
+                continue
+            self.frames_received += 1
+            self.bytes_received += len(frame)
+            op, size, checksum = struct.unpack_from("<xBHI", frame)
+            self._handle(op, frame[8:8 + size], checksum)
+
+    def _reply(self, op, value=0, data=b"", error=0):
+        body = data + bytes([1 if error else 0, error, 0, 0])
+        packet = struct.pack("<BBHI", 1, op, len(body), value) + body
+        os.write(self.target_fd, b"\xc0" + packet.replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc") + b"\xc0")
+        if self._pending_baud: # La réponse part à l'ancienne vitesse, puis l'UART change
+            self.baud, self._pending_baud = self._pending_baud, None
+            self.garbled = self.baud > self.max_baud
+
+    def _handle(self, op, data, checksum):
+        if op == 0x08:
+            for _ in range(2): # Le ROM répond plusieurs fois au SYNC
+                self._reply(op)
+        elif op == 0x0A:
+            address, = struct.unpack_from("<I", data)
+            self._reply(op, self.chip_magic if address == 0x40001000 else self.registers.get(address, 0))
+        elif op == 0x09:
+            address, value, mask, _ = struct.unpack_from("<IIII", data)
+            self.registers[address] = value & mask
+            if address == SPI1_BASE and value & SPI_CMD_USR: # Commande SPI utilisateur : RDID seul est simulé
+                self.registers[SPI1_BASE + 0x58] = self.jedec_id
+                self.registers[SPI1_BASE] = 0
+            self._reply(op)
+        elif op == 0x0F:
+            self._pending_baud, _ = struct.unpack_from("<II", data)
+            self._reply(op)
+        elif op in (0x0B, 0x0D):
+            self._reply(op)
+        elif op == 0x10:
+            erase_size, _, _, offset, _ = struct.unpack_from("<IIIII", data)
+            if offset + erase_size > len(self.flash):
+                self._reply(op, error=0x06)
+                return
+            self.flash[offset:offset + erase_size] = b"\xff" * erase_size
+            self.erased += erase_size
+            time.sleep(erase_size / self.erase_rate)
+            self._inflate, self._write_at = zlib.decompressobj(), offset
+            self._reply(op)
+        elif op == 0x11:
+            block = data[16:]
+            value = 0xEF
+            for byte in block:
+                value ^= byte
+            if self._inflate is None or value != checksum:
+                self._reply(op, error=0x07)
+                return
+            out = self._inflate.decompress(block)
+            self.flash[self._write_at:self._write_at + len(out)] = out
+            self._write_at += len(out)
+            self.bytes_written += len(out)
+            time.sleep(len(out) / self.write_rate)
+            self._reply(op)
+        elif op == 0x12:
+            self._inflate = None
+            self._reply(op)
+        elif op == 0x13:
+            offset, size = struct.unpack_from("<II", data)
+            self._reply(op, data=hashlib.md5(self.flash[offset:offset + size]).hexdigest().encode())
+        else:
+            self._reply(op, error=0x05)
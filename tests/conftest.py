@@ -0,0 +1,34 @@
+"""Fixtures communes : le launcher chargé comme module, avec un dossier de données temporaire."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+
+@pytest.fixture(scope="session")
+def hako(tmp_path_factory):
+    # Avant l'import : les chemins de données du launcher en dépendent
+    os.environ["HAKO_DATA_DIR"] = str(tmp_path_factory.mktemp("hako-data"))
+    from _hako import load_launcher
+    return load_launcher()
+
+
+@pytest.fixture
+def metrics(hako, tmp_path, monkeypatch):
+    """METRICS neuf, exporté dans tmp_path ; records() relit l'export."""
+    fresh = hako.Metrics(path=str(tmp_path / "metrics.jsonl"))
+    monkeypatch.setattr(hako, "METRICS", fresh)
+
+    def records(name=None):
+        import json
+        fresh.flush()
+        if not os.path.exists(fresh.path):
+            return []
+        with open(fresh.path, encoding="utf-8") as f:
+            return [entry for entry in map(json.loads, f) if name is None or entry["name"] == name]
+
+    fresh.records = records
+    return fresh
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from _hako import LAUNCHER_PATH
+from mock_worker import MockWorker
+
+# Le launcher est exécuté comme script (python HAKO-PRO-2026.py <commande>) ; stderr rapporte si Tk a été chargé
+CHILD = """
+import runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    print("tkinter" in sys.modules, file=sys.stderr)
+"""
+
+
+def run_cli(tmp_path, *argv, worker_url="http://127.0.0.1:9/"):
+    env = dict(os.environ, HAKO_DATA_DIR=str(tmp_path), HAKO_WORKER_URLS=worker_url)
+    proc = subprocess.run([sys.executable, "-c", CHILD, LAUNCHER_PATH, *argv], env=env, cwd=str(tmp_path),
+                          capture_output=True, text=True, timeout=60)
+    assert proc.stderr.strip().splitlines()[-1] == "False" # tkinter jamais importé
+    output = proc.stdout.strip()
+    return proc.returncode, json.loads(output) if output else None
+
+
+def test_status_without_license(tmp_path):
+    assert run_cli(tmp_path, "status") == (1, {"state": "none"})
+
+
+def test_usage_error(tmp_path):
+    code, output = run_cli(tmp_path, "status", "--unknown")
+    assert (code, output) == (2, None)
+
+
+def test_activate_then_status_from_lease(tmp_path):
+    pytest.importorskip("requests")
+    with MockWorker(rejected_keys={"HAKO-BAD"}) as worker:
+        assert run_cli(tmp_path, "activate", "HAKO-BAD", worker_url=worker.url) == \
+            (1, {"state": "invalid", "error": "Clé invalide."})
+        code, output = run_cli(tmp_path, "activate", "HAKO-GOOD-KEY", worker_url=worker.url)
+        assert code == 0 and output["state"] == "active" and output["source"] == "worker"
+        requests = worker.server.requests
+    # Bail valide : réponse sans réseau (le Worker est arrêté)
+    code, output = run_cli(tmp_path, "status")
+    assert code == 0 and output["source"] == "lease" and requests == 2
+    with open(tmp_path / "hako_metrics.jsonl", encoding="utf-8") as f:
+        assert any(json.loads(line)["name"] == "worker.check" for line in f)
+
+
+def test_activate_with_unreachable_worker(tmp_path):
+    pytest.importorskip("requests")
+    code, output = run_cli(tmp_path, "activate", "HAKO-GOOD-KEY")
+    assert code == 3 and output["state"] == "unverified"
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import random
+
+import pytest
+
+from esp_images import esp_image
+from mock_firmware import MockFirmwareServer
+
+BLOCK = 1024
+RNG = random.Random(2026)
+OLD = RNG.randbytes(64 * BLOCK + 300) # Dernier bloc incomplet
+EDITS = {
+    "shifted": b"\x00" * 100 + OLD,
+    "inserted": OLD[:30000] + RNG.randbytes(500) + OLD[30000:],
+    "truncated": OLD[:-1500],
+    "patched": OLD[:8192] + b"HAKO v1.3" + OLD[8201:],
+}
+
+
+@pytest.fixture(autouse=True)
+def needs_requests():
+    pytest.importorskip("requests")
+
+
+def index_for(hako, tmp_path, data, name="new.bin"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    hako.write_block_index(str(path), BLOCK)
+    return json.loads((tmp_path / (name + ".blocks.json")).read_bytes())
+
+
+@pytest.mark.parametrize("edit", sorted(EDITS))
+def test_delta_rebuilds_identical_image(hako, tmp_path, edit):
+    new = EDITS[edit]
+    old_path = tmp_path / "old.bin"
+    old_path.write_bytes(OLD)
+    index = index_for(hako, tmp_path, new)
+    sources = hako.plan_delta(OLD, index)
+    assert sum(source is not None for source in sources) >= len(sources) - 3 # Seuls les blocs touchés manquent
+
+    dest = tmp_path / "rebuilt.bin"
+    with MockFirmwareServer({"app.bin": new}) as server:
+        result = hako.DeltaDownloader(server.url + "app.bin", str(dest), str(old_path), index).run()
+    assert dest.read_bytes() == new
+    assert result["sha256"] == hashlib.sha256(new).hexdigest()
+    assert result["downloaded_bytes"] + result["reused_bytes"] == len(new)
+    assert result["downloaded_bytes"] <= 3 * BLOCK
+
+
+def test_stale_block_index_falls_back_to_full_download(hako, tmp_path, capsys):
+    old = esp_image([(0x42000020, OLD)])
+    new = esp_image([(0x42000020, EDITS["inserted"])])
+    cache = hako.FirmwareCache(str(tmp_path / "cache"))
+    (tmp_path / "old.bin").write_bytes(old)
+    cache.store("manifest.json", "0.9", "app.bin", str(tmp_path / "old.bin"), hashlib.sha256(old).hexdigest())
+    # Index publié pour une autre image que celle servie : la reconstruction ne vérifie pas son SHA-256
+    stale = index_for(hako, tmp_path, esp_image([(0x42000020, EDITS["patched"])]), "stale.bin")
+
+    server = MockFirmwareServer.with_manifest({"app.bin": (0x10000, new)})
+    server.server.files["app.bin.blocks.json"] = json.dumps(stale).encode()
+    with server:
+        download = hako.FirmwareDownload("manifest.json", server.url, str(tmp_path / "dl"), cache=cache)
+        download._run()
+
+    assert download.error is None
+    assert "Mise à jour différentielle abandonnée" in capsys.readouterr().out
+    result, = download.result
+    assert result["sha256"] == hashlib.sha256(new).hexdigest()
+    assert "downloaded_bytes" not in result # Téléchargement complet (ChunkedDownloader), pas de delta
+    with open(result["path"], "rb") as f:
+        assert f.read() == new
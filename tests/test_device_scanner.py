@@ -0,0 +1,31 @@
+import os
+import tty
+
+
+def test_unopenable_port_is_retried_and_silent_port_is_cached(hako, tmp_path):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    ports = [{"device": "/dev/ttyACM9", "vid": 0x303A, "pid": 0x1001, "serial": "HAKO0000"},
+             {"device": os.ttyname(slave), "vid": None, "pid": None, "serial": None}]
+    denied = {ports[0]["device"]}
+    opened = []
+
+    def opener(device):
+        opened.append(device)
+        if device in denied:
+            raise PermissionError(13, "Permission denied", device) # Utilisateur hors du groupe dialout
+        return hako.FdTransport(os.open(device, os.O_RDWR | os.O_NOCTTY))
+
+    path = str(tmp_path / "devices.json")
+    try:
+        assert hako.DeviceScanner(path, lister=lambda: ports, opener=opener).scan() == []
+        relaunched = hako.DeviceScanner(path, lister=lambda: ports, opener=opener)
+        assert set(relaunched.devices) == {ports[1]["device"]} # Port muet : mémorisé sans puce
+        assert relaunched.devices[ports[1]["device"]]["chip"] is None
+
+        opened.clear()
+        relaunched.scan()
+        assert opened == [ports[0]["device"]] # Seul le port refusé est sondé à nouveau
+    finally:
+        os.close(master)
+        os.close(slave)
@@ -0,0 +1,71 @@
+import hashlib
+import os
+
+import pytest
+
+from mock_firmware import MockFirmwareServer
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+def image():
+    data = os.urandom(16 * CHUNK)
+    return data, hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def needs_requests():
+    pytest.importorskip("requests")
+
+
+def test_interrupted_download_resumes(hako, image, tmp_path, monkeypatch):
+    data, expected = image
+    dest = str(tmp_path / "image.bin")
+    monkeypatch.setattr(hako, "DOWNLOAD_RETRIES", 0)
+    with MockFirmwareServer({"image.bin": data}, fail_after=len(data) // 2) as server:
+        url = server.url + "image.bin"
+        with pytest.raises(Exception):
+            hako.ChunkedDownloader(url, dest, connections=2, chunk_size=CHUNK).run()
+        assert not os.path.exists(dest)
+        assert os.path.exists(dest + ".part") and os.path.exists(dest + ".part.json")
+
+        server.server.fail_after = None
+        sent_before = server.server.bytes_sent
+        result = hako.ChunkedDownloader(url, dest, connections=2, chunk_size=CHUNK,
+                                        expected_sha256=expected).run()
+        resent = server.server.bytes_sent - sent_before
+
+    assert result["sha256"] == expected and result["resumed_bytes"] > 0
+    # Les blocs conservés ne sont pas retéléchargés (resent peut compter la fin d'un bloc de la
+    # première tentative, encore en cours d'envoi côté serveur au moment de la coupure)
+    assert resent <= len(data) - result["resumed_bytes"] + 1 + CHUNK
+    assert resent < len(data)
+    with open(dest, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(dest + ".part") and not os.path.exists(dest + ".part.json")
+
+
+def test_server_without_range_downloads_whole_file(hako, image, tmp_path):
+    data, expected = image
+    dest = str(tmp_path / "image.bin")
+    with MockFirmwareServer({"image.bin": data}, ranges=False) as server:
+        result = hako.ChunkedDownloader(server.url + "image.bin", dest, connections=4, chunk_size=CHUNK,
+                                        expected_sha256=expected).run()
+        requests_made = server.server.requests
+
+    assert requests_made == 2 # Sonde, puis le fichier d'un seul tenant
+    assert result["sha256"] == expected and result["size"] == len(data) and result["resumed_bytes"] == 0
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+
+def test_hash_mismatch_discards_download(hako, image, tmp_path):
+    data, _ = image
+    dest = str(tmp_path / "image.bin")
+    with MockFirmwareServer({"image.bin": data}) as server:
+        with pytest.raises(hako.DownloadError, match="SHA-256"):
+            hako.ChunkedDownloader(server.url + "image.bin", dest, connections=2, chunk_size=CHUNK,
+                                   expected_sha256="0" * 64).run()
+    # Rien n'est gardé : ni l'image, ni de quoi "reprendre" un contenu faux
+    assert not any(os.path.exists(path) for path in (dest, dest + ".part", dest + ".part.json"))
@@ -0,0 +1,25 @@
+import hashlib
+import json
+import time
+
+
+def test_hit_updates_last_used_without_writing_the_index(hako, tmp_path, monkeypatch):
+    cache = hako.FirmwareCache(str(tmp_path / "cache"))
+    data = b"firmware" * 1000
+    download = tmp_path / "app.bin"
+    download.write_bytes(data)
+    sha256 = hashlib.sha256(data).hexdigest()
+    cache.store("HAKO", "1.0", "app.bin", str(download), sha256)
+    with open(cache.index_path) as f:
+        stored_at = json.load(f)["objects"][sha256]["last_used"]
+    time.sleep(0.02) # Horloge grossière (Windows) : l'accès doit avoir une date distincte
+
+    writes = []
+    monkeypatch.setattr(hako, "atomic_write", lambda path, payload: writes.append(payload))
+    assert cache.lookup("HAKO", "1.0", "app.bin") == cache.object_path(sha256)
+    assert writes == [] and cache.hits == 1
+    monkeypatch.undo()
+
+    cache.flush()
+    with open(cache.index_path) as f:
+        assert json.load(f)["objects"][sha256]["last_used"] > stored_at
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+
+import pytest
+
+from esp_images import merged_image
+from stub_bootloader import StubBootloader
+
+
+class DroppedPort:
+    """Port débranché : toute écriture échoue."""
+
+    def write(self, data):
+        raise ConnectionError("Port série fermé")
+
+
+def deflate_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "hako-flash-deflate"]
+
+
+def test_write_failure_stops_the_compressor(hako):
+    regions = [(i * 0x10000, os.urandom(0x10000), 0x10000) for i in range(4)]
+    with pytest.raises(ConnectionError):
+        hako.EspLoader(DroppedPort()).flash_deflate(regions)
+    deadline = time.monotonic() + 2
+    while deflate_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert deflate_threads() == []
+
+
+def test_compression_error_reaches_the_writer(hako):
+    with pytest.raises(TypeError):
+        hako.EspLoader(DroppedPort()).flash_deflate([(0, "pas des octets", 0x1000)])
+
+
+def test_flash_parts_against_stub_bootloader(hako, tmp_path):
+    image = merged_image(app_size=64 * 1024)
+    path = tmp_path / "full.bin"
+    path.write_bytes(image)
+    progress = []
+    with StubBootloader(flash_size=4 * 1024 * 1024, max_baud=921600) as stub:
+        transport = hako.FdTransport(stub.port_fd, reset=stub.reset)
+        result = hako.flash_parts(transport, [(0, str(path))], "ESP32-S3", lambda done, total: progress.append(done))
+        assert bytes(stub.flash[:len(image)]) == image
+    assert result["chip"] == "ESP32-S3" and result["baud"] == 921600 # Vitesse la plus haute tenue par la liaison
+    assert result["flash_size"] == 4 * 1024 * 1024
+    assert progress[-1] == sum(len(data) for _, data, _ in hako.flash_regions([(0, str(path))]))
+
+
+def test_image_larger_than_the_board_flash_is_refused(hako, tmp_path):
+    path = tmp_path / "big.bin"
+    path.write_bytes(os.urandom(0x180000))
+    with StubBootloader(flash_size=1024 * 1024) as stub:
+        transport = hako.FdTransport(stub.port_fd, reset=stub.reset)
+        with pytest.raises(hako.FlashError, match="dépasse la flash"):
+            hako.flash_parts(transport, [(0, str(path))], "ESP32-S3")
+        assert stub.bytes_written == 0
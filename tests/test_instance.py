@@ -0,0 +1,28 @@
+import queue
+
+
+def test_second_launch_forwards_argv_to_the_primary(hako, tmp_path):
+    primary = hako.InstanceGuard(str(tmp_path))
+    assert primary.acquire()
+    received = queue.Queue()
+    primary.serve(received.put)
+    try:
+        second = hako.InstanceGuard(str(tmp_path))
+        assert not second.acquire()
+        assert second.forward(["manifest.json"])
+        assert received.get(timeout=1) == ["manifest.json"]
+    finally:
+        primary.close()
+
+    relaunched = hako.InstanceGuard(str(tmp_path)) # Verrou libéré : le lancement suivant devient principal
+    assert relaunched.acquire()
+    relaunched.close()
+
+
+def test_forward_gives_up_when_the_primary_does_not_answer(hako, tmp_path):
+    primary = hako.InstanceGuard(str(tmp_path))
+    assert primary.acquire() # Verrou tenu, mais le canal n'est jamais servi
+    try:
+        assert not hako.InstanceGuard(str(tmp_path)).forward(["manifest.json"], timeout=0.3)
+    finally:
+        primary.close()
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from mock_worker import MockWorker
+
+KEY = "HAKO-LEASE-KEY"
+T0 = 1_800_000_000.0 # Horloge injectée : instant de la dernière validation
+HOUR = 3600
+
+
+@pytest.fixture
+def store(hako, tmp_path, monkeypatch):
+    store = hako.LicenseStore(str(tmp_path / "license.dat"))
+    monkeypatch.setattr(hako, "LICENSE_STORE", store)
+    monkeypatch.setattr(hako, "LEGACY_LICENSE_FILE", str(tmp_path / "legacy.dat"))
+    monkeypatch.setattr(hako, "LEGACY_LEASE_FILE", str(tmp_path / "legacy.lease"))
+    return store
+
+
+def validated(hako, now=T0, expire="Lifetime"):
+    data = {"license": KEY, "hwid": hako.get_hwid(), "expire": expire}
+    return hako.revalidate_lease(KEY, (True, "activated", data), now)
+
+
+def revalidate_in_background(hako, now):
+    """Revalidation par le thread réseau, comme l'interface : le résultat est appliqué à la livraison."""
+    network = hako.NetworkWorker()
+    network.start()
+    outcome = []
+    network.verify_key(KEY, lambda result: outcome.append(hako.revalidate_lease(KEY, result, now)))
+    deadline = time.monotonic() + 5
+    while not outcome and time.monotonic() < deadline:
+        network.deliver()
+        time.sleep(0.01)
+    return outcome[0]
+
+
+def test_fresh_lease_served_without_network(hako, store):
+    state, lease = validated(hako)
+    assert state == "active" and lease["validated_at"] == T0
+    now = T0 + HOUR
+    assert hako.load_license_lease(KEY, now) == lease
+    assert now < hako.lease_next_check(lease) # Pas encore de revalidation
+
+
+def test_stale_lease_served_then_revalidated_in_background(hako, store, monkeypatch):
+    pytest.importorskip("requests")
+    _, lease = validated(hako)
+    now = T0 + hako.LEASE_TTL_S + HOUR
+    assert hako.load_license_lease(KEY, now) == lease # Périmé mais encore servi...
+    assert now >= hako.lease_next_check(lease)        # ...et la revalidation est due
+
+    with MockWorker() as worker:
+        monkeypatch.setattr(hako, "WORKER_ENDPOINTS", hako.WorkerEndpoints([worker.url]))
+        state, renewed = revalidate_in_background(hako, now)
+    assert state == "active" and renewed["validated_at"] == now
+    assert hako.load_license_lease(KEY, now) == renewed
+    assert hako.lease_next_check(renewed) == now + hako.LEASE_TTL_S
+
+
+def test_offline_use_refused_past_max_age(hako, store):
+    validated(hako)
+    network_error = (False, "Erreur de connexion réseau", None)
+    within = T0 + hako.LEASE_MAX_AGE_S - HOUR
+    assert hako.revalidate_lease(KEY, network_error, within)[0] == "offline"
+    past = T0 + hako.LEASE_MAX_AGE_S + HOUR
+    assert hako.load_license_lease(KEY, past) is None
+    assert hako.revalidate_lease(KEY, network_error, past) == ("expired", None)
+    assert hako.load_license_data()["license"] == KEY # Clé conservée : simple absence de réseau
+
+
+def test_lease_ends_at_license_expiry(hako, store):
+    _, lease = validated(hako, expire=T0 + 2 * HOUR)
+    assert hako.lease_next_check(lease) == T0 + 2 * HOUR
+    assert hako.load_license_lease(KEY, T0 + HOUR) == lease
+    assert hako.load_license_lease(KEY, T0 + 3 * HOUR) is None
+
+
+def test_clock_moved_back_is_not_trusted(hako, store):
+    validated(hako)
+    assert hako.load_license_lease(KEY, T0 - HOUR) is None
+
+
+def test_worker_revokes_key_during_revalidation(hako, store, monkeypatch):
+    pytest.importorskip("requests")
+    validated(hako)
+    now = T0 + hako.LEASE_TTL_S + HOUR
+    with MockWorker(rejected_keys={KEY}) as worker:
+        monkeypatch.setattr(hako, "WORKER_ENDPOINTS", hako.WorkerEndpoints([worker.url]))
+        assert revalidate_in_background(hako, now) == ("revoked", None)
+    assert hako.load_license_data() is None and hako.load_license_lease(KEY, now) is None
@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+import pytest
+
+LICENSE = {"license": "HAKO-AAAA-BBBB", "hwid": "hw", "expire": "Lifetime"}
+
+
+@pytest.fixture
+def store_path(hako, tmp_path, monkeypatch):
+    # Anciens fichiers cherchés dans tmp_path, jamais dans le dossier courant du test
+    monkeypatch.setattr(hako, "LEGACY_LICENSE_FILE", str(tmp_path / "license.dat"))
+    monkeypatch.setattr(hako, "LEGACY_LEASE_FILE", str(tmp_path / "license.lease"))
+    return str(tmp_path / "license.hako")
+
+
+def written(hako, path, *records):
+    """Enregistre les records dans l'ordre : le fichier principal contient le dernier, .bak l'avant-dernier."""
+    store = hako.LicenseStore(path)
+    for record in records:
+        assert store.update(**record)
+    return store
+
+
+@pytest.mark.parametrize("damage", [
+    lambda raw: raw[:len(raw) // 2],                      # Tronqué pendant l'écriture
+    lambda raw: raw[:-2] + bytes([raw[-2] ^ 1]) + raw[-1:], # Un octet du contenu modifié : somme de contrôle fausse
+])
+def test_damaged_file_falls_back_to_backup(hako, store_path, damage):
+    written(hako, store_path, {"license": dict(LICENSE, expire="2026-01-01")}, {"license": LICENSE})
+    with open(store_path, "rb") as f:
+        raw = f.read()
+    with open(store_path, "wb") as f:
+        f.write(damage(raw))
+
+    assert hako.LicenseStore(store_path).load() == {"license": dict(LICENSE, expire="2026-01-01")}
+    # Le fichier principal est réparé depuis la copie de secours
+    assert hako.LicenseStore(store_path)._read(store_path) == {"license": dict(LICENSE, expire="2026-01-01")}
+
+
+@pytest.mark.parametrize("header", [b"HAKOLIC 2", b"HAKOLIX 1", b"HAKOLIC"])
+def test_unknown_header_or_version_is_rejected(hako, store_path, header):
+    body = json.dumps({"license": LICENSE}).encode()
+    raw = header + b" " + hashlib.sha256(body).hexdigest().encode() + b"\n" + body
+    assert hako.LicenseStore(store_path)._decode(raw) is None
+    with open(store_path, "wb") as f:
+        f.write(raw)
+    assert hako.LicenseStore(store_path).load() == {}
+
+
+def test_legacy_files_migrated_then_removed(hako, store_path, tmp_path):
+    legacy_license, legacy_lease = tmp_path / "license.dat", tmp_path / "license.lease"
+    legacy_license.write_text(json.dumps(LICENSE))
+    legacy_lease.write_text(json.dumps({"validated_at": 1}))
+
+    store = hako.LicenseStore(store_path)
+    assert store.load() == {"license": LICENSE, "lease": {"validated_at": 1}}
+    assert not legacy_license.exists() and not legacy_lease.exists()
+    assert store.clear()
+    assert hako.LicenseStore(store_path).load() == {} # Rien ne ressuscite après clear()
+
+
+def test_atomic_write_keeps_old_file_when_rename_never_happens(hako, tmp_path, monkeypatch):
+    path = tmp_path / "license.hako"
+    path.write_bytes(b"old")
+
+    def crash(src, dst):
+        raise OSError("coupure avant le renommage")
+
+    monkeypatch.setattr(hako.os, "replace", crash)
+    with pytest.raises(OSError):
+        hako.atomic_write(str(path), b"new")
+    monkeypatch.undo()
+    assert path.read_bytes() == b"old"
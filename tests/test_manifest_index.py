@@ -0,0 +1,78 @@
+import json
+import os
+import time
+
+import pytest
+
+HOUR_NS = 3600 * 10**9
+
+
+def manifest(version):
+    return json.dumps({"name": "HAKO", "version": version, "builds": [
+        {"chipFamily": "ESP32-S3", "parts": [{"path": "app.bin", "offset": 0x10000}]}]})
+
+
+@pytest.fixture
+def index(hako, tmp_path):
+    return hako.ManifestIndex(str(tmp_path))
+
+
+@pytest.fixture
+def reads(hako, monkeypatch):
+    """Fichiers ouverts par le module (le cache évite les lectures, pas seulement les parsings)."""
+    opened = []
+
+    def counting_open(path, *args, **kwargs):
+        opened.append(os.path.basename(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(hako, "open", counting_open, raising=False)
+    return opened
+
+
+def write(path, text, mtime_ns):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_unchanged_file_is_neither_read_nor_parsed(index, tmp_path, reads):
+    old = time.time_ns() - HOUR_NS
+    write(tmp_path / "manifest.json", manifest("1.0"), old)
+    assert index.refresh() == 1
+    del reads[:]
+    assert index.refresh() == 0 and reads == []
+    assert index.get("manifest.json")["version"] == "1.0"
+
+
+def test_touched_file_is_reread_but_not_reparsed(index, tmp_path, reads):
+    old = time.time_ns() - HOUR_NS
+    write(tmp_path / "manifest.json", manifest("1.0"), old)
+    index.refresh()
+    os.utime(tmp_path / "manifest.json", ns=(old + 10**9, old + 10**9))
+    del reads[:]
+    assert index.refresh() == 0 and reads == ["manifest.json"] # Contenu haché : identique
+
+
+def test_content_change_is_reparsed(index, tmp_path):
+    old = time.time_ns() - HOUR_NS
+    write(tmp_path / "manifest.json", manifest("1.0"), old)
+    index.refresh()
+    write(tmp_path / "manifest.json", manifest("1.10"), old + 10**9) # Taille différente
+    assert index.refresh() == 1 and index.get("manifest.json")["version"] == "1.10"
+
+
+def test_content_change_under_same_mtime_and_size(index, tmp_path):
+    old = time.time_ns() - HOUR_NS
+    write(tmp_path / "manifest.json", manifest("1.2"), old)
+    index.refresh()
+    # Même taille, mtime remis à l'identique : seuls ctime (et le contenu) trahissent l'écriture
+    write(tmp_path / "manifest.json", manifest("1.3"), old)
+    assert index.refresh() == 1 and index.get("manifest.json")["version"] == "1.3"
+
+
+def test_recently_written_file_is_reread(index, tmp_path, reads):
+    write(tmp_path / "manifest.json", manifest("1.0"), time.time_ns())
+    index.refresh()
+    del reads[:]
+    # Lu juste après son écriture : une réécriture dans la même tranche de date passerait inaperçue
+    assert index.refresh() == 0 and reads == ["manifest.json"]
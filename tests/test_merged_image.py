@@ -0,0 +1,40 @@
+import os
+
+
+def write_parts(tmp_path, layout):
+    parts = []
+    for offset, data in layout:
+        path = tmp_path / f"part_{offset:06x}.bin"
+        path.write_bytes(data)
+        parts.append((offset, str(path)))
+    return parts
+
+
+LAYOUT = [(0x0, os.urandom(0x1234)), (0x8000, os.urandom(0x100)), (0x23000, os.urandom(0x2001))]
+
+
+def test_full_image_fills_gaps_with_erased_flash(hako, tmp_path):
+    out = str(tmp_path / "full.bin")
+    result = hako.build_merged_image(write_parts(tmp_path, LAYOUT), out, flash_size=0x40000)
+    with open(out, "rb") as f:
+        image = f.read()
+    assert len(image) == 0x40000
+    assert image[0x1234:0x8000] == b"\xff" * (0x8000 - 0x1234)
+    for offset, data in LAYOUT:
+        assert image[offset:offset + len(data)] == data
+    assert result["data_sectors"] == [[0, 2], [8, 1], [0x23, 3]]
+
+
+def test_sparse_image_reads_back_through_block_map(hako, tmp_path):
+    parts = write_parts(tmp_path, LAYOUT)
+    full, sparse = str(tmp_path / "full.bin"), str(tmp_path / "sparse.bin")
+    hako.build_merged_image(parts, full, flash_size=0x40000)
+    hako.build_merged_image(parts, sparse, flash_size=0x40000, sparse=True)
+    with open(sparse, "rb") as f:
+        raw = f.read()
+    # Fin de secteur partagée avec une partie : effacée, même en mode creux
+    assert raw[0x1234:0x2000] == b"\xff" * (0x2000 - 0x1234)
+    with open(full, "rb") as f:
+        assert b"".join(data for _, data in hako.iter_image(sparse)) == f.read()
+    assert b"".join(data for _, data in hako.iter_data_sectors(sparse)) == \
+        b"".join(data for _, data in hako.iter_data_sectors(full))
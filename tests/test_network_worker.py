@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+from mock_worker import MockWorker
+
+
+def test_verify_key_coalesces_same_key(hako, monkeypatch):
+    pytest.importorskip("requests")
+    with MockWorker(latency=0.3) as worker:
+        monkeypatch.setattr(hako, "WORKER_ENDPOINTS", hako.WorkerEndpoints([worker.url]))
+        network = hako.NetworkWorker()
+        network.start()
+        results = []
+        assert network.verify_key("HAKO-COALESCE", lambda result: results.append(("first", result)))
+        # Même clé pendant la requête : rattaché au travail en cours, pas de seconde requête
+        assert not network.verify_key("HAKO-COALESCE", lambda result: results.append(("second", result)))
+
+        deadline = time.monotonic() + 5
+        while network.busy and time.monotonic() < deadline:
+            network.deliver()
+            time.sleep(0.01)
+        network.deliver()
+        requests_made = worker.server.requests
+
+    assert requests_made == 1
+    assert [caller for caller, _ in results] == ["first", "second"]
+    ok, _, data = results[0][1]
+    assert ok and data["license"] == "HAKO-COALESCE"
+    assert results[1][1] is results[0][1]
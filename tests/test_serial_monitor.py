@@ -0,0 +1,51 @@
+import os
+import time
+import tty
+
+
+def test_pty_loopback_lines_and_filtered_window(hako):
+    device_fd, port_fd = os.openpty()
+    tty.setraw(device_fd)
+    tty.setraw(port_fd)
+    monitor = hako.SerialMonitor(hako.FdTransport(port_fd), capacity=1000).start()
+    try:
+        lines = [f"{'E' if i % 10 == 0 else 'I'} ({i}) wifi: paquet {i}" for i in range(2000)]
+        data = "".join(line + "\r\n" for line in lines).encode()
+        for i in range(0, len(data), 4096):
+            os.write(device_fd, data[i:i + 4096])
+        deadline = time.monotonic() + 5
+        while monitor.ring.total < len(lines) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert monitor.ring.total == len(lines) and monitor.bytes == len(data)
+        assert monitor.ring.get(0, 2000) == (1000, lines[1000:]) # Tampon plein : seules les 1000 dernières
+
+        view = monitor.view
+        assert view.window(16) == (lines[-16:], 984, 1000) # Suivi : collée aux dernières lignes
+        view.set_filter(r"^E \(")
+        while view.filter.pending:
+            view.window(16)
+        visible, index, count = view.window(16)
+        assert (index, count) == (84, 100) and visible == lines[1840::10]
+    finally:
+        monitor.stop()
+        monitor.finished.wait(1)
+        os.close(device_fd)
+
+
+def test_filtered_window_skips_lines_evicted_during_the_frame(hako):
+    ring = hako.LogRing(capacity=100)
+    ring.extend([f"wifi {i}" for i in range(100)])
+    view = hako.LogView(ring)
+    view.set_filter("wifi")
+    view.follow = False # Vue remontée sur les plus anciennes correspondances
+    view.top_seq = 0
+    scan = view.filter.update
+
+    def update_then_evict(*args):
+        scan(*args)
+        ring.extend([f"ble {i}" for i in range(10)]) # Le thread de lecture écrase 0..9 entre-temps
+
+    view.filter.update = update_then_evict
+    lines, index, count = view.window(16)
+    assert (index, count) == (0, 100)
+    assert lines == [f"wifi {i}" for i in range(10, 16)]
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+DEFAULTS = {"theme": {}, "stealth": False}
+
+
+@pytest.mark.parametrize("content", [
+    "",                                   # Fichier vide
+    "{not json",                          # JSON invalide
+    "[1, 2]",                             # Pas un objet
+    '{"theme": "dark", "stealth": 1}',    # Thème pas un objet, stealth pas un booléen
+    '{"theme": {"primary_bg": "#12345", "panel_bg": "red", "neon_accent": 16711935, "text_fg": "#gggggg",'
+    ' "button_bg": "#0a0018ff", "current_font": ""}, "stealth": "yes"}',
+])
+def test_invalid_settings_fall_back_to_defaults(hako, tmp_path, content):
+    path = tmp_path / "settings.json"
+    path.write_text(content)
+    assert hako.load_settings(str(path)) == DEFAULTS
+
+
+def test_missing_settings_file(hako, tmp_path):
+    assert hako.load_settings(str(tmp_path / "absent.json")) == DEFAULTS
+
+
+def test_valid_values_kept_one_by_one(hako, tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"theme": {"primary_bg": "#0B0016", "panel_bg": "nope", "current_font": "Consolas",
+                                          "unknown_token": "#ffffff"}, "stealth": True}))
+    assert hako.load_settings(str(path)) == {"theme": {"primary_bg": "#0B0016", "current_font": "Consolas"},
+                                             "stealth": True}
+
+
+def test_save_then_load_round_trip(hako, tmp_path):
+    path = str(tmp_path / "settings.json")
+    settings = {"theme": {"neon_accent": "#ff2df2", "current_font": "Arial"}, "stealth": True}
+    hako.save_settings(settings, path)
+    assert hako.load_settings(path) == settings
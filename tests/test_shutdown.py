@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from mock_worker import MockWorker
+
+# Le launcher tourne dans un processus fils : BACKGROUND.shutdown() est définitif pour le processus
+CHILD = """
+import json, sys
+from _hako import load_launcher
+hako = load_launcher()
+hako.WORKER_ENDPOINTS = hako.WorkerEndpoints([sys.argv[1]])
+network = hako.NetworkWorker()
+network.start()
+network.verify_key("TEST-SLOW-KEY", lambda result: None)
+print("submitted", flush=True)
+sys.stdin.readline()
+print(json.dumps(hako.BACKGROUND.shutdown(hako.SHUTDOWN_GRACE_S)), flush=True)
+"""
+
+
+def test_exit_while_worker_request_in_flight(hako, tmp_path):
+    pytest.importorskip("requests")
+    env = dict(os.environ, HAKO_DATA_DIR=str(tmp_path), PYTHONPATH=os.pathsep.join(sys.path))
+    with MockWorker(latency=10) as worker:
+        proc = subprocess.Popen([sys.executable, "-c", CHILD, worker.url], env=env, text=True,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        try:
+            assert proc.stdout.readline().strip() == "submitted"
+            deadline = time.monotonic() + 5
+            while not worker.server.connections and time.monotonic() < deadline:
+                time.sleep(0.01)
+            # Arrivée au Worker, sans réponse : la requête est en vol au moment de la fermeture
+            assert worker.server.connections == 1 and worker.server.requests == 0
+
+            closed_at = time.perf_counter()
+            proc.stdin.write("close\n")
+            proc.stdin.flush()
+            abandoned = json.loads(proc.stdout.readline())
+            proc.wait(5)
+            exit_s = time.perf_counter() - closed_at
+        finally:
+            proc.kill()
+    assert proc.returncode == 0
+    assert abandoned == []
+    assert exit_s <= hako.SHUTDOWN_DEADLINE_S
@@ -0,0 +1,57 @@
+import os
+import time
+import tkinter
+import types
+
+import pytest
+
+
+class Page:
+    def refresh(self):
+        time.sleep(0.03) # Plus long que STALL_THRESHOLD_MS
+
+
+class FakeMisc:
+    """Juste assez de tkinter.Misc pour que Misc.after() construise son callit."""
+
+    def __init__(self):
+        self.registered = []
+        self.tk = types.SimpleNamespace(call=lambda *args: "after#1")
+
+    def _register(self, func):
+        self.registered.append(func)
+        return "callit"
+
+    def deletecommand(self, name):
+        pass
+
+
+def test_after_callback_is_reported_under_its_own_name(hako, metrics):
+    widget = FakeMisc()
+    tkinter.Misc.after(widget, 10, Page().refresh)
+    callit, = widget.registered
+    hako.StallWatchdog(callit, None, widget)()
+    stall, = metrics.records("tk.stall")
+    assert stall["callback"] == "Page.refresh"
+    assert stall["ms"] > hako.STALL_THRESHOLD_MS
+
+
+def test_fast_callback_is_not_recorded(hako, metrics):
+    widget = FakeMisc()
+    tkinter.Misc.after(widget, 10, lambda: None)
+    hako.StallWatchdog(widget.registered[0], None, widget)()
+    assert metrics.records("tk.stall") == []
+
+
+@pytest.mark.skipif(os.name != "nt" and not os.environ.get("DISPLAY"), reason="affichage requis")
+def test_slow_after_job_in_mainloop(hako, metrics):
+    hako.StallWatchdog.install()
+    root = tkinter.Tk()
+    try:
+        root.after(0, Page().refresh)
+        deadline = time.monotonic() + 2
+        while not metrics.count("tk.stall") and time.monotonic() < deadline:
+            root.update()
+    finally:
+        root.destroy()
+    assert [entry["callback"] for entry in metrics.records("tk.stall")] == ["Page.refresh"]
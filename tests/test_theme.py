@@ -0,0 +1,28 @@
+import gc
+
+
+class Widget:
+    """Juste configure() : le registre n'appelle rien d'autre."""
+
+    def __init__(self):
+        self.options = {}
+
+    def configure(self, **options):
+        self.options.update(options)
+
+
+def test_update_reconfigures_only_widgets_bound_to_changed_tokens(hako):
+    theme = hako.ThemeRegistry({"primary_bg": "#000000", "neon_accent": "#ff2df2"})
+    accent, background = Widget(), Widget()
+    theme.bind(accent, fg="neon_accent")
+    theme.bind(background, bg="primary_bg")
+    assert theme.update(neon_accent="#ff2df2") == 0
+    assert theme.update(neon_accent="#00fff2") == 1
+    assert accent.options == {"fg": "#00fff2"} and background.options == {"bg": "#000000"}
+
+
+def test_released_widget_leaves_the_registry(hako):
+    theme = hako.ThemeRegistry({"neon_accent": "#ff2df2"})
+    theme.bind(Widget(), fg="neon_accent") # Aucune autre référence : comme un widget détruit
+    gc.collect()
+    assert theme.update(neon_accent="#00fff2") == 0
@@ -0,0 +1,68 @@
+import pytest
+
+from esp_images import esp_image, merged_image, partition_table
+
+APP = esp_image([(0x3C000020, bytes(range(256)) * 16), (0x42000020, b"\x13\x37" * 3000)])
+TABLE = partition_table([("nvs", 1, 2, 0x9000, 0x6000), ("factory", 0, 0, 0x10000, 0x300000)])
+
+
+def flip(data, index):
+    data = bytearray(data)
+    data[index] ^= 0x01
+    return bytes(data)
+
+
+def test_valid_app_image(hako):
+    image = hako.check_esp_image(memoryview(APP), 0, "ESP32-S3")
+    assert image["segments"] == 2 and image["size"] == len(APP) and image["sha256"]
+
+
+@pytest.mark.parametrize("data, chip_family, error", [
+    (b"\xe8" + APP[1:], None, "magic"),
+    (APP[:24], None, "segment 0 tronqué"),
+    (APP[:1000], None, "segment 0 tronqué"),
+    (flip(APP, 24 + 8 + 10), None, "somme de contrôle"),         # Octet de données modifié
+    (flip(APP, len(APP) - 33), None, "somme de contrôle"),        # Octet de contrôle modifié
+    (flip(APP, len(APP) - 1), None, "SHA-256 de l'image invalide"),
+    (APP[:-16], None, "SHA-256 annoncé mais absent"),
+    (APP, "ESP32", "chip_id 9"),
+])
+def test_corrupted_app_image_rejected(hako, data, chip_family, error):
+    with pytest.raises(hako.ImageError, match=error):
+        hako.check_esp_image(memoryview(data), 0, chip_family)
+
+
+def validate(hako, tmp_path, data, offset):
+    path = tmp_path / "part.bin"
+    path.write_bytes(data)
+    return hako.validate_firmware_part(str(path), offset, "ESP32-S3")
+
+
+def test_merged_image_checks_every_image(hako, tmp_path):
+    report = validate(hako, tmp_path, merged_image(app_size=64 * 1024), 0)
+    assert report["ok"] and report["partitions"] == 3
+    assert [image["offset"] for image in report["images"]] == [0, 0x10000]
+
+
+def test_merged_image_with_corrupted_app(hako, tmp_path):
+    report = validate(hako, tmp_path, flip(merged_image(app_size=64 * 1024), 0x10000 + 100), 0)
+    assert not report["ok"] and report["error"].startswith("0x10000 : somme de contrôle")
+
+
+@pytest.mark.parametrize("table, error", [
+    (flip(TABLE, 40), "MD5 de la table de partitions invalide"),
+    (b"\xff" * 0xC00, "table de partitions absente ou corrompue"),
+    (b"\x00" * 0xC00, "table de partitions absente ou corrompue"),
+])
+def test_malformed_partition_table(hako, tmp_path, table, error):
+    report = validate(hako, tmp_path, table, hako.PARTITION_TABLE_OFFSET)
+    assert not report["ok"] and error in report["error"]
+    image = bytearray(merged_image(app_size=64 * 1024))
+    image[0x8000:0x8000 + len(table)] = table
+    report = validate(hako, tmp_path, bytes(image), 0)
+    assert not report["ok"] and error in report["error"]
+
+
+def test_valid_partition_table(hako, tmp_path):
+    report = validate(hako, tmp_path, TABLE, hako.PARTITION_TABLE_OFFSET)
+    assert report["ok"] and report["partitions"] == 2
@@ -0,0 +1,122 @@
+import hashlib
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('"x", W/"abc"', True),
+    ("*", True),
+    ('"abc-gz"', False),
+    ('"xabc"', False),
+    ("", False),
+])
+def test_if_none_match_compares_whole_entity_tags(hako, header, matches):
+    assert hako.etag_matches(header, '"abc"') is matches
+
+
+def fetch(url, path, headers=None):
+    import http.client
+    from urllib.parse import urlsplit
+    connection = http.client.HTTPConnection(urlsplit(url).netloc)
+    connection.request("GET", path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+@pytest.fixture
+def serve(hako):
+    servers = []
+
+    def start(site):
+        server = hako.WebFlasherServer(port=0, site=site)
+        servers.append(server)
+        return server.start()
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_pages_use_vendored_libraries(hako, tmp_path, serve):
+    cdn = "https://unpkg.com/esp-web-tools@10/dist/web/install-button.js?module"
+    (tmp_path / "index.html").write_text(f'<script type="module" src="{cdn}"></script>')
+    site = hako.StaticSite(str(tmp_path), cache=None)
+    assert cdn.encode() in site.resolve("/index.html").data # Pas encore de copie locale : CDN
+
+    vendored = tmp_path / "vendor" / "esp-web-tools"
+    vendored.mkdir(parents=True)
+    (vendored / "install-button.js").write_text("export {};")
+    url = serve(site)
+    response, body = fetch(url, "/index.html")
+    assert b"/vendor/esp-web-tools/install-button.js" in body and b"unpkg.com" not in body
+    response, body = fetch(url, "/vendor/esp-web-tools/install-button.js")
+    assert response.status == 200 and response.getheader("Content-Type") == "text/javascript"
+    response, _ = fetch(url, "/vendor/../index.html")
+    assert response.status == 404
+
+
+def test_vendor_follows_relative_imports(hako, tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    from mock_firmware import MockFirmwareServer
+    files = {
+        "pkg/install-button.js": b'import "./c.one.js"; const later = () => import("./c.two.js");',
+        "pkg/c.one.js": b"export {};",
+        "pkg/c.two.js": b'import { x } from "../../elsewhere.js";', # Hors du paquet : ignoré
+        "pkg/css/all.min.css": b"@font-face{src:url(../webfonts/fa-solid-900.woff2) format(\"woff2\")}",
+        "pkg/webfonts/fa-solid-900.woff2": b"wOF2",
+    }
+    with MockFirmwareServer(files) as cdn:
+        monkeypatch.setattr(hako, "WEB_VENDOR", {
+            "https://cdn.invalid/install-button.js?module": (cdn.url + "pkg/", "install-button.js", "esp-web-tools"),
+            "https://cdn.invalid/all.min.css": (cdn.url + "pkg/", "css/all.min.css", "font-awesome"),
+        })
+        written = hako.vendor_web_assets(str(tmp_path))
+    assert sorted(written) == [
+        "vendor/esp-web-tools/c.one.js", "vendor/esp-web-tools/c.two.js", "vendor/esp-web-tools/install-button.js",
+        "vendor/font-awesome/css/all.min.css", "vendor/font-awesome/webfonts/fa-solid-900.woff2"]
+    assert (tmp_path / "vendor" / "font-awesome" / "webfonts" / "fa-solid-900.woff2").read_bytes() == b"wOF2"
+
+
+def test_manifest_points_to_content_hashed_parts(hako, tmp_path, serve):
+    root = tmp_path / "site"
+    root.mkdir()
+    manifest = {"name": "HAKO", "version": "1.0", "builds": [{"chipFamily": "ESP32-S3", "parts": [
+        {"path": "app.bin", "offset": 0}, {"path": "missing.bin", "offset": 65536}]}]}
+    (root / "manifest.json").write_text(json.dumps(manifest))
+    cache = hako.FirmwareCache(str(tmp_path / "cache"))
+    site = hako.StaticSite(str(root), cache=cache)
+    url = serve(site)
+    _, body = fetch(url, "/manifest.json")
+    assert [part["path"] for part in json.loads(body)["builds"][0]["parts"]] == ["app.bin", "missing.bin"]
+
+    data = b"firmware" * 1000
+    (tmp_path / "app.bin").write_bytes(data)
+    sha256 = hashlib.sha256(data).hexdigest()
+    cache.store("manifest.json", "1.0", "app.bin", str(tmp_path / "app.bin"), sha256)
+    _, body = fetch(url, "/manifest.json") # Le cache a changé : manifest réécrit
+    assert [part["path"] for part in json.loads(body)["builds"][0]["parts"]] == [f"/firmware/{sha256}", "missing.bin"]
+    response, image = fetch(url, f"/firmware/{sha256}")
+    assert image == data and "immutable" in response.getheader("Cache-Control")
+
+
+def test_assets_precompressed_at_startup(hako, tmp_path):
+    (tmp_path / "index.html").write_text("<p>hako</p>" * 200)
+    (tmp_path / "app.bin").write_bytes(b"\0" * 4096)
+    site = hako.StaticSite(str(tmp_path), cache=None)
+    assert site.prepare() == 1
+    assert site._assets["index.html"].gzip_data is not None
+    assert "app.bin" not in site._assets # Les images restent servies à la demande, depuis le disque
+
+
+def test_root_image_has_weak_etag(hako, tmp_path, serve):
+    (tmp_path / "app.bin").write_bytes(b"\0" * 4096)
+    url = serve(hako.StaticSite(str(tmp_path), cache=None))
+    response, _ = fetch(url, "/app.bin")
+    etag = response.getheader("ETag")
+    assert etag.startswith('W/"')
+    response, body = fetch(url, "/app.bin", {"If-None-Match": etag})
+    assert response.status == 304 and body == b""
@@ -0,0 +1,87 @@
+import socket
+import time
+
+import pytest
+
+from mock_worker import MockWorker
+
+PAYLOAD = {"license": "HAKO-HEDGE", "hwid": "hw"}
+
+
+@pytest.fixture
+def session():
+    requests = pytest.importorskip("requests")
+    with requests.Session() as session:
+        yield session
+
+
+def refused_url():
+    """URL d'un port local fermé : connexion refusée immédiatement."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_hedge_after_delay_first_response_wins(hako, session, monkeypatch):
+    monkeypatch.setattr(hako, "WORKER_HEDGE_DEFAULT_MS", 200)
+    with MockWorker(latency=1.0) as slow, MockWorker() as fast:
+        endpoints = hako.WorkerEndpoints([slow.url, fast.url])
+        start = time.perf_counter()
+        r = hako.hedged_post(session, PAYLOAD, timeout=5, endpoints=endpoints)
+        elapsed = time.perf_counter() - start
+
+        assert r.url == fast.url and r.json()["license"] == "HAKO-HEDGE"
+        assert 0.2 <= elapsed < 0.9 # Doublée après le délai de hedging, sans attendre l'endpoint lent
+        assert slow.server.connections == 1 and slow.server.requests == 0 # Perdante encore en cours
+        # La perdante termine en arrière-plan : ignorée par l'appelant, mais sa durée compte dans le classement
+        assert wait_for(lambda: endpoints.snapshot()[-1][1] is not None)
+    assert [url for url, *_ in endpoints.snapshot()] == [fast.url, slow.url]
+    assert endpoints.snapshot()[-1][1] >= 1000
+
+
+def test_failover_on_connection_refused(hako, session, monkeypatch):
+    monkeypatch.setattr(hako, "WORKER_HEDGE_DEFAULT_MS", 5000)
+    down = refused_url()
+    with MockWorker() as worker:
+        endpoints = hako.WorkerEndpoints([down, worker.url])
+        start = time.perf_counter()
+        r = hako.hedged_post(session, PAYLOAD, timeout=5, endpoints=endpoints)
+        elapsed = time.perf_counter() - start
+        requests_made = worker.server.requests
+
+    assert r.url == worker.url and requests_made == 1
+    assert elapsed < 1 # Échec : l'endpoint suivant est sollicité sans attendre le délai de hedging
+    assert endpoints.ranked() == [worker.url, down]
+
+
+def test_all_endpoints_refused_raises_last_error(hako, session):
+    requests = pytest.importorskip("requests")
+    endpoints = hako.WorkerEndpoints([refused_url(), refused_url()])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        hako.hedged_post(session, PAYLOAD, timeout=5, endpoints=endpoints)
+
+
+def test_slowdown_reorders_endpoints(hako, session, monkeypatch):
+    monkeypatch.setattr(hako, "WORKER_HEDGE_DEFAULT_MS", 200)
+    with MockWorker() as first, MockWorker() as second:
+        endpoints = hako.WorkerEndpoints([first.url, second.url])
+        hako.hedged_post(session, PAYLOAD, timeout=5, endpoints=endpoints)
+        assert endpoints.ranked() == [first.url, second.url] and second.server.connections == 0
+
+        first.configure(latency=0.5)
+        hako.hedged_post(session, PAYLOAD, timeout=5, endpoints=endpoints)
+        # La perdante termine en arrière-plan : sa latence enregistrée, l'endpoint lent passe derrière
+        assert wait_for(lambda: dict((url, samples) for url, _, _, samples in endpoints.snapshot())[first.url] == 2)
+        assert endpoints.ranked() == [second.url, first.url]
+
+        # Le classement décide de l'endpoint sollicité en premier
+        r = hako.hedged_post(session, PAYLOAD, timeout=5, endpoints=endpoints)
+        assert r.url == second.url and first.server.requests == 2